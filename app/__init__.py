@@ -4,12 +4,28 @@ import os
 
 def create_app():
     app = Flask(__name__)
+
+    # Serialización JSON rápida (orjson) con soporte nativo de NumPy/pandas
+    from .api.serialization import OrjsonProvider
+    app.json = OrjsonProvider(app)
     
     cors_origin = os.getenv('FRONTEND_URL')
     CORS(app, resources={r"/api/*": {"origins": cors_origin}}, supports_credentials=True) 
     
+    # Logging estructurado: request_id por petición (header X-Request-ID)
+    from .core.logger import init_request_logging
+    init_request_logging(app)
+
+    # Métricas por petición (expuestas en /api/metrics)
+    from .core.metrics import init_request_metrics
+    init_request_metrics(app)
+
     # importar y registrar rutas
     from .api.routes import api_bp
     app.register_blueprint(api_bp, url_prefix="/api")
 
+    # Compresión gzip/brotli (opt-in con COMPRESSION_ENABLED=true)
+    from .core.compression import init_compression
+    init_compression(app)
+
     return app
@@ -1,7 +1,9 @@
 from functools import wraps
 from flask import request, jsonify
+import hmac
 import os 
 from app.core.connections.supabase_service import supabase
+from app.core.metrics import span
 
 
 def token_required(f):
@@ -16,7 +18,8 @@ def token_required(f):
             return jsonify({'message': 'Falta el token de autorizacion'}), 401
         
         try:
-            user_response = supabase.auth.get_user(token)
+            with span('auth.verify_token'):
+                user_response = supabase.auth.get_user(token)
 
         except Exception as e:
             return jsonify({'message': 'Token invalido o expirado', 'error': str(e)}), 401
@@ -24,3 +27,21 @@ def token_required(f):
         return f(*args, **kwargs)
     
     return decorated
+
+def metrics_token_required(f):
+    """
+    Para /api/metrics: con METRICS_TOKEN definido acepta 'Bearer <METRICS_TOKEN>' (token fijo para
+    el scraper de Prometheus, que no tiene sesión de Supabase); cualquier otro token pasa por
+    token_required. Sin METRICS_TOKEN, igual que el resto de la API.
+    """
+    protected = token_required(f)
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        metrics_token = os.getenv('METRICS_TOKEN')
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if metrics_token and scheme == 'Bearer' and hmac.compare_digest(token.encode(), metrics_token.encode()):
+            return f(*args, **kwargs)
+        return protected(*args, **kwargs)
+
+    return decorated
@@ -1,12 +1,70 @@
-from flask import jsonify, Blueprint, request
-from app.api.auth_decorator import token_required
+from flask import jsonify, Blueprint, request, make_response
+from app.api.auth_decorator import metrics_token_required, token_required
+from app.api.serialization import SHAPES, frame_response, invalid_shape_response, requested_shape
+from app.core.hashing import canonical_hash
+from app.core.logger import get_logger, log_payload
+from app.core.metrics import render_prometheus, span
 import os
 import json
 
 api_bp = Blueprint("api", __name__)
+logger = get_logger(__name__)
+
+#----------------------HELPERS (ETag / 304)----------------------#
+
+def _not_modified(etag: str, cache_control: str = None):
+    """
+    Si el cliente ya tiene esta versión (header If-None-Match), regresa un 304 sin cuerpo.
+    Si no, regresa None y la vista sigue normal (transformación + serialización).
+    Comparación débil (RFC 9110): el ETag se vuelve débil cuando la respuesta va comprimida.
+    """
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        return None
+
+    response = make_response('', 304)
+    response.set_etag(etag)
+    if cache_control:
+        response.headers['Cache-Control'] = cache_control
+    return response
+
+def _with_etag(response, etag: str, cache_control: str = None):
+    """
+    Agrega un ETag fuerte a la respuesta, para que la siguiente petición pueda revalidar con If-None-Match.
+    Sin etag (no se pudo calcular la versión) la respuesta sale sin él.
+    """
+    if etag is not None:
+        response.set_etag(etag)
+    if cache_control:
+        response.headers['Cache-Control'] = cache_control
+    return response
+
+def _json_with_etag(payload, etag: str, cache_control: str = None):
+    return _with_etag(jsonify(payload), etag, cache_control)
+
+def _data_etag(table_names: list, *extra):
+    """
+    ETag a partir de la versión barata de las tablas (ver app/services/data_version.py), antes de
+    descargarlas: un 304 no paga la descarga. Si los datos cambian entre la versión y la descarga,
+    la siguiente petición ve otra versión y se manda completa (nunca un 304 viejo).
+    None si no se pudo consultar la versión o alguna tabla no tiene (la vista sigue normal, sin ETag).
+    """
+    from app.services.data_version import data_version
+    try:
+        version = data_version(table_names)
+        return canonical_hash([version, *extra]) if version is not None else None
+    except Exception as e:
+        logger.warning(f"⚠️  Could not read data version of {table_names}: {e}")
+        return None
 
 #----------------------ENDPOINTS----------------------#
 
+# Métricas en formato de texto de Prometheus (histogramas en memoria de este proceso).
+# Protegidas: exponen endpoints, tablas y latencias (token de Supabase o METRICS_TOKEN del scraper)
+@api_bp.route("/metrics", methods=["GET"])
+@metrics_token_required
+def get_metrics():
+    return render_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 # Endpoint de prueba para verificar que la API está funcionando
 @api_bp.route("/health", methods = ["GET"])
 def health_check():
@@ -38,14 +96,19 @@ def get_dashboards_meta():
 def get_table_data(table_name):                                 #el nombre de la tabla se pasa como parámetro en la URL después de /tabla/
     from app.core.connections.supabase_service import get_all_from
     
-    print(f"Petición para obtener datos de la tabla: {table_name}")
+    logger.debug("Petición para obtener datos de la tabla: %s", table_name)
+
+    etag = _data_etag([table_name], 'table')
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
 
     data = get_all_from(table_name)
     
     if isinstance(data, dict) and "error" in data:
         return jsonify(data), 404
     
-    return jsonify(data), 200
+    return _json_with_etag(data, etag), 200
 
 @api_bp.route("/dashboards", methods=['GET'])
 @token_required
@@ -54,7 +117,16 @@ def get_all_dashboards():
     Endpoint to get a lightweight list of all available dashboards.
     """
     from app.services import dashboard_service
-    print("Petición para obtener la lista de dashboards")
+    logger.debug("Petición para obtener la lista de dashboards")
+
+    # Las filas de 'dashboards' las escribe el analytics run desde DASHBOARDS_CONFIG:
+    # versión de la tabla + los metadatos de la config (títulos, descripciones, posiciones)
+    cache_control = 'private, max-age=300'
+    etag = _data_etag(['dashboards'], dashboard_service.DASHBOARDS_METADATA_HASH)
+    not_modified = _not_modified(etag, cache_control)
+    if not_modified:
+        return not_modified
+
     dashboards_list = dashboard_service.get_all_dashboards_list()
     
     # For this example, we'll load from a mock JSON file.
@@ -63,12 +135,9 @@ def get_all_dashboards():
     # with open(file_path, 'r', encoding='utf-8') as f:
     #     dashboards_list = json.load(f)
     
-    response = jsonify(dashboards_list)
+    response = _json_with_etag(dashboards_list, etag, cache_control)
     
-    response.headers['Cache-Control'] = 'private, max-age=300'
-    
-    print("--- DEBUG: SENDING THIS JSON TO FRONTEND ---")
-    print(response.get_data(as_text=True))
+    log_payload(logger, "Dashboards list sent to frontend:", dashboards_list)
     
     return response, 200
     
@@ -80,7 +149,7 @@ def get_single_dashboard(dashboard_slug):
     Endpoint to get the full data (including charts) for a single dashboard.
     """
     from app.services import dashboard_service
-    print(f"Petición para obtener el dashboard con slug: {dashboard_slug}")
+    logger.debug("Petición para obtener el dashboard con slug: %s", dashboard_slug)
 
     # 1. Get the list of ALL dashboards, fully assembled with their charts.
     all_dashboards = dashboard_service.get_dashboards_with_data()
@@ -97,12 +166,97 @@ def get_single_dashboard(dashboard_slug):
 
     if not target_dashboard:
         return jsonify({"error": "Dashboard not found"}), 404
+
+    # 2. La versión del dashboard sale de los hashes de sus gráficas (ver dashboard_service).
+    etag = dashboard_service.dashboard_version(target_dashboard)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
         
-    print("--- DEBUG: SENDING THIS JSON TO FRONTEND ---")
-    print(target_dashboard)
+    log_payload(logger, f"Dashboard '{dashboard_slug}' sent to frontend:", target_dashboard)
 
     # 3. Return the single, complete dashboard object.
-    return jsonify(target_dashboard), 200
+    return _json_with_etag(target_dashboard, etag), 200
+
+@api_bp.route("/analytics/query", methods=['GET'])
+@token_required
+def query_analytics():
+    """
+    Cruces ad hoc sobre el cubo en memoria (ver app/services/analytics_cube.py).
+    /api/analytics/query?table=companies&group_by=certification&filter=municipality:CALVILLO&filter=sector:AUTOMOTRIZ
+    Parámetros: table (companies | responses), group_by, filter=<dimensión>:<valor> (repetible;
+    misma dimensión = OR, distintas = AND), measure (count | employee_count) y limit.
+    """
+    from app.services import analytics_cube
+
+    filters = {}
+    for raw_filter in request.args.getlist('filter'):
+        dim, sep, value = raw_filter.partition(':')
+        if not sep or not dim:
+            return jsonify({"error": f"Invalid filter '{raw_filter}', expected <dimension>:<value>"}), 400
+        filters.setdefault(dim, []).append(value)
+
+    limit = request.args.get('limit')
+    if limit is not None and (not limit.isdigit() or int(limit) < 1):
+        return jsonify({"error": "Query parameter 'limit' must be a positive integer"}), 400
+
+    query = {
+        'table': request.args.get('table', 'companies'),
+        'group_by': request.args.get('group_by'),
+        'filters': {dim: sorted(values) for dim, values in sorted(filters.items())},
+        'measure': request.args.get('measure', 'count'),
+        'limit': int(limit) if limit else None,
+    }
+
+    try:
+        cube = analytics_cube.get_cube()
+    except Exception as e:
+        logger.error(f"❌ Could not build analytics cube: {e}")
+        return jsonify({"error": "Analytics data unavailable"}), 503
+
+    # Misma consulta sobre el mismo cubo = misma respuesta: el ETag sale sin tocar los bitmaps
+    # (solo si la versión del cubo ve ediciones, ver analytics_cube._source_version)
+    etag = canonical_hash([cube.version, query]) if cube.exact else None
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
+    try:
+        with span('analytics.query'):
+            result = cube.query(query['table'], filters=query['filters'], group_by=query['group_by'],
+                                measure=query['measure'], limit=query['limit'])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return _json_with_etag(result, etag), 200
+
+@api_bp.route("/charts/<string:chart_slug>/by/<string:dimension>", methods=['GET'])
+@api_bp.route("/charts/<string:chart_slug>/by/<string:dimension>/<string:value>", methods=['GET'])
+@token_required
+def get_chart_variant(chart_slug, dimension, value=None):
+    """
+    Variante precalculada de una gráfica para un valor de la dimensión (fan-out en dashboards_config).
+    Sin 'value' regresa los valores disponibles: /api/charts/top-specific-certs/by/municipality
+    """
+    from app.services import dashboard_service
+    logger.debug("Petición para la variante de '%s' por '%s': %s", chart_slug, dimension, value)
+
+    variants_row = dashboard_service.get_chart_variants(chart_slug, dimension)
+    if not variants_row:
+        return jsonify({"error": f"Chart '{chart_slug}' has no variants by '{dimension}'"}), 404
+
+    if value is None:
+        payload = {"chart_id": chart_slug, "dimension": dimension, "values": list(variants_row['chart_data']['variants'])}
+    else:
+        payload = dashboard_service.build_chart_variant(variants_row, chart_slug, value)
+        if payload is None:
+            return jsonify({"error": f"No variant of '{chart_slug}' for {dimension} = '{value}'"}), 404
+
+    etag = canonical_hash(payload)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+    return _json_with_etag(payload, etag), 200
 
 @api_bp.route("/companies/search", methods=['GET'])
 @token_required
@@ -120,7 +274,11 @@ def search_company():
     try:
         # Use 'ilike' for a case-insensitive search
         response = supabase.table('companies').select('*').ilike('trade_name', f'%{query}%').limit(1).single().execute()
-        return jsonify(response.data), 200
+        etag = canonical_hash(response.data)
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+        return _json_with_etag(response.data, etag), 200
     except Exception as e:
         # Supabase client raises an exception if no rows are found with .single()
         return jsonify({"error": "Company not found"}), 404
@@ -133,7 +291,18 @@ def search_company():
 def get_companies_view():
     from app.core.connections.supabase_service import get_all_from
     import pandas as pd
+
+    shape = requested_shape()
+    if shape not in SHAPES:
+        return invalid_shape_response(shape)
     
+    # La versión depende solo de las tablas fuente: si no cambiaron, nos saltamos la descarga y pandas.
+    etag = _data_etag(['companies', 'municipality_catalog', 'industrial_parks_catalog', 'certifications_catalog'],
+                      'companies-view', shape)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
     # 1. Traer datos (Asegúrate de usar los nombres reales de tus tablas)
     companies = get_all_from('companies') # o 'dim_companies' si ya renombraste
     mun_catalog = get_all_from('municipality_catalog') 
@@ -142,111 +311,109 @@ def get_companies_view():
     
     if not companies: return jsonify([]), 200
 
-    df_comp = pd.DataFrame(companies)
-    df_mun = pd.DataFrame(mun_catalog) if mun_catalog else pd.DataFrame()
-    df_park = pd.DataFrame(park_catalog) if park_catalog else pd.DataFrame() # <--- NUEVO
-    df_cert = pd.DataFrame(cert_catalog) if cert_catalog else pd.DataFrame()
+    with span('view_transform', view='companies'):
+        df_comp = pd.DataFrame(companies)
+        df_mun = pd.DataFrame(mun_catalog) if mun_catalog else pd.DataFrame()
+        df_park = pd.DataFrame(park_catalog) if park_catalog else pd.DataFrame() # <--- NUEVO
+        df_cert = pd.DataFrame(cert_catalog) if cert_catalog else pd.DataFrame()
     
-    # 2. Mapeos (Hash Maps para búsqueda O(1))
-    mun_map = {}
-    if not df_mun.empty:
-        mun_map = dict(zip(df_mun['id'], df_mun['municipality_name']))
+        # 2. Mapeos (Hash Maps para búsqueda O(1))
+        mun_map = {}
+        if not df_mun.empty:
+            mun_map = dict(zip(df_mun['id'], df_mun['municipality_name']))
         
-    park_map = {} # <--- NUEVO
-    if not df_park.empty:
-        # Asegúrate que la columna sea 'park_name' o 'nombre_parque' según tu BD
-        park_map = dict(zip(df_park['id'], df_park['park_name']))
-
-    cert_map = {}
-    if not df_cert.empty:
-        cert_map = dict(zip(df_cert['id'].astype(str), df_cert['acronym']))
-
-    # 3. Lógica Modularizada (La función Genérica "COALESCE" en Python)
-    def resolve_location(row, id_col_name, other_col_name, catalog_map):
-        """
-        Intenta obtener el nombre del catálogo usando el ID.
-        Si falla, usa el texto libre de la columna 'other'.
-        """
-        # A. Intentar por ID
-        location_id = row.get(id_col_name)
-        if pd.notnull(location_id):
-            # El ID puede venir como float en pandas, aseguramos int
-            try:
-                name = catalog_map.get(int(location_id)) or catalog_map.get(location_id)
-                if name: return name
-            except (ValueError, TypeError):
-                pass # Si falla la conversión, seguimos
+        park_map = {} # <--- NUEVO
+        if not df_park.empty:
+            # Asegúrate que la columna sea 'park_name' o 'nombre_parque' según tu BD
+            park_map = dict(zip(df_park['id'], df_park['park_name']))
+
+        cert_map = {}
+        if not df_cert.empty:
+            cert_map = dict(zip(df_cert['id'].astype(str), df_cert['acronym']))
+
+        # 3. Lógica Modularizada (La función Genérica "COALESCE" en Python)
+        def resolve_location(row, id_col_name, other_col_name, catalog_map):
+            """
+            Intenta obtener el nombre del catálogo usando el ID.
+            Si falla, usa el texto libre de la columna 'other'.
+            """
+            # A. Intentar por ID
+            location_id = row.get(id_col_name)
+            if pd.notnull(location_id):
+                # El ID puede venir como float en pandas, aseguramos int
+                try:
+                    name = catalog_map.get(int(location_id)) or catalog_map.get(location_id)
+                    if name: return name
+                except (ValueError, TypeError):
+                    pass # Si falla la conversión, seguimos
         
-        # B. Intentar por Texto Libre
-        other_text = row.get(other_col_name)
-        if other_text and str(other_text).strip() not in ['None', 'nan', '']: 
-            return str(other_text).strip()
+            # B. Intentar por Texto Libre
+            other_text = row.get(other_col_name)
+            if other_text and str(other_text).strip() not in ['None', 'nan', '']: 
+                return str(other_text).strip()
             
-        return "No especificado"
-
-    # 4. Transformaciones (Certificaciones Array)
-    def get_certs_string(cert_ids):
-        if not isinstance(cert_ids, list) or not cert_ids: return "-"
-        names = [cert_map.get(str(cid), str(cid)) for cid in cert_ids]
-        return ", ".join(names)
-
-    # --- APLICACIÓN DE LA LÓGICA ---
-    
-    # Aplicamos la función genérica para MUNICIPIOS
-    df_comp['Municipio_Final'] = df_comp.apply(
-        lambda row: resolve_location(row, 'municipality_id', 'other_municipality', mun_map), 
-        axis=1
-    )
-
-    # Aplicamos la función genérica para PARQUES
-    df_comp['Parque_Final'] = df_comp.apply(
-        lambda row: resolve_location(row, 'industrial_park_id', 'other_industrial_park', park_map), 
-        axis=1
-    )
-    
-    # Certificaciones
-    if 'certification_ids' in df_comp.columns:
-        df_comp['Certificaciones_Final'] = df_comp['certification_ids'].apply(get_certs_string)
-    else:
-        df_comp['Certificaciones_Final'] = "-"
-
-    # 5. SELECCIÓN Y RENOMBRAMIENTO FINAL
-    # Definimos el diccionario de renombramiento para mantenerlo limpio
-    rename_map = {
-        'clean_rfc': 'RFC',
-        'trade_name': 'Nombre Comercial', # Si usas trade_name
-        # 'clean_legal_name': 'Razón Social', # Descomenta si tienes esta columna
-        'sector': 'Sector',
-        'main_activity': 'Actividad Principal',
-        'full_address': 'Dirección',
-        'postal_code': 'C.P.',
-        'Parque_Final': 'Parque Industrial',  # <--- Usamos la columna calculada
-        'Municipio_Final': 'Municipio',       # <--- Usamos la columna calculada
-        'employee_count': 'Empleados',
-        'procurement_tier': 'Nivel Proveeduría',
-        'Certificaciones_Final': 'Certificaciones'
-    }
+            return "No especificado"
+
+        # 4. Transformaciones (Certificaciones Array)
+        def get_certs_string(cert_ids):
+            if not isinstance(cert_ids, list) or not cert_ids: return "-"
+            names = [cert_map.get(str(cid), str(cid)) for cid in cert_ids]
+            return ", ".join(names)
+
+        # --- APLICACIÓN DE LA LÓGICA ---
+    
+        # Aplicamos la función genérica para MUNICIPIOS
+        df_comp['Municipio_Final'] = df_comp.apply(
+            lambda row: resolve_location(row, 'municipality_id', 'other_municipality', mun_map), 
+            axis=1
+        )
+
+        # Aplicamos la función genérica para PARQUES
+        df_comp['Parque_Final'] = df_comp.apply(
+            lambda row: resolve_location(row, 'industrial_park_id', 'other_industrial_park', park_map), 
+            axis=1
+        )
+    
+        # Certificaciones
+        if 'certification_ids' in df_comp.columns:
+            df_comp['Certificaciones_Final'] = df_comp['certification_ids'].apply(get_certs_string)
+        else:
+            df_comp['Certificaciones_Final'] = "-"
+
+        # 5. SELECCIÓN Y RENOMBRAMIENTO FINAL
+        # Definimos el diccionario de renombramiento para mantenerlo limpio
+        rename_map = {
+            'clean_rfc': 'RFC',
+            'trade_name': 'Nombre Comercial', # Si usas trade_name
+            # 'clean_legal_name': 'Razón Social', # Descomenta si tienes esta columna
+            'sector': 'Sector',
+            'main_activity': 'Actividad Principal',
+            'full_address': 'Dirección',
+            'postal_code': 'C.P.',
+            'Parque_Final': 'Parque Industrial',  # <--- Usamos la columna calculada
+            'Municipio_Final': 'Municipio',       # <--- Usamos la columna calculada
+            'employee_count': 'Empleados',
+            'procurement_tier': 'Nivel Proveeduría',
+            'Certificaciones_Final': 'Certificaciones'
+        }
 
-    # Filtramos solo las columnas que existen para evitar KeyError
-    available_cols = [c for c in rename_map.keys() if c in df_comp.columns]
+        # Filtramos solo las columnas que existen para evitar KeyError
+        available_cols = [c for c in rename_map.keys() if c in df_comp.columns]
     
-    df_final = df_comp[available_cols].rename(columns=rename_map)
-    df_final = df_final.fillna('-')
+        df_final = df_comp[available_cols].rename(columns=rename_map)
+        df_final = df_final.fillna('-')
     
-    # Definimos el orden deseado para el frontend
-    desired_order = [
-        'RFC', 'Nombre Comercial', 'Sector', 'Actividad Principal',
-        'Dirección', 'C.P.', 'Parque Industrial', 'Municipio', 
-        'Empleados', 'Nivel Proveeduría', 'Certificaciones'
-    ]
-    # Intersección para ordenar solo lo que existe
-    final_order = [c for c in desired_order if c in df_final.columns]
-    df_final = df_final[final_order]
+        # Definimos el orden deseado para el frontend
+        desired_order = [
+            'RFC', 'Nombre Comercial', 'Sector', 'Actividad Principal',
+            'Dirección', 'C.P.', 'Parque Industrial', 'Municipio', 
+            'Empleados', 'Nivel Proveeduría', 'Certificaciones'
+        ]
+        # Intersección para ordenar solo lo que existe
+        final_order = [c for c in desired_order if c in df_final.columns]
+        df_final = df_final[final_order]
 
-    return jsonify({
-        "data": df_final.to_dict(orient='records'),
-        "columns": final_order
-    }), 200
+    return _with_etag(frame_response(df_final, final_order, shape), etag), 200
     
 # --- VISTA 2: CONTACTOS LIMPIOS ---
 @api_bp.route("/data/contacts-view", methods=['GET'])
@@ -254,38 +421,45 @@ def get_companies_view():
 def get_contacts_view():
     from app.core.connections.supabase_service import get_all_from
     import pandas as pd
+
+    shape = requested_shape()
+    if shape not in SHAPES:
+        return invalid_shape_response(shape)
     
+    etag = _data_etag(['contacts'], 'contacts-view', shape)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
     # 1. Traer datos
     contacts = get_all_from('contacts')
     if not contacts: return jsonify([]), 200
 
-    df = pd.DataFrame(contacts)
-    
-    # 2. Seleccionar y Renombrar (Para que se vea bonito en la tabla)
-    # Ajusta los nombres de columnas a lo que quieras mostrar
-    df_clean = df[[
-        'first_name', 'last_name', 'clean_email', 'clean_position', 
-        'company_phone_e164', 'personal_phone_e164'
-    ]].rename(columns={
-        'first_name': 'Nombre',
-        'last_name': 'Apellidos',
-        'clean_email': 'Correo',
-        'clean_position': 'Cargo',
-        'company_phone_e164': 'Tel. Oficina',
-        'personal_phone_e164': 'Celular'
-    })
-    
-    # Rellenar nulos
-    df_clean = df_clean.fillna('-')
-    
-    column_order = [
-        'Nombre', 'Apellidos', 'Correo', 'Cargo', 'Tel. Oficina', 'Celular'
-    ]
-    
-    return jsonify({
-        "data": df_clean.to_dict(orient='records'),
-        "columns": column_order
-    }), 200
+    with span('view_transform', view='contacts'):
+        df = pd.DataFrame(contacts)
+    
+        # 2. Seleccionar y Renombrar (Para que se vea bonito en la tabla)
+        # Ajusta los nombres de columnas a lo que quieras mostrar
+        df_clean = df[[
+            'first_name', 'last_name', 'clean_email', 'clean_position', 
+            'company_phone_e164', 'personal_phone_e164'
+        ]].rename(columns={
+            'first_name': 'Nombre',
+            'last_name': 'Apellidos',
+            'clean_email': 'Correo',
+            'clean_position': 'Cargo',
+            'company_phone_e164': 'Tel. Oficina',
+            'personal_phone_e164': 'Celular'
+        })
+    
+        # Rellenar nulos
+        df_clean = df_clean.fillna('-')
+    
+        column_order = [
+            'Nombre', 'Apellidos', 'Correo', 'Cargo', 'Tel. Oficina', 'Celular'
+        ]
+    
+    return _with_etag(frame_response(df_clean, column_order, shape), etag), 200
     
 # --- VISTA 3: RESPUESTAS (EL MONSTRUO DESEMPAQUETADO) ---
 @api_bp.route("/data/responses-view", methods=['GET'])
@@ -293,7 +467,16 @@ def get_contacts_view():
 def get_responses_view():
     from app.core.connections.supabase_service import get_all_from
     import pandas as pd
+
+    shape = requested_shape()
+    if shape not in SHAPES:
+        return invalid_shape_response(shape)
     
+    etag = _data_etag(['responses', 'companies', 'contacts', 'certifications_catalog'], 'responses-view', shape)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
     # 1. Traer TODAS las tablas necesarias
     responses = get_all_from('responses')
     companies = get_all_from('companies')
@@ -302,143 +485,141 @@ def get_responses_view():
     
     if not responses: return jsonify([]), 200
 
-    # 2. Convertir a Pandas
-    df_resp = pd.DataFrame(responses)
-    df_comp = pd.DataFrame(companies)
-    df_cont = pd.DataFrame(contacts)
-    df_cert = pd.DataFrame(cert_catalog) if cert_catalog else pd.DataFrame()
-    
-    # 3. Mapeos (Diccionarios para velocidad)
-    comp_map = dict(zip(df_comp['id'], df_comp['trade_name'])) if not df_comp.empty else {}
-    
-    # Mapeo de Contactos
-    cont_map = {}
-    if not df_cont.empty:
-        df_cont['full_name'] = df_cont['first_name'].fillna('') + ' ' + df_cont['last_name'].fillna('')
-        cont_map = dict(zip(df_cont['id'], df_cont['full_name']))
-
-    # Mapeo de Certificaciones (ID -> Nombre)
-    cert_name_map = {}
-    if not df_cert.empty:
-        cert_name_map = dict(zip(df_cert['id'].astype(str), df_cert['acronym']))
-
-    # 4. Pre-calcular Certificaciones por Empresa (Company ID -> String "ISO9001, IATF...")
-    company_certs_map = {}
-    if not df_comp.empty and 'certification_ids' in df_comp.columns:
-        for _, row in df_comp.iterrows():
-            c_ids = row.get('certification_ids')
-            if isinstance(c_ids, list) and c_ids:
-                names = [cert_name_map.get(str(cid), str(cid)) for cid in c_ids]
-                company_certs_map[row['id']] = ", ".join(names)
-            else:
-                company_certs_map[row['id']] = "-"
-
-    # 5. Procesamiento Fila por Fila (Aplanar y Limpiar)
-    flat_data = []
-    
-    for _, row in df_resp.iterrows():
-        company_id = row.get('company_id')
+    with span('view_transform', view='responses'):
+        # 2. Convertir a Pandas
+        df_resp = pd.DataFrame(responses)
+        df_comp = pd.DataFrame(companies)
+        df_cont = pd.DataFrame(contacts)
+        df_cert = pd.DataFrame(cert_catalog) if cert_catalog else pd.DataFrame()
+    
+        # 3. Mapeos (Diccionarios para velocidad)
+        comp_map = dict(zip(df_comp['id'], df_comp['trade_name'])) if not df_comp.empty else {}
+    
+        # Mapeo de Contactos
+        cont_map = {}
+        if not df_cont.empty:
+            df_cont['full_name'] = df_cont['first_name'].fillna('') + ' ' + df_cont['last_name'].fillna('')
+            cont_map = dict(zip(df_cont['id'], df_cont['full_name']))
+
+        # Mapeo de Certificaciones (ID -> Nombre)
+        cert_name_map = {}
+        if not df_cert.empty:
+            cert_name_map = dict(zip(df_cert['id'].astype(str), df_cert['acronym']))
+
+        # 4. Pre-calcular Certificaciones por Empresa (Company ID -> String "ISO9001, IATF...")
+        company_certs_map = {}
+        if not df_comp.empty and 'certification_ids' in df_comp.columns:
+            for _, row in df_comp.iterrows():
+                c_ids = row.get('certification_ids')
+                if isinstance(c_ids, list) and c_ids:
+                    names = [cert_name_map.get(str(cid), str(cid)) for cid in c_ids]
+                    company_certs_map[row['id']] = ", ".join(names)
+                else:
+                    company_certs_map[row['id']] = "-"
+
+        # 5. Procesamiento Fila por Fila (Aplanar y Limpiar)
+        flat_data = []
+    
+        for _, row in df_resp.iterrows():
+            company_id = row.get('company_id')
         
-        # --- A. PROCESAR CHECKBOXES ORIGINALES (ISO IDS) ---
-        # El campo en DB suele ser 'iso_certification_ids' o similar (revisa tu DB)
-        # Asumimos que viene como lista [1, 2] o string "1, 2"
-        raw_iso_ids = row.get('iso_certification_ids') 
-        iso_original_text = "-"
+            # --- A. PROCESAR CHECKBOXES ORIGINALES (ISO IDS) ---
+            # El campo en DB suele ser 'iso_certification_ids' o similar (revisa tu DB)
+            # Asumimos que viene como lista [1, 2] o string "1, 2"
+            raw_iso_ids = row.get('iso_certification_ids') 
+            iso_original_text = "-"
         
-        if isinstance(raw_iso_ids, list) and raw_iso_ids:
-            # Traducimos IDs a Nombres: [14, 16] -> "ISO9001, IATF16949"
-            names = [cert_name_map.get(str(x), str(x)) for x in raw_iso_ids]
-            iso_original_text = ", ".join(names)
-        elif isinstance(raw_iso_ids, str) and raw_iso_ids.strip():
-            # Por si viene como string "14,16"
-            ids = raw_iso_ids.replace('{','').replace('}','').split(',')
-            names = [cert_name_map.get(x.strip(), x.strip()) for x in ids]
-            iso_original_text = ", ".join(names)
-
-        # Objeto base
-        base_obj = {
-            "Fecha": str(row.get('response_date', ''))[:10],
-            "Empresa": comp_map.get(company_id, 'ID Desconocido'),
-            "Contacto": cont_map.get(row.get('contact_id'), 'ID Desconocido'),
-            "¿Expansión?": "Sí" if row.get('has_expansion_plans') else "No",
-            "¿Ingeniería?": "Sí" if row.get('has_engineering_area') else "No",
+            if isinstance(raw_iso_ids, list) and raw_iso_ids:
+                # Traducimos IDs a Nombres: [14, 16] -> "ISO9001, IATF16949"
+                names = [cert_name_map.get(str(x), str(x)) for x in raw_iso_ids]
+                iso_original_text = ", ".join(names)
+            elif isinstance(raw_iso_ids, str) and raw_iso_ids.strip():
+                # Por si viene como string "14,16"
+                ids = raw_iso_ids.replace('{','').replace('}','').split(',')
+                names = [cert_name_map.get(x.strip(), x.strip()) for x in ids]
+                iso_original_text = ", ".join(names)
+
+            # Objeto base
+            base_obj = {
+                "Fecha": str(row.get('response_date', ''))[:10],
+                "Empresa": comp_map.get(company_id, 'ID Desconocido'),
+                "Contacto": cont_map.get(row.get('contact_id'), 'ID Desconocido'),
+                "¿Expansión?": "Sí" if row.get('has_expansion_plans') else "No",
+                "¿Ingeniería?": "Sí" if row.get('has_engineering_area') else "No",
             
-            # 🔥 COLUMNA 1: LO QUE CLICKEARON
-            "Certs (Selección Original)": iso_original_text,
+                # 🔥 COLUMNA 1: LO QUE CLICKEARON
+                "Certs (Selección Original)": iso_original_text,
             
-            # 🔥 COLUMNA 3: LA VERDAD FINAL (De la empresa)
-            "Certificaciones (Limpias)": company_certs_map.get(company_id, "-")
-        }
+                # 🔥 COLUMNA 3: LA VERDAD FINAL (De la empresa)
+                "Certificaciones (Limpias)": company_certs_map.get(company_id, "-")
+            }
         
-        # Desempaquetar 'additional_data'
-        json_data = row.get('additional_data')
-        if isinstance(json_data, dict):
-            for question, answer in json_data.items():
-                clean_q = question.replace('<strong>', '').replace('</strong>', '').strip()
+            # Desempaquetar 'additional_data'
+            json_data = row.get('additional_data')
+            if isinstance(json_data, dict):
+                for question, answer in json_data.items():
+                    clean_q = question.replace('<strong>', '').replace('</strong>', '').strip()
                 
-                # 🔥 COLUMNA 2: LO QUE ESCRIBIERON
-                if "otra certificación" in clean_q.lower():
-                    clean_q = "Certs (Texto Original)"
+                    # 🔥 COLUMNA 2: LO QUE ESCRIBIERON
+                    if "otra certificación" in clean_q.lower():
+                        clean_q = "Certs (Texto Original)"
                 
-                elif "proyecto de expansión" in clean_q.lower():
-                    clean_q = "Proyecto Expansión (Detalle)"
+                    elif "proyecto de expansión" in clean_q.lower():
+                        clean_q = "Proyecto Expansión (Detalle)"
                 
-                elif "Contact ID" in clean_q:
-                    clean_q = "HubSpot ID"
+                    elif "Contact ID" in clean_q:
+                        clean_q = "HubSpot ID"
 
-                base_obj[clean_q] = str(answer)
+                    base_obj[clean_q] = str(answer)
         
-        flat_data.append(base_obj)
-
-    df_final = pd.DataFrame(flat_data)
-    df_final = df_final.fillna('-')
-
-    # 6. LIMPIEZA Y ORDENAMIENTO MAESTRO
-    
-    # Lista de columnas a ELIMINAR (Blacklist)
-    cols_to_drop = [
-        'Conversion Page', 
-        'Conversion Title', 
-        'Contact last name', 
-        'Contact first name'
-    ]
-    df_final.drop(columns=cols_to_drop, errors='ignore', inplace=True)
-
-    # Lista del ORDEN DESEADO (Whitelist)
-    # Nota: Asegúrate de que los textos coincidan con cómo salen después del clean_q
-    desired_order = [
-        "Fecha", 
-        "Empresa", 
-        "Contacto", 
-        "¿Expansión?", 
-        "¿Ingeniería?", 
-        "HubSpot Contact ID", 
-        "Contact email", 
-        "Proveeduría",
-        "Certs (Selección Original)", # 1. Checkboxes traducidos
-        "Certs (Texto Original)",     # 2. Input de texto libre
-        "Certificaciones (Limpias)",  # 3. Resultado consolidado
-        "Principales clientes",
-        "Necesidades y problemáticas",
-        "¿Capacidad de transformadores a adquirir?",
-        "Principal producto o servicio que proporciona",
-        "Proyecto Expansión (Detalle)",
-        "¿Cuál es la demanda de electricidad esperada ma...",
-        "¿Cuál es su demanda max actual de energia regis..."
-    ]
-
-    # Reordenar: Primero las deseadas (si existen), luego el resto (si sobró alguna col no mapeada)
-    existing_cols = df_final.columns.tolist()
-    final_cols = [c for c in desired_order if c in existing_cols]
-    
-    # Agregamos cualquier otra columna que haya sobrado (por si Hubspot manda algo nuevo)
-    # y que no esté en la lista de borrar
-    leftover_cols = [c for c in existing_cols if c not in final_cols and c not in cols_to_drop]
-    
-    df_final = df_final[final_cols + leftover_cols]
-
-    # 7. Retornar Data + Column Order para el Frontend
-    return jsonify({
-        "data": df_final.to_dict(orient='records'),
-        "columns": final_cols + leftover_cols # Le dice al frontend el orden explícito
-    }), 200
\ No newline at end of file
+            flat_data.append(base_obj)
+
+        df_final = pd.DataFrame(flat_data)
+        df_final = df_final.fillna('-')
+
+        # 6. LIMPIEZA Y ORDENAMIENTO MAESTRO
+    
+        # Lista de columnas a ELIMINAR (Blacklist)
+        cols_to_drop = [
+            'Conversion Page', 
+            'Conversion Title', 
+            'Contact last name', 
+            'Contact first name'
+        ]
+        df_final.drop(columns=cols_to_drop, errors='ignore', inplace=True)
+
+        # Lista del ORDEN DESEADO (Whitelist)
+        # Nota: Asegúrate de que los textos coincidan con cómo salen después del clean_q
+        desired_order = [
+            "Fecha", 
+            "Empresa", 
+            "Contacto", 
+            "¿Expansión?", 
+            "¿Ingeniería?", 
+            "HubSpot Contact ID", 
+            "Contact email", 
+            "Proveeduría",
+            "Certs (Selección Original)", # 1. Checkboxes traducidos
+            "Certs (Texto Original)",     # 2. Input de texto libre
+            "Certificaciones (Limpias)",  # 3. Resultado consolidado
+            "Principales clientes",
+            "Necesidades y problemáticas",
+            "¿Capacidad de transformadores a adquirir?",
+            "Principal producto o servicio que proporciona",
+            "Proyecto Expansión (Detalle)",
+            "¿Cuál es la demanda de electricidad esperada ma...",
+            "¿Cuál es su demanda max actual de energia regis..."
+        ]
+
+        # Reordenar: Primero las deseadas (si existen), luego el resto (si sobró alguna col no mapeada)
+        existing_cols = df_final.columns.tolist()
+        final_cols = [c for c in desired_order if c in existing_cols]
+    
+        # Agregamos cualquier otra columna que haya sobrado (por si Hubspot manda algo nuevo)
+        # y que no esté en la lista de borrar
+        leftover_cols = [c for c in existing_cols if c not in final_cols and c not in cols_to_drop]
+    
+        df_final = df_final[final_cols + leftover_cols]
+
+    # 7. Retornar Data + Column Order para el Frontend (en el formato pedido con ?shape=)
+    return _with_etag(frame_response(df_final, final_cols + leftover_cols, shape), etag), 200
\ No newline at end of file
@@ -0,0 +1,142 @@
+import gzip
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+
+# Brotli es opcional: si no está instalado, solo negociamos gzip.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/csv'}
+
+class CompressedPayloadCache:
+    """
+    LRU acotado de cuerpos ya comprimidos, indexado por (digest del cuerpo, encoding).
+    Los payloads que se repiten (ej. dashboards) no se vuelven a comprimir en cada petición;
+    la llave es el cuerpo mismo (no el ETag), así un hit nunca cambia el contenido de la respuesta.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value: bytes):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+def _compress(data: bytes, encoding: str, level: int, brotli_quality: int) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=level)
+
+def _compress_stream(chunks, encoding: str, level: int, brotli_quality: int):
+    """
+    Comprime un iterable de chunks de forma incremental (para respuestas streameadas).
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=brotli_quality)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            out = compressor.process(chunk)
+            if out:
+                yield out
+        yield compressor.finish()
+    else:
+        # wbits=31 -> formato gzip (header + trailer), no zlib crudo
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            out = compressor.compress(chunk)
+            if out:
+                yield out
+        yield compressor.flush()
+
+def _negotiate_encoding(available: list):
+    """Escoge el mejor encoding soportado según Accept-Encoding (respetando los q=)."""
+    return request.accept_encodings.best_match(available)
+
+def init_compression(app):
+    """
+    Registra la capa de compresión (gzip/brotli) en la app.
+
+    Es opt-in: solo se activa con COMPRESSION_ENABLED=true. Configurable con:
+      - COMPRESSION_MIN_SIZE: bytes mínimos para comprimir (default 1024).
+      - COMPRESSION_LEVEL: nivel gzip 1-9 (default 6).
+      - COMPRESSION_BROTLI_QUALITY: calidad brotli 0-11 (default 5).
+      - COMPRESSION_CACHE_SIZE: nº de payloads comprimidos en caché (default 64, 0 = sin caché).
+    """
+    if os.getenv('COMPRESSION_ENABLED', 'false').lower() not in ('1', 'true', 'yes'):
+        return
+
+    min_size = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    level = int(os.getenv('COMPRESSION_LEVEL', 6))
+    brotli_quality = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))
+    cache = CompressedPayloadCache(int(os.getenv('COMPRESSION_CACHE_SIZE', 64)))
+
+    # Orden de preferencia del servidor cuando el cliente acepta ambos con el mismo q
+    available = (['br'] if brotli is not None else []) + ['gzip']
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        encoding = _negotiate_encoding(available)
+        if not encoding:
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        # A) Respuesta streameada: compresión incremental, sin conocer el tamaño final
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, encoding, level, brotli_quality)
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = encoding
+            return response
+
+        # B) Respuesta en memoria
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        etag, is_weak = response.get_etag()
+        # Hashear el cuerpo cuesta mucho menos que comprimirlo
+        cache_key = (hashlib.sha256(data).digest(), encoding)
+
+        compressed = cache.get(cache_key)
+        if compressed is None:
+            compressed = _compress(data, encoding, level, brotli_quality)
+            cache.put(cache_key, compressed)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+
+        # El cuerpo ya no es byte a byte el mismo: el ETag pasa a ser débil (igual que nginx).
+        # If-None-Match usa comparación débil, así que la revalidación (304) sigue funcionando.
+        if etag:
+            response.set_etag(etag, weak=True)
+
+        return response
@@ -1,36 +1,139 @@
 # google_sheets_service.py
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
 import gspread
 import pandas as pd
+from gspread.utils import numericise, rowcol_to_a1
 from google.oauth2.service_account import Credentials
 from config import sheets_credentials
+from app.core.logger import get_logger
+from app.core.metrics import span
+
+logger = get_logger(__name__)
 
 # Alcances de la API (se puede quedar aquí)
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
+# Filas por request al leer por bloques, y cuántos bloques se piden en paralelo
+SHEETS_BLOCK_ROWS = int(os.getenv('SHEETS_BLOCK_ROWS', 5000))
+SHEETS_READ_WORKERS = int(os.getenv('SHEETS_READ_WORKERS', 4))
+
+@lru_cache(maxsize=1)
 def get_gspread_client():
     """
     Autentica usando la ruta de credenciales del archivo config.
+    El cliente autorizado se reutiliza (gspread refresca el token solo cuando expira).
     """
     # 2. Usa la ruta de las credenciales desde el config
     creds = Credentials.from_service_account_file(sheets_credentials.CREDENTIALS_PATH, scopes=SCOPES)
     client = gspread.authorize(creds)
     return client
 
+@lru_cache(maxsize=4)
+def _open_spreadsheet(sheet_id: str):
+    return get_gspread_client().open_by_key(sheet_id)
+
+def _column_ranges(indices: list) -> list:
+    """Agrupa índices de columna (base 0, ordenados) en rangos contiguos: [0,1,2,5] -> [(0,2), (5,5)]."""
+    ranges = []
+    for index in indices:
+        if ranges and index == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], index)
+        else:
+            ranges.append((index, index))
+    return ranges
+
+def _read_block(worksheet, col_ranges: list, first_row: int, last_row: int) -> list:
+    """
+    Un batch_get con un rango A1 por grupo de columnas contiguas, en dimensión COLUMNS.
+    Regresa una lista de columnas (cada una con last_row - first_row + 1 valores).
+    """
+    a1_ranges = [
+        f"{rowcol_to_a1(first_row, start + 1)}:{rowcol_to_a1(last_row, end + 1)}"
+        for start, end in col_ranges
+    ]
+    value_ranges = worksheet.batch_get(a1_ranges, major_dimension='COLUMNS')
+
+    n_rows = last_row - first_row + 1
+    columns = []
+    for (start, end), value_range in zip(col_ranges, value_ranges):
+        values = list(value_range)
+        for offset in range(end - start + 1):
+            # La API recorta columnas y celdas vacías al final: rellenamos con ''
+            column = values[offset] if offset < len(values) else []
+            columns.append(column + [''] * (n_rows - len(column)))
+    return columns
+
+def _numericise_column(values: list) -> list:
+    """numericise() una vez por valor distinto (las respuestas del formulario se repiten mucho)."""
+    converted = {value: numericise(value) for value in set(values)}
+    return [converted[value] for value in values]
+
+def read_worksheet_columns(worksheet, columns: list = None, block_rows: int = None, workers: int = None) -> pd.DataFrame:
+    """
+    Lee solo 'columns' (por nombre de encabezado, fila 1) de un worksheet de gspread.
+
+    - Proyección: solo se piden las columnas necesarias, agrupadas en rangos A1 contiguos.
+    - Bloques: las filas se piden en bloques de block_rows (varios bloques en paralelo).
+    - El DataFrame se arma columna por columna desde la rejilla de valores,
+      con el mismo 'numericise' que aplicaba get_all_records().
+    """
+    block_rows = block_rows or SHEETS_BLOCK_ROWS
+    workers = workers or SHEETS_READ_WORKERS
+
+    header = worksheet.row_values(1)
+    # Primera aparición de cada encabezado
+    positions = {}
+    for index, name in enumerate(header):
+        positions.setdefault(name, index)
+
+    wanted = list(dict.fromkeys(columns)) if columns is not None else list(positions)
+    missing = [name for name in wanted if name not in positions]
+    if missing:
+        logger.warning(f"Columns not found in worksheet header: {missing}")
+    wanted = [name for name in wanted if name in positions]
+    if not wanted:
+        return pd.DataFrame()
+
+    indices = sorted(positions[name] for name in wanted)
+    col_ranges = _column_ranges(indices)
+
+    # Filas de datos: de la 2 a la última fila de la rejilla
+    last_row = max(worksheet.row_count, 1)
+    blocks = [(start, min(start + block_rows - 1, last_row)) for start in range(2, last_row + 1, block_rows)]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(blocks) or 1))) as executor:
+        results = list(executor.map(lambda block: _read_block(worksheet, col_ranges, *block), blocks))
 
-def read_worksheet_as_dataframe(worksheet_name: str) -> pd.DataFrame:
+    # Concatenar bloques por columna
+    grid = {index: [] for index in indices}
+    for block_columns in results:
+        for index, column in zip(indices, block_columns):
+            grid[index].extend(column)
+
+    # Quitar filas vacías al final (la rejilla suele tener cientos de filas sin respuestas)
+    n_rows = len(grid[indices[0]]) if indices else 0
+    while n_rows and all(grid[index][n_rows - 1] == '' for index in indices):
+        n_rows -= 1
+
+    df = pd.DataFrame({name: _numericise_column(grid[positions[name]][:n_rows]) for name in wanted})
+    logger.info(f"Read {len(df)} rows x {len(wanted)} columns from '{worksheet.title}' in {len(blocks)} block(s).")
+    return df
+
+@span('sheets.read_worksheet')
+def read_worksheet_as_dataframe(worksheet_name: str, columns: list = None) -> pd.DataFrame:
     """
-    Lee una hoja de cálculo completa usando el ID del archivo config.
-    Solo necesita saber el nombre de la pestaña a leer.
+    Lee una hoja de cálculo usando el ID del archivo config.
+    Solo necesita saber el nombre de la pestaña a leer; con 'columns' se leen solo esas columnas.
     """
     # 3. Verifica y usa el SHEET_ID desde el config
     if not sheets_credentials.SHEET_ID:
         raise ValueError("La variable de entorno SPREADSHEET_ID no está configurada.")
-    
-    client = get_gspread_client()
-    sheet = client.open_by_key(sheets_credentials.SHEET_ID)
+
+    sheet = _open_spreadsheet(sheets_credentials.SHEET_ID)
     worksheet = sheet.worksheet(worksheet_name)
 
-    data = worksheet.get_all_records()
-    df = pd.DataFrame(data)
-    return df
+    return read_worksheet_columns(worksheet, columns)
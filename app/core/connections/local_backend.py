@@ -0,0 +1,408 @@
+"""
+Backend local (SQLite) con la misma forma que el cliente de supabase-py, para correr la API
+y los pipelines sin tocar Supabase (benchmarks, pruebas de carga, desarrollo offline).
+
+Se activa con DATA_BACKEND=local (ver supabase_service). Cada tabla es una tabla SQLite con
+(id autoincremental, doc JSON); los filtros y el orden se evalúan con json_extract.
+Soporta lo que usa este repo:
+    table(...).select(cols, count=...).eq/neq/gt/gte/lt/lte/in_/like/ilike/is_(...)  (+ .not_.<filtro>)
+        .order(col, desc=...).range(a, b).limit(n).single().execute()
+        cols admite 'alias:col->>llave' / 'col->llave' (un campo de una columna JSON)
+        ....csv().execute()   -> data = texto CSV con el formato de PostgREST (ver to_postgrest_csv)
+    table(...).upsert(rows, on_conflict='a, b', returning=...)[.select(cols)].execute()
+    table(...).insert(rows) / update(values) / delete()  (+ filtros)
+        las altas y ediciones reales ponen 'updated_at', como el trigger de
+        supabase/migrations/20261019000000_data_version_updated_at.sql
+    auth.get_user(token)   -> token válido = LOCAL_AUTH_TOKEN (default 'local-dev-token')
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from postgrest import APIResponse, ReturnMethod
+from postgrest.base_request_builder import SingleAPIResponse
+
+LOCAL_AUTH_TOKEN_DEFAULT = 'local-dev-token'
+
+class LocalBackendError(Exception):
+    """Equivalente local de postgrest.APIError (ej. .single() sin exactamente una fila)."""
+
+def _json_path(column: str) -> str:
+    return '$."' + column.replace('"', '\\"') + '"'
+
+def _column_sql(column: str) -> str:
+    return 'id' if column == 'id' else f"json_extract(doc, '{_json_path(column)}')"
+
+def _sql_value(value):
+    """Los booleanos y listas/dicts se comparan como los guarda json_extract."""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+def _split_columns(columns: str) -> list:
+    return [c.strip() for c in columns.split(',') if c.strip()]
+
+def _select_column(spec: str) -> tuple:
+    """'alias:col->>llave' -> ('alias', 'col', ['llave']); sin alias, el nombre es la última llave (como PostgREST)."""
+    alias, _, path = spec.rpartition(':') if ':' in spec else ('', '', spec)
+    parts = [part.lstrip('>') for part in path.replace('->>', '->').split('->')]
+    return alias or parts[-1], parts[0], parts[1:]
+
+def _select_value(row: dict, column: str, keys: list):
+    value = row.get(column)
+    for key in keys:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+def _needs_quotes(text: str, special: str) -> bool:
+    return text == '' or any(c in special or c.isspace() for c in text)
+
+def _pg_array_element(value) -> str:
+    if value is None:
+        return 'NULL'
+    text = _pg_text(value)
+    if text.upper() == 'NULL' or _needs_quotes(text, '{},"\\'):
+        return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return text
+
+def _pg_text(value):
+    """Representación de texto de Postgres (bool -> t/f, lista -> '{a,b}', dict -> jsonb). None = NULL."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, list):
+        return '{' + ','.join(_pg_array_element(item) for item in value) + '}'
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+def to_postgrest_csv(rows: list) -> str:
+    """
+    CSV como lo arma PostgREST: encabezado con las llaves de la primera fila y cada fila con el
+    texto de su record de Postgres (NULL vacío; comillas si hay espacios, comas, comillas,
+    paréntesis o '\\', con '"' -> '""' y '\\' -> '\\\\').
+    """
+    if not rows:
+        return '\n'
+    columns = ['id'] + [column for column in rows[0] if column != 'id'] if 'id' in rows[0] else list(rows[0])
+
+    def field(value) -> str:
+        text = _pg_text(value)
+        if text is None:
+            return ''
+        if _needs_quotes(text, '"\\(),'):
+            return '"' + text.replace('"', '""').replace('\\', '\\\\') + '"'
+        return text
+
+    return ','.join(columns) + '\n' + '\n'.join(','.join(field(row.get(column)) for column in columns) for row in rows)
+
+class LocalAuth:
+
+    def get_user(self, token: str):
+        if not token or token != os.getenv('LOCAL_AUTH_TOKEN', LOCAL_AUTH_TOKEN_DEFAULT):
+            raise LocalBackendError('Invalid JWT (local backend)')
+        return SimpleNamespace(user=SimpleNamespace(id='local-user', email='local@localhost', role='authenticated'))
+
+class LocalQuery:
+    """Builder encadenable; nada toca la BD hasta execute()."""
+
+    def __init__(self, client, table_name: str):
+        self._client = client
+        self._table = table_name
+        self._operation = 'select'
+        self._payload = None
+        self._columns = None # None = '*'
+        self._count = None
+        self._filters = []
+        self._orders = []
+        self._limit = None
+        self._offset = None
+        self._single = None # 'single' | 'maybe' | None
+        self._csv = False
+        self._negate = False # .not_ niega el siguiente filtro
+        self._on_conflict = []
+        self._returning = ReturnMethod.representation
+
+    # --- Operaciones ---
+    def select(self, *columns, count: str = None, head: bool = None):
+        joined = ','.join(columns) if columns else '*'
+        if self._operation == 'select':
+            self._count = count
+        else:
+            # upsert(...).select('id, key') = return=representation solo con esas columnas
+            self._returning = ReturnMethod.representation
+        self._columns = None if joined.strip() == '*' else _split_columns(joined)
+        return self
+
+    def upsert(self, json_data, *, count=None, returning=ReturnMethod.representation,
+               ignore_duplicates: bool = False, on_conflict: str = '', default_to_null: bool = True):
+        self._operation = 'upsert'
+        self._payload = json_data if isinstance(json_data, list) else [json_data]
+        self._on_conflict = _split_columns(on_conflict or 'id')
+        self._returning = returning
+        return self
+
+    def insert(self, json_data, *, count=None, returning=ReturnMethod.representation, **kwargs):
+        self._operation = 'insert'
+        self._payload = json_data if isinstance(json_data, list) else [json_data]
+        self._returning = returning
+        return self
+
+    def update(self, json_data: dict, *, count=None, returning=ReturnMethod.representation, **kwargs):
+        self._operation = 'update'
+        self._payload = json_data
+        self._returning = returning
+        return self
+
+    def delete(self, *, count=None, returning=ReturnMethod.representation):
+        self._operation = 'delete'
+        self._returning = returning
+        return self
+
+    # --- Filtros ---
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def _filter(self, sql: str, *params):
+        if self._negate:
+            sql, self._negate = f"NOT ({sql})", False
+        self._filters.append((sql, params))
+        return self
+
+    def eq(self, column, value):
+        if value is None:
+            return self._filter(f"{_column_sql(column)} IS NULL")
+        return self._filter(f"{_column_sql(column)} = ?", _sql_value(value))
+
+    def neq(self, column, value):
+        return self._filter(f"{_column_sql(column)} IS NOT ?", _sql_value(value))
+
+    def gt(self, column, value):
+        return self._filter(f"{_column_sql(column)} > ?", _sql_value(value))
+
+    def gte(self, column, value):
+        return self._filter(f"{_column_sql(column)} >= ?", _sql_value(value))
+
+    def lt(self, column, value):
+        return self._filter(f"{_column_sql(column)} < ?", _sql_value(value))
+
+    def lte(self, column, value):
+        return self._filter(f"{_column_sql(column)} <= ?", _sql_value(value))
+
+    def in_(self, column, values):
+        values = list(values)
+        if not values:
+            return self._filter("0")
+        placeholders = ', '.join('?' for _ in values)
+        return self._filter(f"{_column_sql(column)} IN ({placeholders})", *[_sql_value(v) for v in values])
+
+    def is_(self, column, value):
+        if value is None or str(value).lower() == 'null':
+            return self._filter(f"{_column_sql(column)} IS NULL")
+        return self._filter(f"{_column_sql(column)} = ?", _sql_value(value in (True, 'true')))
+
+    def like(self, column, pattern: str):
+        return self._filter(f"{_column_sql(column)} LIKE ? ESCAPE '\\'", pattern.replace('*', '%'))
+
+    def ilike(self, column, pattern: str):
+        return self._filter(f"lower({_column_sql(column)}) LIKE lower(?) ESCAPE '\\'", pattern.replace('*', '%'))
+
+    # --- Orden / paginación ---
+    def order(self, column: str, *, desc: bool = False, nullsfirst: bool = None, foreign_table=None):
+        nulls = '' if nullsfirst is None else (' NULLS FIRST' if nullsfirst else ' NULLS LAST')
+        self._orders.append(f"{_column_sql(column)} {'DESC' if desc else 'ASC'}{nulls}")
+        return self
+
+    def limit(self, size: int, *, foreign_table=None):
+        self._limit = size
+        return self
+
+    def offset(self, size: int):
+        self._offset = size
+        return self
+
+    def range(self, start: int, end: int, foreign_table=None):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def single(self):
+        self._single = 'single'
+        return self
+
+    def maybe_single(self):
+        self._single = 'maybe'
+        return self
+
+    def csv(self):
+        self._csv = True
+        return self
+
+    # --- Ejecución ---
+    def _where(self):
+        if not self._filters:
+            return '', []
+        clauses = ' AND '.join(f"({sql})" for sql, _ in self._filters)
+        params = [p for _, params in self._filters for p in params]
+        return f" WHERE {clauses}", params
+
+    def _project(self, rows: list) -> list:
+        if self._columns is None:
+            return rows
+        columns = [_select_column(spec) for spec in self._columns]
+        return [{name: _select_value(row, column, keys) for name, column, keys in columns} for row in rows]
+
+    def _respond(self, rows: list, count=None) -> APIResponse:
+        rows = self._project(rows)
+        if self._csv:
+            return SingleAPIResponse(data=to_postgrest_csv(rows), count=count)
+        if self._single is not None:
+            if len(rows) == 1:
+                return SingleAPIResponse(data=rows[0], count=count)
+            if self._single == 'maybe' and not rows:
+                return None # igual que postgrest: maybe_single() sin filas regresa None
+            raise LocalBackendError(f"JSON object requested, multiple (or no) rows returned ({len(rows)})")
+        return APIResponse(data=rows, count=count)
+
+    def execute(self):
+        with self._client.lock:
+            self._client.ensure_table(self._table)
+            handler = getattr(self, f"_execute_{self._operation}")
+            return handler()
+
+    def _execute_select(self):
+        where, params = self._where()
+        sql = f'SELECT id, doc FROM "{self._table}"{where}'
+        if self._orders:
+            sql += ' ORDER BY ' + ', '.join(self._orders)
+        if self._limit is not None or self._offset is not None:
+            sql += f" LIMIT {int(self._limit) if self._limit is not None else -1} OFFSET {int(self._offset or 0)}"
+        rows = [self._client.decode(row) for row in self._client.conn.execute(sql, params)]
+
+        count = None
+        if self._count:
+            count = self._client.conn.execute(f'SELECT COUNT(*) FROM "{self._table}"{where}', params).fetchone()[0]
+        return self._respond(rows, count)
+
+    def _execute_insert(self):
+        written = [self._client.insert_doc(self._table, record) for record in self._payload]
+        self._client.conn.commit()
+        return self._respond(written if self._returning == ReturnMethod.representation else [])
+
+    def _execute_upsert(self):
+        conn = self._client.conn
+        keys = self._on_conflict
+        # Índice llave -> id de las filas existentes (una sola lectura por upsert)
+        existing = {}
+        if keys != ['id']:
+            key_sql = ', '.join(_column_sql(k) for k in keys)
+            for row in conn.execute(f'SELECT id, {key_sql} FROM "{self._table}"'):
+                existing[tuple(row[1:])] = row[0]
+
+        written = []
+        for record in self._payload:
+            record = dict(record)
+            if keys == ['id']:
+                row_id = record.get('id')
+            else:
+                row_id = existing.get(tuple(_sql_value(record.get(k)) for k in keys))
+
+            if row_id is not None and conn.execute(f'SELECT 1 FROM "{self._table}" WHERE id = ?', (row_id,)).fetchone():
+                current = self._client.decode(conn.execute(f'SELECT id, doc FROM "{self._table}" WHERE id = ?', (row_id,)).fetchone())
+                _apply_update(current, record)
+                self._client.write_doc(self._table, row_id, current)
+                written.append(current)
+            else:
+                new_row = self._client.insert_doc(self._table, record)
+                if keys != ['id']:
+                    existing[tuple(_sql_value(new_row.get(k)) for k in keys)] = new_row['id']
+                written.append(new_row)
+        conn.commit()
+        return self._respond(written if self._returning == ReturnMethod.representation else [])
+
+    def _execute_update(self):
+        where, params = self._where()
+        rows = [self._client.decode(row) for row in self._client.conn.execute(f'SELECT id, doc FROM "{self._table}"{where}', params)]
+        for row in rows:
+            _apply_update(row, self._payload)
+            self._client.write_doc(self._table, row['id'], row)
+        self._client.conn.commit()
+        return self._respond(rows if self._returning == ReturnMethod.representation else [])
+
+    def _execute_delete(self):
+        where, params = self._where()
+        rows = [self._client.decode(row) for row in self._client.conn.execute(f'SELECT id, doc FROM "{self._table}"{where}', params)]
+        self._client.conn.execute(f'DELETE FROM "{self._table}"{where}', params)
+        self._client.conn.commit()
+        return self._respond(rows if self._returning == ReturnMethod.representation else [])
+
+# Columna que mantiene el trigger de la migración (ver app/services/data_version.py)
+VERSION_COLUMN = 'updated_at'
+
+def _version_timestamp() -> str:
+    # Microsegundos siempre presentes: el texto ordena igual que el tiempo
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
+
+def _apply_update(row: dict, values: dict):
+    """row.update(values) sin tocar 'id'; si la fila cambió, VERSION_COLUMN = ahora (como el trigger)."""
+    before = dict(row)
+    row.update({k: v for k, v in values.items() if k != 'id'})
+    if row != before:
+        row[VERSION_COLUMN] = _version_timestamp()
+
+class LocalClient:
+    """Stand-in de supabase.Client: .table(nombre) y .auth, sobre un archivo SQLite."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # Flask sirve peticiones en varios hilos: una conexión compartida protegida por un lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.lock = threading.RLock()
+        self.auth = LocalAuth()
+        self._known_tables = set()
+
+    def table(self, table_name: str) -> LocalQuery:
+        return LocalQuery(self, table_name)
+
+    from_ = table
+
+    def ensure_table(self, table_name: str):
+        if table_name not in self._known_tables:
+            self.conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table_name}" (id INTEGER PRIMARY KEY AUTOINCREMENT, doc TEXT NOT NULL)'
+            )
+            self._known_tables.add(table_name)
+
+    @staticmethod
+    def decode(row) -> dict:
+        doc = json.loads(row[1])
+        doc['id'] = row[0]
+        return doc
+
+    @staticmethod
+    def _encode(record: dict) -> str:
+        return json.dumps({k: v for k, v in record.items() if k != 'id'}, ensure_ascii=False, default=str)
+
+    def insert_doc(self, table_name: str, record: dict) -> dict:
+        record = {**record, VERSION_COLUMN: _version_timestamp()}
+        if record.get('id') is not None:
+            self.conn.execute(f'INSERT INTO "{table_name}" (id, doc) VALUES (?, ?)', (record['id'], self._encode(record)))
+            row_id = record['id']
+        else:
+            row_id = self.conn.execute(f'INSERT INTO "{table_name}" (doc) VALUES (?)', (self._encode(record),)).lastrowid
+        return {**record, 'id': row_id}
+
+    def write_doc(self, table_name: str, row_id: int, record: dict):
+        self.conn.execute(f'UPDATE "{table_name}" SET doc = ? WHERE id = ?', (self._encode(record), row_id))
@@ -0,0 +1,129 @@
+"""
+Decodificación de respuestas CSV de PostgREST (Accept: text/csv) a DataFrames.
+
+PostgREST arma el CSV con la representación de texto de Postgres de cada fila:
+    - NULL -> campo vacío; booleanos -> t / f
+    - arreglos -> '{1,2}' / '{AGS,"SAN JOSE"}'; jsonb -> texto JSON
+    - campos entre comillas con '"' -> '""' y '\\' -> '\\\\'
+El DataFrame se arma directo del texto (read_csv, con pyarrow si está instalado) y con
+los dtypes de app/core/schemas.py, sin pasar por una lista de dicts por fila.
+"""
+import importlib.util
+import io
+
+import orjson
+import pandas as pd
+
+from app.core.logger import get_logger
+from app.core.schemas import ENCODED_COLUMNS, INT_ARRAY, JSON, STRING, TABLE_SCHEMAS, TEXT_ARRAY, apply_schema
+
+logger = get_logger(__name__)
+
+CSV_ENGINE = 'pyarrow' if importlib.util.find_spec('pyarrow') is not None else 'c'
+
+_PG_ARRAY_TO_JSON = str.maketrans('{}', '[]')
+
+def join_csv_pages(pages: list) -> str:
+    """Une las páginas (cada una con su encabezado) en un solo CSV con un encabezado."""
+    pages = [page for page in pages if page and page.strip()]
+    if not pages:
+        return ''
+    header, _, _ = pages[0].partition('\n')
+    bodies = [page.partition('\n')[2].strip('\n') for page in pages]
+    return header + '\n' + '\n'.join(body for body in bodies if body) + '\n'
+
+def parse_pg_array(text, element=str):
+    """
+    Texto de un arreglo de Postgres a lista: '{1,2}' -> [1, 2], '{}' -> [], NULL/NaN -> None.
+    Los elementos entre comillas pueden traer comas, espacios y escapes (\\" y \\\\).
+    """
+    if not isinstance(text, str):
+        return None
+    body = text.strip()[1:-1]
+    if not body:
+        return []
+    if '"' not in body:
+        return [None if item == 'NULL' else element(item) for item in body.split(',')]
+    return [None if item is None else element(item) for item in _split_quoted_array(body)]
+
+def _split_quoted_array(body: str) -> list:
+    """Elementos de un arreglo con comillas; NULL sin comillas es nulo, "NULL" es texto."""
+    items, chars = [], []
+    quoted = in_quotes = escaped = False
+    for char in body:
+        if escaped:
+            chars.append(char)
+            escaped = False
+        elif in_quotes and char == '\\':
+            escaped = True
+        elif char == '"':
+            in_quotes = not in_quotes
+            quoted = True
+        elif char == ',' and not in_quotes:
+            item = ''.join(chars)
+            items.append(None if item == 'NULL' and not quoted else item)
+            chars, quoted = [], False
+        else:
+            chars.append(char)
+    item = ''.join(chars)
+    items.append(None if item == 'NULL' and not quoted else item)
+    return items
+
+def _decode_column(values: pd.Series, kind: str) -> list:
+    """
+    int[] y jsonb se decodifican con UN solo orjson.loads por columna: '{1,2}' es JSON al cambiar
+    llaves por corchetes, y el texto de jsonb ya es JSON. text[] (catálogos, pocas filas) va por fila.
+    """
+    if kind in (INT_ARRAY, JSON):
+        texts = values.fillna('null').tolist()
+        if kind == INT_ARRAY:
+            texts = [text.translate(_PG_ARRAY_TO_JSON) for text in texts]
+            texts = [text.replace('NULL', 'null') if 'NULL' in text else text for text in texts]
+        try:
+            return orjson.loads('[' + ','.join(texts) + ']')
+        except orjson.JSONDecodeError:
+            if kind == JSON:
+                raise
+    if kind in (INT_ARRAY, TEXT_ARRAY):
+        element = int if kind == INT_ARRAY else str
+        return [parse_pg_array(value, element) for value in values.tolist()]
+    raise ValueError(f"Unknown encoded column kind: {kind}")
+
+def _read_csv(text: str, table_name: str) -> pd.DataFrame:
+    schema = TABLE_SCHEMAS.get(table_name, {})
+    encoded = ENCODED_COLUMNS.get(table_name, {})
+    # Texto y columnas codificadas se leen como str (sin inferir números: CP, RFC, '{1,2}')
+    dtype = {column: 'str' for column, kind in schema.items() if kind == STRING}
+    dtype.update({column: 'str' for column in encoded})
+    options = dict(dtype=dtype, true_values=['t'], false_values=['f'])
+
+    if CSV_ENGINE == 'pyarrow':
+        try:
+            return pd.read_csv(io.StringIO(text), engine='pyarrow', **options)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"  - ⚠️  pyarrow CSV parse failed for '{table_name}', using the C parser: {e}")
+    return pd.read_csv(io.StringIO(text), **options)
+
+def frame_from_csv(text: str, table_name: str) -> pd.DataFrame:
+    """
+    DataFrame desde el CSV de PostgREST, con los dtypes de la tabla.
+    Diferencias con get_all_from: '' y NULL llegan ambos como nulo, y los timestamps
+    quedan en el formato de texto de Postgres ('2024-01-01 10:00:00+00').
+    """
+    if not text or not text.strip():
+        return pd.DataFrame()
+
+    df = _read_csv(text, table_name)
+
+    # Los campos entre comillas traen '\' duplicado (formato de record de Postgres)
+    if '\\' in text:
+        for column in df.columns:
+            values = df[column]
+            if pd.api.types.is_string_dtype(values) and values.str.contains('\\', regex=False, na=False).any():
+                df[column] = values.str.replace('\\\\', '\\', regex=False)
+
+    for column, kind in ENCODED_COLUMNS.get(table_name, {}).items():
+        if column in df.columns:
+            df[column] = pd.Series(_decode_column(df[column], kind), index=df.index, dtype=object)
+
+    return apply_schema(df, table_name)
@@ -1,32 +1,64 @@
 import os
 from supabase import create_client, Client
+from postgrest import ReturnMethod
 import pandas as pd
 import numpy as np
 import unicodedata
 from dotenv import load_dotenv
+from app.core.logger import get_logger
+from app.core.metrics import span
+from app.core.schemas import TABLE_SCHEMAS, frame_from_records
+from app.core.connections.postgrest_csv import frame_from_csv, join_csv_pages
 
 load_dotenv()
+logger = get_logger(__name__)
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
 
-print("Supabase client initialized.")
+# DATA_BACKEND=local: SQLite con la misma interfaz (table()/auth) para benchmarks y desarrollo offline
+DATA_BACKEND = os.getenv("DATA_BACKEND", "supabase").lower()
+LOCAL_DB_PATH = os.getenv("LOCAL_DB_PATH", "data/local/supabase_local.sqlite3")
+# Formato con el que get_frame lee tablas completas: 'csv' (directo a DataFrame) o 'json'
+SUPABASE_FETCH_FORMAT = os.getenv("SUPABASE_FETCH_FORMAT", "csv").lower()
 
-def get_all_from(table_name: str):
+if DATA_BACKEND == "local":
+    from app.core.connections.local_backend import LocalClient
+    supabase = LocalClient(LOCAL_DB_PATH)
+    logger.info(f"Local data backend initialized ({LOCAL_DB_PATH}).")
+else:
+    supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+    logger.info("Supabase client initialized.")
+
+def _table_label(table_name: str) -> str:
+    """Etiqueta 'table' de las métricas: el nombre llega de la URL (/api/table/<nombre>), así que
+    solo las tablas conocidas (TABLE_SCHEMAS) tienen serie propia; las demás van a 'other'."""
+    return table_name if table_name in TABLE_SCHEMAS else 'other'
+
+def _select_all(table_name: str, after_id: int = None, count: str = None):
+    """select("*") de la tabla; con after_id solo las filas con id > after_id, en orden de id."""
+    query = supabase.table(table_name).select("*", count=count)
+    if after_id is not None:
+        query = query.gt('id', after_id).order('id')
+    return query
+
+@span('supabase.get_all_from')
+def get_all_from(table_name: str, after_id: int = None):
     """
     Recupera TODOS los registros de una tabla, superando el límite de 1000 de Supabase.
+    Con after_id, solo los que tienen id > after_id (ej. las filas nuevas desde la última corrida).
     """
     all_data = []
     page_size = 1000
     start = 0
     
-    print(f"Fetching full data from '{table_name}'...")
+    logger.debug("Fetching full data from '%s'...", table_name)
     
     while True:
         try:
             # Pedimos un rango: del 0 al 999, luego 1000 a 1999...
-            response = supabase.table(table_name).select("*").range(start, start + page_size - 1).execute()
+            with span('supabase.select_page', table=_table_label(table_name)):
+                response = _select_all(table_name, after_id).range(start, start + page_size - 1).execute()
             data = response.data
             
             if not data:
@@ -41,12 +73,58 @@ def get_all_from(table_name: str):
             start += page_size
             
         except Exception as e:
-            print(f"Error fetching data from {table_name} (range {start}): {e}")
+            logger.error(f"Error fetching data from {table_name} (range {start}): {e}")
             return {"error": f"Could not fetch data from {table_name}"}
             
-    print(f"  -> Total fetched from {table_name}: {len(all_data)}")
+    logger.debug("  -> Total fetched from %s: %d", table_name, len(all_data))
     return all_data
 
+@span('supabase.get_csv_from')
+def get_csv_from(table_name: str, page_size: int = 1000, after_id: int = None) -> str:
+    """
+    Como get_all_from pero pidiendo a PostgREST la salida en CSV (Accept: text/csv):
+    regresa un solo texto CSV (un encabezado) con todas las filas de la tabla (o las de id > after_id).
+    El primer request trae también el conteo exacto para saber cuántas páginas faltan.
+    """
+    first = _select_all(table_name, after_id, count="exact").range(0, page_size - 1).csv().execute()
+    pages = [first.data if isinstance(first.data, str) else '']
+    total = first.count
+
+    start = page_size
+    while (start < total) if total is not None else _csv_has_rows(pages[-1]):
+        with span('supabase.select_page', table=_table_label(table_name)):
+            response = _select_all(table_name, after_id).range(start, start + page_size - 1).csv().execute()
+        pages.append(response.data if isinstance(response.data, str) else '')
+        start += page_size
+
+    logger.debug("  -> Total CSV pages from %s: %d", table_name, len(pages))
+    return join_csv_pages(pages)
+
+def _csv_has_rows(page: str) -> bool:
+    return bool(page) and bool(page.partition('\n')[2].strip())
+
+def get_frame(table_name: str, fetch_format: str = None, after_id: int = None) -> pd.DataFrame:
+    """
+    La tabla completa como DataFrame, con los dtypes declarados en app/core/schemas.py
+    (categóricas, Int64, boolean...). Con after_id, solo las filas con id > after_id.
+
+    fetch_format (default SUPABASE_FETCH_FORMAT):
+      'csv'  -> PostgREST regresa CSV y el DataFrame se arma directo del texto (sin lista de dicts);
+                si falla, se reintenta con 'json'.
+      'json' -> get_all_from + DataFrame(records).
+    Lanza RuntimeError si no se pudo leer la tabla.
+    """
+    if (fetch_format or SUPABASE_FETCH_FORMAT) == 'csv':
+        try:
+            return frame_from_csv(get_csv_from(table_name, after_id=after_id), table_name)
+        except Exception as e:
+            logger.warning(f"  - ⚠️  CSV fetch failed for '{table_name}', falling back to JSON: {e}")
+
+    data = get_all_from(table_name, after_id=after_id)
+    if isinstance(data, dict) and 'error' in data:
+        raise RuntimeError(data['error'])
+    return frame_from_records(data, table_name)
+
 def _clean_value(v):
     """
     Función recursiva para limpiar valores individuales, listas o diccionarios
@@ -106,7 +184,7 @@ def get_municipalities_map():
     un mapa optimizado { 'NOMBRE LIMPIO': ID }.
     """
     try:
-        print("📡 Descargando catálogo de municipios...")
+        logger.info("📡 Descargando catálogo de municipios...")
         
         master_map = {}
         current_batch = 0
@@ -145,56 +223,77 @@ def get_municipalities_map():
                 
             current_batch += 1
 
-        print(f"✅ Mapa de municipios cargado y listo ({len(master_map)} referencias).")
+        logger.info(f"✅ Mapa de municipios cargado y listo ({len(master_map)} referencias).")
         return master_map
 
     except Exception as e:
-        print(f"❌ Error crítico descargando el catálogo de municipios: {e}")
+        logger.error(f"❌ Error crítico descargando el catálogo de municipios: {e}")
         return {}
 
-def upload_dataframe_to_supabase(df: pd.DataFrame, table_name: str, on_conflict_col: str = None):
+def dataframe_to_records(df: pd.DataFrame) -> list:
     """
-    Sube un DF a Supabase, limpiando recursivamente tipos NumPy y fechas.
+    Filas de 'df' tal como se mandan a Supabase: timestamps a texto y tipos NumPy / NaN
+    limpiados recursivamente (ver _clean_value).
     """
-    if df.empty:
-        print(f"❌ The DataFrame for {table_name} is empty. Nothing to upload.")
-        return
-
     # 1. Convertir Timestamps a string ISO
     df_formatted = df.copy()
     for col in df_formatted.select_dtypes(include=['datetime64[ns]', 'datetimetz']).columns:
         df_formatted[col] = df_formatted[col].dt.strftime('%Y-%m-%d %H:%M:%S')
 
     # 2. Convertir a lista de diccionarios
-    records_to_upload = df_formatted.to_dict(orient='records')
+    records = df_formatted.to_dict(orient='records')
 
     # 3. Limpieza PROFUNDA
-    final_records = []
-    for record in records_to_upload:
-        # IMPORTANTE: Asegúrate de tener importada o definida _clean_value
-        clean_rec = {k: _clean_value(v) for k, v in record.items()}
-        final_records.append(clean_rec)
+    return [{k: _clean_value(v) for k, v in record.items()} for record in records]
+
+def get_table_fingerprint(table_name: str, version_column: str = None) -> dict:
+    """
+    Versión barata de una tabla: {'rows': count exacto, 'max_id': id más alto}, en un solo
+    request de una fila (select id + count=exact, orden por id desc, limit 1).
+
+    Con version_column (ej. 'updated_at'), el orden es por esa columna y regresa
+    {'rows', 'version': su valor más alto}: también cambia cuando se edita una fila existente.
+    """
+    if version_column:
+        response = supabase.table(table_name).select(version_column, count='exact').order(
+            version_column, desc=True, nullsfirst=False).limit(1).execute()
+        return {'rows': response.count, 'version': response.data[0][version_column] if response.data else None}
+    response = supabase.table(table_name).select('id', count='exact').order('id', desc=True).limit(1).execute()
+    return {'rows': response.count, 'max_id': response.data[0]['id'] if response.data else None}
+
+def upload_dataframe_to_supabase(df: pd.DataFrame, table_name: str, on_conflict_col: str = None, returning_cols: list = None) -> list:
+    """
+    Sube un DF a Supabase, limpiando recursivamente tipos NumPy y fechas.
+
+    Con returning_cols (ej. ['id', 'clean_rfc']) PostgREST regresa solo esas columnas de las
+    filas insertadas/actualizadas (return=representation + select) y se devuelven como lista
+    de dicts; sin returning_cols se pide return=minimal y se devuelve [].
+    """
+    if df.empty:
+        logger.warning(f"❌ The DataFrame for {table_name} is empty. Nothing to upload.")
+        return []
 
-    print(f"Preparing to upload {len(final_records)} records to '{table_name}'...")
+    final_records = dataframe_to_records(df)
+
+    logger.info(f"Preparing to upload {len(final_records)} records to '{table_name}'...")
 
     try:
-        # 4. Subida con Upsert (CORREGIDO: Usamos final_records en ambos casos)
-        if on_conflict_col:
-            # Si hay columna de conflicto, la usamos
-            query = supabase.table(table_name).upsert(final_records, on_conflict=on_conflict_col)
-        else:
-            # Si no, upsert normal (por ID)
-            query = supabase.table(table_name).upsert(final_records)
-        
+        # 4. Subida con Upsert (si hay columna de conflicto la usamos; si no, upsert normal por ID)
+        returning = ReturnMethod.representation if returning_cols else ReturnMethod.minimal
+        query = supabase.table(table_name).upsert(final_records, on_conflict=on_conflict_col or '', returning=returning)
+        if returning_cols:
+            query = query.select(*returning_cols)
+
         data, count = query.execute()
-        print(f"✅ Successfully uploaded to '{table_name}'.")
+        logger.info(f"✅ Successfully uploaded to '{table_name}'.")
+        return (data[1] or []) if returning_cols else []
 
     except Exception as e:
-        print(f"❌ An error occurred during the upload to {table_name}: {e}")
+        logger.error(f"❌ An error occurred during the upload to {table_name}: {e}")
         # Debug avanzado
         if final_records:
-            print("   DEBUG: First record keys:", final_records[0].keys())
-
+            logger.debug(f"   DEBUG: First record keys: {list(final_records[0].keys())}")
+        return []
 
 
 def get_data_from_table(table_name, column_to_select):
@@ -202,7 +301,7 @@ def get_data_from_table(table_name, column_to_select):
     current_page = 0
     page_size = 1000
 
-    print(f"Iniciando descarga de {table_name}...")
+    logger.info(f"Iniciando descarga de {table_name}...")
 
     while True:
         start_index = current_page * page_size
@@ -214,12 +313,12 @@ def get_data_from_table(table_name, column_to_select):
         data = response.data
         all_data.extend(data)
 
-        print(f"Descargados {len(all_data)} registros de {table_name}")
+        logger.info(f"Descargados {len(all_data)} registros de {table_name}")
 
         if len(data) < page_size:
           break
 
         current_page += 1
 
-    print(f"descarga de {table_name} completada. Total: {len(all_data)} filas.")
+    logger.info(f"descarga de {table_name} completada. Total: {len(all_data)} filas.")
     return all_data
\ No newline at end of file
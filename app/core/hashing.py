@@ -0,0 +1,16 @@
+import hashlib
+import json
+
+def canonical_json(obj) -> str:
+    """
+    Serializa un objeto de forma canónica (llaves ordenadas, sin espacios),
+    para que dos objetos iguales produzcan SIEMPRE el mismo texto sin importar
+    el orden en que se armaron los diccionarios.
+    """
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+def canonical_hash(obj) -> str:
+    """
+    Hash SHA-256 (hex) del JSON canónico de un objeto.
+    """
+    return hashlib.sha256(canonical_json(obj).encode('utf-8')).hexdigest()
@@ -0,0 +1,119 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+# Todos los loggers del proyecto cuelgan de aquí ('app.api.routes', 'app.pipelines.etl.run', ...)
+ROOT_LOGGER_NAME = 'app'
+
+# ID de la petición actual (o '-' fuera de una petición, ej. en los pipelines)
+request_id_var = contextvars.ContextVar('request_id', default='-')
+
+_listener = None
+
+class RequestIdFilter(logging.Filter):
+    """Agrega el request_id actual a cada registro para poder correlacionar los logs de una petición."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """
+    Una línea JSON por registro. Cloud Run / Cloud Logging entiende 'severity' y 'message'.
+    """
+
+    def format(self, record):
+        entry = {
+            'severity': record.levelname,
+            'message': record.getMessage(),
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'time': self.formatTime(record),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def _build_formatter():
+    # En Cloud Run (K_SERVICE definido) usamos JSON; en local, texto legible.
+    default_format = 'json' if os.getenv('K_SERVICE') else 'text'
+    if os.getenv('LOG_FORMAT', default_format).lower() == 'json':
+        return JsonFormatter()
+    return logging.Formatter('%(asctime)s %(levelname)-7s [%(request_id)s] %(name)s: %(message)s')
+
+def setup_logging():
+    """
+    Configura (una sola vez) el logger raíz del proyecto:
+      - Nivel por LOG_LEVEL (default INFO).
+      - QueueHandler: el hilo que loguea solo encola; la escritura a stdout la hace
+        un QueueListener en su propio hilo, fuera del camino de la petición.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(_build_formatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    root.addHandler(queue_handler)
+    root.propagate = False
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # Vaciar la cola antes de salir (importante en los pipelines que terminan al acabar)
+    atexit.register(_listener.stop)
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger del módulo (usar con __name__). Configura el logging la primera vez."""
+    setup_logging()
+    # Scripts ejecutados directo (__main__) también deben colgar del logger raíz del proyecto
+    if name != ROOT_LOGGER_NAME and not name.startswith(ROOT_LOGGER_NAME + '.'):
+        name = f"{ROOT_LOGGER_NAME}.{name}"
+    return logging.getLogger(name)
+
+def log_payload(logger: logging.Logger, message: str, payload, sample_rate: float = None, max_chars: int = 2000):
+    """
+    Dump de un payload en nivel DEBUG, muestreado y truncado.
+    Solo se serializa si DEBUG está activo Y la muestra cae (LOG_PAYLOAD_SAMPLE_RATE, default 1%).
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if sample_rate is None:
+        sample_rate = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', 0.01))
+    if random.random() >= sample_rate:
+        return
+
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+    if len(text) > max_chars:
+        text = f"{text[:max_chars]}... ({len(text)} chars)"
+    logger.debug("%s %s", message, text)
+
+def init_request_logging(app):
+    """
+    Asigna un request_id a cada petición (X-Request-ID si viene del cliente / balanceador,
+    si no, uno nuevo) y lo regresa en la respuesta para poder rastrearla.
+    """
+
+    @app.before_request
+    def assign_request_id():
+        from flask import request
+        request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16]
+        request_id_var.set(request_id)
+
+    @app.after_request
+    def expose_request_id(response):
+        response.headers['X-Request-ID'] = request_id_var.get()
+        return response
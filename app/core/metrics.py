@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Buckets (segundos) por defecto de los clientes de Prometheus
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+class Histogram:
+    """
+    Histograma en memoria del proceso (un set de labels = un histograma).
+    Guarda conteos por bucket (no acumulados), suma y total; se acumulan al exportar.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # el último es +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+# { metric_name: { (('label', 'value'), ...): Histogram } }
+_registry = {}
+_registry_lock = threading.Lock()
+# Atajo a la familia de spans (la más usada) para no buscarla en cada span
+_spans = _registry.setdefault('span_duration_seconds', {})
+
+_HELP = {
+    'http_request_duration_seconds': 'Duración total de cada petición HTTP.',
+    'span_duration_seconds': 'Duración de secciones instrumentadas (auth, Supabase, transformaciones, serialización).',
+}
+
+# El método lo manda el cliente (cualquier token): fuera de estos va a 'other'
+_HTTP_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+def get_histogram(name: str, labels: tuple) -> Histogram:
+    family = _registry.get(name)
+    histogram = family.get(labels) if family is not None else None
+    if histogram is None:
+        with _registry_lock:
+            family = _registry.setdefault(name, {})
+            histogram = family.setdefault(labels, Histogram())
+    return histogram
+
+def observe(name: str, seconds: float, **labels):
+    if METRICS_ENABLED:
+        get_histogram(name, tuple(sorted(labels.items()))).observe(seconds)
+
+class span:
+    """
+    Mide una sección de código y la registra en 'span_duration_seconds{span="<name>", ...}'.
+
+        with span('supabase.get_all_from', table='companies'):
+            ...
+
+    También funciona como decorador: @span('auth.verify_token').
+    """
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, name: str, **labels):
+        if not METRICS_ENABLED:
+            self.histogram = None
+            return
+        key = (('span', name),) + tuple(sorted(labels.items())) if labels else (('span', name),)
+        # Camino rápido: el histograma ya existe (siempre, después de la primera vez)
+        self.histogram = _spans.get(key) or get_histogram('span_duration_seconds', key)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.histogram is not None:
+            self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+    def __call__(self, func):
+        from functools import wraps
+        histogram = self.histogram
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if histogram is not None:
+                    histogram.observe(time.perf_counter() - start)
+        return wrapper
+
+def _escape_label_value(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label_value(value)}"' for key, value in pairs) + '}'
+
+def render_prometheus() -> str:
+    """Exporta todos los histogramas en formato de texto de Prometheus (v0.0.4)."""
+    lines = []
+    with _registry_lock:
+        families = {name: dict(family) for name, family in _registry.items()}
+
+    for name, family in sorted(families.items()):
+        lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in sorted(family.items()):
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(list(histogram.buckets) + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return '\n'.join(lines) + '\n'
+
+def init_request_metrics(app):
+    """
+    Hooks before/after_request: duración total de cada petición por endpoint, método y status.
+    """
+    if not METRICS_ENABLED:
+        return
+
+    from flask import g, request
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_duration(response):
+        start = g.pop('request_start', None)
+        if start is not None:
+            observe(
+                'http_request_duration_seconds',
+                time.perf_counter() - start,
+                endpoint=request.endpoint or 'unknown',
+                method=request.method if request.method in _HTTP_METHODS else 'other',
+                status=response.status_code,
+            )
+        return response
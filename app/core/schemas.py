@@ -0,0 +1,112 @@
+import pandas as pd
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Tipos de columna para los DataFrames del ETL y de analytics.
+#   CATEGORY -> columnas de baja cardinalidad (sector, municipio, tier...): códigos int + categorías
+#   STRING   -> texto libre / llaves; en pandas 3 'str' usa Arrow si pyarrow está instalado
+#   'Int64' / 'boolean' -> enteros y booleanos nullable (sin pasar a float / object por los nulos)
+CATEGORY = 'category'
+STRING = 'str'
+
+TABLE_SCHEMAS = {
+    'companies': {
+        'id': 'Int64',
+        'clean_rfc': STRING,
+        'clean_legal_name': STRING,
+        'trade_name': STRING,
+        'sector': CATEGORY,
+        'main_activity': STRING,
+        'employee_count': 'Int64',
+        'full_address': STRING,
+        'postal_code': STRING,
+        'municipality_id': 'Int64',
+        'other_municipality': STRING,
+        'industrial_park_id': 'Int64',
+        'other_industrial_park': STRING,
+        'industrial_park': CATEGORY,
+        'procurement_tier': CATEGORY,
+        # Columnas que agrega analytics al cruzar con los catálogos
+        'municipality': CATEGORY,
+    },
+    'contacts': {
+        'id': 'Int64',
+        'clean_email': STRING,
+        'first_name': STRING,
+        'last_name': STRING,
+        'clean_position': CATEGORY,
+        'company_phone_e164': STRING,
+        'personal_phone_e164': STRING,
+    },
+    'responses': {
+        'id': 'Int64',
+        'company_id': 'Int64',
+        'contact_id': 'Int64',
+        'clean_rfc': STRING,
+        'clean_email': STRING,
+        'has_expansion_plans': 'boolean',
+        'has_engineering_area': 'boolean',
+        # Columnas que analytics trae de companies
+        'sector': CATEGORY,
+        'municipality': CATEGORY,
+    },
+    'municipality_catalog': {'id': 'Int64', 'municipality_name': STRING},
+    'industrial_parks_catalog': {'id': 'Int64', 'park_name': STRING},
+    'certifications_catalog': {'id': 'Int64'},
+}
+
+# Columnas que en el CSV de PostgREST llegan como texto de Postgres y hay que decodificar
+# (en get_all_from ya vienen como listas / dicts de Python)
+INT_ARRAY = 'int[]'
+TEXT_ARRAY = 'text[]'
+JSON = 'json'
+
+ENCODED_COLUMNS = {
+    'companies': {'certification_ids': INT_ARRAY},
+    'responses': {
+        'other_certifications': INT_ARRAY,
+        'iso_certification_ids': INT_ARRAY,
+        'additional_data': JSON,
+    },
+    'municipality_catalog': {'keywords': TEXT_ARRAY},
+    'industrial_parks_catalog': {'keywords': TEXT_ARRAY},
+    'certifications_catalog': {'search_keywords': TEXT_ARRAY},
+}
+
+# Tipos inferidos (pd.api.types.infer_dtype) que se pueden convertir sin cambiar valores
+_COMPATIBLE_INFERRED = {
+    STRING: {'string', 'empty'},
+    'Int64': {'integer', 'floating', 'mixed-integer-float', 'empty'},
+    'boolean': {'boolean', 'empty'},
+}
+
+def _is_dtype(series: pd.Series, dtype: str) -> bool:
+    if dtype == CATEGORY:
+        return isinstance(series.dtype, pd.CategoricalDtype)
+    return series.dtype == pd.api.types.pandas_dtype(dtype)
+
+def apply_schema(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    """
+    Convierte (in-place y regresa el mismo df) las columnas presentes de 'table_name' a su dtype.
+    Columnas ausentes o ya convertidas se ignoran; si una columna trae valores que no caben en
+    su dtype (ej. 12.5 en Int64, texto en boolean) se deja como está y se avisa.
+    """
+    schema = TABLE_SCHEMAS.get(table_name, {})
+    for column, dtype in schema.items():
+        if column not in df.columns or _is_dtype(df[column], dtype):
+            continue
+
+        compatible = _COMPATIBLE_INFERRED.get(dtype)
+        if compatible is not None and pd.api.types.infer_dtype(df[column], skipna=True) not in compatible:
+            logger.warning(f"  - ⚠️  Column '{table_name}.{column}' kept as {df[column].dtype} (values don't fit {dtype}).")
+            continue
+        try:
+            df[column] = df[column].astype(dtype)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"  - ⚠️  Column '{table_name}.{column}' kept as {df[column].dtype}: {e}")
+    return df
+
+def frame_from_records(records: list, table_name: str) -> pd.DataFrame:
+    """DataFrame desde una lista de dicts (ej. get_all_from) ya con los dtypes de la tabla."""
+    return apply_schema(pd.DataFrame(records), table_name)
@@ -1,21 +1,68 @@
+import numpy as np
 import pandas as pd
+from app.core.logger import get_logger
+from app.pipelines.analytics.array_columns import array_column, catalog_map
 
-def analyze_categorical(df: pd.DataFrame, column: str, limit: int = None, label_mapping: dict = None, fill_na: str = "SIN ESPECIFICAR", **kwargs):
+logger = get_logger(__name__)
+
+def _value_counts(series: pd.Series) -> pd.Series:
     """
-    Analiza una columna categórica con opciones de limpieza visual.
-    
-    Args:
-        limit: Top N resultados (ej. 10 para municipios).
-        label_mapping: Diccionario para renombrar valores (ej. {True: 'Sí', False: 'No'}).
-        fill_na: Texto para reemplazar valores vacíos.
+    value_counts() que da el mismo resultado para columnas categóricas que para object:
+    sin categorías con conteo 0 y, en empates, en orden de primera aparición.
+    Para categóricas cuenta con bincount sobre los códigos (sin hashear strings).
     """
-    if column not in df.columns:
-        return None
-    
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.value_counts()
+
+    codes = series.cat.codes.to_numpy()
+    codes = codes[codes >= 0]
+    counts = np.bincount(codes, minlength=len(series.cat.categories))
+    order = pd.unique(codes)  # categorías presentes, en orden de primera aparición
+    ranked = order[np.argsort(-counts[order], kind='stable')]
+    return pd.Series(counts[ranked], index=series.cat.categories.take(ranked), name='count')
+
+def _categorical_labels(series: pd.Series, fill_na: str, label_mapping: dict = None) -> pd.Series:
+    """
+    Pasos 1-3 de analyze_categorical para una columna categórica: trabaja sobre las
+    categorías (pocas) en vez de sobre las filas.
+    """
+    categories = series.cat.categories
+    # Textos vacíos ("", "  ") -> nulos, para que caigan en fill_na junto con los demás
+    if pd.api.types.is_string_dtype(categories) or categories.inferred_type == 'string':
+        blanks = categories[categories.astype(str).str.match(r'^\s*$')]
+        if len(blanks):
+            series = series.cat.remove_categories(blanks)
+    if series.hasnans:
+        if fill_na not in series.cat.categories:
+            series = series.cat.add_categories([fill_na])
+        series = series.fillna(fill_na)
+
+    if label_mapping:
+        current = pd.Series(series.cat.categories)
+        renamed = current.map(label_mapping).fillna(current)
+        if renamed.is_unique:
+            series = series.cat.rename_categories(renamed.tolist())
+        else:
+            # Dos valores terminan con la misma etiqueta: se resuelve como object
+            series = series.astype(object).map(label_mapping).fillna(series.astype(object))
+    return series
+
+def chart_labels(series: pd.Series, fill_na: str, label_mapping: dict = None) -> pd.Series:
+    """
+    Pasos 1-3 de analyze_categorical: nulos y textos vacíos -> fill_na, y label_mapping.
+    Es valor por valor, así que también sirve aplicada solo a los valores distintos (ver planner).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return _categorical_labels(series, fill_na, label_mapping)
+
+    # boolean / Int64 nullable: a object para poder rellenar con texto
+    if pd.api.types.is_extension_array_dtype(series.dtype) and not pd.api.types.is_string_dtype(series.dtype):
+        series = series.astype(object)
+
     # 1. Rellenar Nulos (Para que no salgan huecos o null)
     # Convertimos a string primero para evitar problemas de tipos mixtos, 
     # excepto si es booleano que queremos mapear.
-    series = df[column].fillna(fill_na)
+    series = series.fillna(fill_na)
     
     # 2. Reemplazar textos vacíos ("") que no son nulos pero están vacíos
     series = series.replace(r'^\s*$', fill_na, regex=True)
@@ -25,9 +72,24 @@ def analyze_categorical(df: pd.DataFrame, column: str, limit: int = None, label_
         # Map transforma los valores usando el diccionario. 
         # fillna(series) asegura que si un valor no está en el mapa, se mantenga el original.
         series = series.map(label_mapping).fillna(series)
+    return series
+
+def analyze_categorical(df: pd.DataFrame, column: str, limit: int = None, label_mapping: dict = None, fill_na: str = "SIN ESPECIFICAR", **kwargs):
+    """
+    Analiza una columna categórica con opciones de limpieza visual.
+    
+    Args:
+        limit: Top N resultados (ej. 10 para municipios).
+        label_mapping: Diccionario para renombrar valores (ej. {True: 'Sí', False: 'No'}).
+        fill_na: Texto para reemplazar valores vacíos.
+    """
+    if column not in df.columns:
+        return None
+
+    series = chart_labels(df[column], fill_na, label_mapping)
 
     # 4. Contar
-    counts = series.value_counts()
+    counts = _value_counts(series)
 
     # 5. Aplicar Límite (Cortar la cola larga)
     if limit:
@@ -44,7 +106,7 @@ def analyze_continuous_binned(df: pd.DataFrame, column: str, bins: int = 4, labe
         counts = binned_data.value_counts().sort_index()
         return {"labels": counts.index.astype(str).tolist(), "values": counts.values.tolist()}
     except Exception as e:
-        print(f"  - ⚠️  Could not bin column '{column}': {e}")
+        logger.warning(f"  - ⚠️  Could not bin column '{column}': {e}")
         return None
 
 def analyze_top_ranking(df: pd.DataFrame, label_col: str, value_col: str = None, 
@@ -70,7 +132,7 @@ def analyze_top_ranking(df: pd.DataFrame, label_col: str, value_col: str = None,
 
     # CASO 1: Ranking por Frecuencia (Conteo simple)
     if value_col is None or aggregation == 'count':
-        counts = df[label_col].value_counts().head(limit)
+        counts = _value_counts(df[label_col]).head(limit)
         return {"labels": counts.index.tolist(), "values": counts.values.tolist()}
 
     # CASO 2: Ranking por Suma (ej. Total de Empleados por Sector)
@@ -79,7 +141,7 @@ def analyze_top_ranking(df: pd.DataFrame, label_col: str, value_col: str = None,
         # Convertimos a numérico forzosamente para evitar errores, los no numéricos a NaN y luego 0
         df[value_col] = pd.to_numeric(df[value_col], errors='coerce').fillna(0)
         
-        grouped = df.groupby(label_col)[value_col].sum().sort_values(ascending=False).head(limit)
+        grouped = df.groupby(label_col, observed=True)[value_col].sum().sort_values(ascending=False).head(limit)
         return {"labels": grouped.index.astype(str).tolist(), "values": grouped.values.tolist()}
 
     # CASO 3: Raw (ya lo tenías)
@@ -94,49 +156,24 @@ def analyze_array_frequency(df: pd.DataFrame, column: str, top_n: int = 10, cata
     1. Explota listas de IDs.
     2. Cuenta frecuencias.
     3. (Opcional) Traduce IDs a Nombres usando un catálogo.
+
+    La columna se normaliza una vez por frame (array_columns.ArrayColumn: listas reales aunque
+    vengan como texto "['1', '2']") y el conteo es un bincount sobre los IDs factorizados.
     """
     if column not in df.columns:
         return None
-    
-    # 1. Limpieza y Validación de Arrays
-    # A veces Pandas lee los arrays de Postgres como strings "['1', '2']". 
-    # Aseguramos que sean listas reales.
-    def ensure_list(x):
-        if isinstance(x, list): return x
-        if isinstance(x, str): 
-            try:
-                # Truco sucio pero efectivo para limpiar formato string de array
-                clean = x.replace('{', '').replace('}', '').replace('[', '').replace(']', '').replace('"', '')
-                return [i.strip() for i in clean.split(',') if i.strip()]
-            except:
-                return []
-        return []
-
-    # Aplicamos limpieza
-    valid_rows = df.copy()
-    valid_rows[column] = valid_rows[column].apply(ensure_list)
-    valid_rows = valid_rows[valid_rows[column].map(len) > 0] # Filtrar vacíos
-
-    if valid_rows.empty:
-        return {"labels": [], "values": []}
 
-    # 2. Explotar (Unnest)
-    exploded_series = valid_rows[column].explode()
-    
-    # 3. Contar Frecuencias (Top N IDs)
-    counts = exploded_series.value_counts().head(top_n)
-    
+    # 1 y 2. Frecuencias (Top N IDs) sobre los elementos aplanados, sin copiar el frame
+    counts = array_column(df, column).value_counts().head(top_n)
+
     # --- FASE DE TRADUCCIÓN ---
     labels = counts.index.tolist() # Por defecto son los IDs
-    
+
     if catalog_df is not None:
-        # Crear diccionario de mapeo: { '14': 'ISO9000', '27': 'ISO9001' }
-        # Convertimos a string ambos lados para asegurar match
-        mapping = dict(zip(
-            catalog_df[map_id_col].astype(str), 
-            catalog_df[map_name_col]
-        ))
-        
+        # Diccionario { '14': 'ISO9000', '27': 'ISO9001' } (ids como texto en ambos lados),
+        # armado una sola vez por catálogo
+        mapping = catalog_map(catalog_df, map_id_col, map_name_col)
+
         # Traducir los labels
         # Si no encuentra el ID, pone "ID_Desconocido"
         labels = [mapping.get(str(x), f"ID {x}") for x in labels]
@@ -148,18 +185,58 @@ def analyze_array_populated_bool(df: pd.DataFrame, column: str, true_label="Cert
     Crea una métrica booleana basada en si un array/lista tiene elementos o está vacío.
     """
     if column not in df.columns: return None
-    
-    # Función auxiliar para checar si tiene datos
-    def has_data(x):
-        if isinstance(x, list): return len(x) > 0
-        if isinstance(x, str): return x.strip() not in ['[]', '{}', ''] # Check básico de string vacío
-        return False
-
-    # Calculamos
-    has_cert = df[column].apply(has_data)
+
+    # Calculamos (la bandera "tiene datos" ya viene de la normalización de la columna)
+    has_cert = pd.Series(array_column(df, column).populated)
     counts = has_cert.value_counts()
     
     # Formateamos etiquetas bonitas
     labels = [true_label if idx else false_label for idx in counts.index]
     
-    return {"labels": labels, "values": counts.values.tolist()}
\ No newline at end of file
+    return {"labels": labels, "values": counts.values.tolist()}
+
+# Periodos de las series de tiempo -> frecuencia de pandas (semanas de lunes a domingo)
+TIME_SERIES_PERIODS = {'week': 'W-SUN', 'month': 'M'}
+
+# Métrica -> (contador, denominador) de los rollups; sin denominador es un conteo, con él un %
+TIME_SERIES_METRICS = {
+    'responses': ('responses', None),
+    'expansion_rate': ('expansion_yes', 'expansion_answered'),
+    'engineering_rate': ('engineering_yes', 'engineering_answered'),
+    'certification_rate': ('certified', 'responses'),
+}
+
+def analyze_time_series(df: pd.DataFrame, metric: str = 'responses', period: str = 'month', last_n: int = None, **kwargs):
+    """
+    Serie de tiempo sobre los rollups por periodo de responses (ver rollups.py: una fila por
+    period + bucket con contadores aditivos, no las respuestas en sí).
+
+    Args:
+        metric: 'responses' (conteo) o una tasa en % ('expansion_rate', 'engineering_rate', 'certification_rate').
+        period: 'week' o 'month'.
+        last_n: Solo los últimos N periodos.
+    Los periodos sin respuestas salen en 0 (las tasas en None, sin dato).
+    """
+    if metric not in TIME_SERIES_METRICS or period not in TIME_SERIES_PERIODS or 'period' not in df.columns:
+        return None
+
+    rows = df[df['period'] == period]
+    if rows.empty:
+        return {"labels": [], "values": []}
+
+    # Índice continuo de periodos (del primero al último), rellenando los huecos con 0
+    counter, denominator = TIME_SERIES_METRICS[metric]
+    freq = TIME_SERIES_PERIODS[period]
+    rows = rows.set_index(pd.DatetimeIndex(pd.to_datetime(rows['bucket'])).to_period(freq))
+    rows = rows[[counter] if denominator is None else [counter, denominator]]
+    rows = rows.reindex(pd.period_range(rows.index.min(), rows.index.max(), freq=freq), fill_value=0)
+    if last_n:
+        rows = rows.iloc[-last_n:]
+
+    if denominator is None:
+        values = rows[counter].astype('int64').tolist()
+    else:
+        values = [round(100 * n / d, 1) if d else None for n, d in zip(rows[counter].tolist(), rows[denominator].tolist())]
+
+    label_format = '%Y-%m-%d' if period == 'week' else '%Y-%m'
+    return {"labels": [p.start_time.strftime(label_format) for p in rows.index], "values": values}
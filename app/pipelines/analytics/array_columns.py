@@ -0,0 +1,78 @@
+"""
+Columnas de arreglos (ej. companies.certification_ids) en formato CSR para analytics.
+
+Cada columna se normaliza UNA vez por DataFrame: offsets (n + 1) + valores aplanados, con los
+valores ya factorizados (códigos + únicos) y la bandera "tiene datos" por fila. Las gráficas
+(frecuencias, tasa de llenado, traducción con catálogo) trabajan sobre esos arreglos de NumPy en
+vez de copiar el frame y recorrer las filas con apply cada vez.
+
+El caché es por objeto DataFrame (weakref): se libera solo cuando el frame deja de existir.
+Supone que la columna no se modifica in-place después de la primera gráfica (así es en run.py).
+"""
+import weakref
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+_CACHE = {}
+
+def _cached(owner, key: tuple, build):
+    """build() una vez por (objeto, key); la entrada se borra cuando el objeto se libera."""
+    cache_key = (id(owner),) + key
+    entry = _CACHE.get(cache_key)
+    if entry is not None and entry[0]() is owner:
+        return entry[1]
+    value = build()
+    _CACHE[cache_key] = (weakref.ref(owner, lambda _, k=cache_key: _CACHE.pop(k, None)), value)
+    return value
+
+def _parse_text(text: str) -> list:
+    """Arreglo que llegó como texto ("['1', '2']", '{1,2}'): mismos elementos que antes daba ensure_list."""
+    clean = text.replace('{', '').replace('}', '').replace('[', '').replace(']', '').replace('"', '')
+    return [item.strip() for item in clean.split(',') if item.strip()]
+
+class ArrayColumn:
+    """
+    offsets / values: filas i -> values[offsets[i]:offsets[i + 1]] (lo mismo que explode, sin vacíos)
+    codes / uniques: values factorizados (código -1 = elemento nulo)
+    populated: la fila tiene datos (lista no vacía o texto distinto de '', '[]', '{}')
+    """
+
+    def __init__(self, series: pd.Series):
+        rows = series.tolist()
+        parsed = {}
+        items, populated = [], np.zeros(len(rows), dtype=bool)
+        for i, value in enumerate(rows):
+            if isinstance(value, list):
+                items.append(value)
+                populated[i] = len(value) > 0
+            elif isinstance(value, str):
+                if value not in parsed:
+                    parsed[value] = _parse_text(value)
+                items.append(parsed[value])
+                populated[i] = value.strip() not in ('[]', '{}', '')
+            else:
+                items.append(())
+
+        lengths = np.fromiter(map(len, items), dtype=np.int64, count=len(items))
+        self.offsets = np.concatenate(([0], np.cumsum(lengths)))
+        self.values = np.fromiter(chain.from_iterable(items), dtype=object, count=int(self.offsets[-1]))
+        self.populated = populated
+        self.codes, self.uniques = pd.factorize(self.values, use_na_sentinel=True)
+
+    def value_counts(self) -> pd.Series:
+        """Igual que series.explode().value_counts(): conteo descendente, empates en orden de primera aparición."""
+        valid = self.codes[self.codes >= 0]
+        counts = np.bincount(valid, minlength=len(self.uniques))
+        result = pd.Series(counts, index=pd.Index(self.uniques, dtype=object), name='count')
+        return result.sort_values(ascending=False, kind="stable")
+
+def array_column(df: pd.DataFrame, column: str) -> ArrayColumn:
+    """ArrayColumn de df[column], normalizada una sola vez por frame."""
+    return _cached(df, ('array', column), lambda: ArrayColumn(df[column]))
+
+def catalog_map(catalog_df: pd.DataFrame, id_col: str, name_col: str) -> dict:
+    """{str(id): nombre} del catálogo, armado una sola vez por frame y par de columnas."""
+    return _cached(catalog_df, ('catalog', id_col, name_col),
+                   lambda: dict(zip(catalog_df[id_col].astype(str), catalog_df[name_col])))
@@ -0,0 +1,337 @@
+"""
+Planner de agregaciones para las gráficas de DASHBOARDS_CONFIG.
+
+En vez de que cada gráfica haga su propio fillna / replace / map / value_counts (analyze_categorical)
+o filtro + groupby (analyze_top_ranking) sobre su DataFrame, el planner junta las gráficas por
+fuente y, por cada columna de etiquetas, hace UN bincount sobre la llave (código de la etiqueta,
+estado de filtros) que sirve para todas a la vez: conteos, sumas y primera aparición de cada valor.
+Cada gráfica se arma después con su rebanada (los estados de su filtro) sin volver a tocar las filas.
+
+Da exactamente lo mismo que las funciones originales (mismo orden, empates por primera aparición,
+mismos tipos). Lo que no sabe resolver (raw, sumas sobre floats, columnas inexistentes...)
+se queda fuera y run.py lo calcula como siempre.
+
+Fan-out ('fan_out' en el config): la misma gráfica para cada valor de una dimensión (municipio,
+sector...). La dimensión entra como un dígito más del estado de filtros, así que todas sus
+variantes salen del mismo bincount; cada variante es solo otra rebanada de estados.
+"""
+import inspect
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from app.core.logger import get_logger
+from app.pipelines.analytics.analysis_functions import analyze_array_frequency, analyze_categorical, analyze_top_ranking, chart_labels
+from app.pipelines.analytics.array_columns import array_column, catalog_map
+
+logger = get_logger(__name__)
+
+# Tope de estados de filtro por fuente (columnas de la tabla de conteos por etiqueta)
+MAX_FILTER_STATES = 4096
+
+# Patrón (like de PostgREST, '_' escapado) de los chart_slug de las filas de variantes
+VARIANT_SLUG_PATTERN = '*\\_\\_by\\_*'
+
+def variant_slug(chart_slug: str, dimension: str) -> str:
+    """chart_slug de la fila que guarda las variantes de una gráfica por 'dimension'."""
+    return f"{chart_slug}__by_{dimension}"
+
+def fan_out_dimensions(chart: dict, dashboard: dict = None) -> list:
+    """
+    Dimensiones de fan-out de una gráfica: las suyas ('fan_out') o, si no trae, las de su dashboard.
+    Se omite la columna que la gráfica ya grafica (municipios por municipio no dice nada).
+    """
+    dimensions = chart.get('fan_out', (dashboard or {}).get('fan_out', []))
+    own = {chart['params'].get('column'), chart['params'].get('label_col')}
+    return [dim for dim in dimensions if dim not in own]
+
+def _default(func, name: str):
+    return inspect.signature(func).parameters[name].default
+
+def _chart_spec(chart: dict, df: pd.DataFrame, data_sources: dict):
+    """Qué necesita la gráfica (dimensión, filtro, medida...) o None si el planner no la resuelve."""
+    func, params = chart['analysis_type'], chart['params']
+
+    if func is analyze_categorical:
+        if params.get('column') not in df.columns:
+            return None
+        return {
+            'kind': 'labels', 'dim': params['column'], 'filter': None, 'exclude': None, 'value_col': None,
+            'limit': params.get('limit'),
+            'fill_na': params.get('fill_na', _default(analyze_categorical, 'fill_na')),
+            'label_mapping': params.get('label_mapping'),
+        }
+
+    if func is analyze_top_ranking:
+        label_col, value_col = params.get('label_col'), params.get('value_col')
+        aggregation = params.get('aggregation', _default(analyze_top_ranking, 'aggregation'))
+        limit = params.get('limit', _default(analyze_top_ranking, 'limit'))
+        if label_col not in df.columns or not isinstance(limit, int):
+            return None
+        if value_col is None or aggregation == 'count':
+            kind = 'count'
+        elif aggregation == 'sum' and value_col in df.columns:
+            kind = 'sum'
+        else:
+            return None
+
+        filter_col, filter_value = params.get('filter_col'), params.get('filter_value')
+        spec_filter = None
+        if filter_col and filter_col in df.columns and filter_value is not None:
+            try:
+                hash(filter_value)
+            except TypeError:
+                return None
+            spec_filter = (filter_col, filter_value)
+        return {
+            'kind': kind, 'dim': label_col, 'filter': spec_filter, 'exclude': params.get('exclude_value'),
+            'value_col': value_col if kind == 'sum' else None, 'limit': limit,
+        }
+
+    if func is analyze_array_frequency:
+        top_n = params.get('top_n', _default(analyze_array_frequency, 'top_n'))
+        if params.get('column') not in df.columns or not isinstance(top_n, int) or top_n <= 0:
+            return None
+        # Igual que run.py: el catálogo solo se usa si la fuente existe
+        catalog_df = data_sources.get(chart.get('catalog_source_key')) if 'catalog_source_key' in chart else None
+        return {
+            'kind': 'array', 'dim': params['column'], 'filter': None, 'exclude': None, 'value_col': None,
+            'limit': top_n,
+            'catalog': None if catalog_df is None else (
+                catalog_df, params.get('map_id_col', _default(analyze_array_frequency, 'map_id_col')),
+                params.get('map_name_col', _default(analyze_array_frequency, 'map_name_col'))),
+        }
+
+    return None
+
+def _factorize(series: pd.Series) -> tuple:
+    """Códigos por fila (0 = nulo, i + 1 = i-ésimo valor) y los valores distintos."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype(np.int64) + 1, series.cat.categories
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    return codes.astype(np.int64) + 1, uniques
+
+def _sum_measure(series: pd.Series):
+    """Valores de la suma (como analyze_top_ranking) y su dtype; None si no son enteros (bincount no suma exacto floats)."""
+    values = pd.to_numeric(series, errors='coerce').fillna(0)
+    if values.dtype not in (np.dtype(np.int64), pd.Int64Dtype()):
+        return None
+    return values.to_numpy(dtype=np.float64), values.dtype
+
+def _ranked(labels: list, counts: np.ndarray, firsts: np.ndarray, limit) -> dict:
+    """Orden de _value_counts: conteo descendente, empates por primera aparición."""
+    order = np.lexsort((firsts, -counts))
+    if limit:
+        order = order[:limit]
+    return {"labels": [labels[i] for i in order], "values": counts[order].tolist()}
+
+def _build_array_chart(spec: dict, array, counts, firsts, states) -> dict:
+    """analyze_array_frequency: conteo por ID (sin nulos), top_n y traducción con el catálogo."""
+    if not len(states):
+        return {"labels": [], "values": []}
+    counts = counts[:, states].sum(axis=1)
+    firsts = firsts[:, states].min(axis=1)
+    present = np.flatnonzero(counts)
+    result = _ranked([array.uniques[i] for i in present], counts[present], firsts[present], spec['limit'])
+    if spec['catalog'] is not None:
+        mapping = catalog_map(*spec['catalog'])
+        result['labels'] = [mapping.get(str(x), f"ID {x}") for x in result['labels']]
+    return result
+
+def _build_chart(spec: dict, series: pd.Series, counts, firsts, sums, states) -> dict:
+    if not len(states):
+        return {"labels": [], "values": []}  # filtro por un valor que no existe: frame vacío
+    counts = counts[:, states].sum(axis=1)
+    firsts = firsts[:, states].min(axis=1)
+    present = np.flatnonzero(counts)
+    if spec['kind'] != 'labels':
+        present = present[present > 0]  # value_counts / groupby no cuentan los nulos
+    if not len(present):
+        return {"labels": [], "values": []}
+
+    # Un valor representativo por código (su primera fila): conserva el dtype de la columna
+    values = series.iloc[firsts[present]]
+
+    if spec['kind'] == 'labels':
+        # Los pasos 1-3 de analyze_categorical son valor por valor: se aplican a los distintos
+        # y los que terminan con la misma etiqueta se suman
+        totals, first_seen = {}, {}
+        for label, count, first in zip(chart_labels(values, spec['fill_na'], spec['label_mapping']).tolist(),
+                                       counts[present], firsts[present]):
+            totals[label] = totals.get(label, 0) + int(count)
+            first_seen[label] = min(first_seen.get(label, first), first)
+        labels = list(totals)
+        return _ranked(labels, np.array([totals[l] for l in labels], dtype=np.int64),
+                       np.array([first_seen[l] for l in labels]), spec['limit'])
+
+    labels = values.tolist()
+    if spec['exclude'] is not None:
+        keep = [i for i, label in enumerate(labels) if label != spec['exclude']]
+        present, labels = present[keep], [labels[i] for i in keep]
+        if not len(present):
+            return {"labels": [], "values": []}
+
+    if spec['kind'] == 'count':
+        return _ranked(labels, counts[present], firsts[present], spec['limit'])
+
+    # Suma: misma Serie que daría groupby(label).sum() (ordenada por etiqueta) y mismo sort_values
+    weights, dtype = sums
+    totals = weights[:, states].sum(axis=1)[present]
+    grouped = pd.Series(np.rint(totals).astype(np.int64), index=pd.Index(labels)).astype(dtype)
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        grouped = grouped.sort_index()  # las categóricas ya van en orden de categoría (códigos)
+    grouped = grouped.sort_values(ascending=False).head(spec['limit'])
+    return {"labels": grouped.index.astype(str).tolist(), "values": grouped.values.tolist()}
+
+def _filter_states(df: pd.DataFrame, charts: list) -> tuple:
+    """
+    Estado de filtros de cada fila como número en base mixta: un dígito por columna de filtro,
+    0 = no coincide con ninguno de los valores pedidos, j + 1 = coincide con el j-ésimo.
+    Los filtros de igualdad sobre la misma columna son excluyentes, así que 12 dashboards
+    por sector cuestan 13 estados y no 2^12. Las columnas de fan-out entran con todos sus
+    valores (dígito = código de _factorize, 0 = nulo).
+    Regresa (estado por fila, n_estados, {filtro: estados}, {columna de fan-out: [(valor, estados)]}).
+    """
+    values_by_column = defaultdict(dict)
+    for _, spec in charts:
+        if spec['filter'] is not None:
+            column, value = spec['filter']
+            values_by_column[column].setdefault(value, len(values_by_column[column]) + 1)
+    fan_out_columns = list(dict.fromkeys(dim for _, spec in charts for dim in spec['fan_out']))
+
+    # Primero los filtros (gráficas globales), luego el fan-out
+    digits = {}
+    for column, values in values_by_column.items():
+        if column in fan_out_columns:
+            continue
+        digit = np.zeros(len(df), dtype=np.int64)
+        for value, j in values.items():
+            digit[(df[column] == value).fillna(False).to_numpy(dtype=bool)] = j
+        digits[column] = (digit, len(values) + 1)
+    fan_out_values = {}
+    for column in fan_out_columns:
+        codes, uniques = _factorize(df[column])
+        fan_out_values[column] = (list(uniques), np.bincount(codes, minlength=len(uniques) + 1)[1:])
+        digits[column] = (codes, len(uniques) + 1)
+
+    state = np.zeros(len(df), dtype=np.int64)
+    radix, radices = 1, {}
+    for column, (digit, base) in digits.items():
+        if radix * base > MAX_FILTER_STATES:
+            continue  # sus gráficas (o variantes) se calculan aparte
+        state += digit * radix
+        radices[column] = (radix, base)
+        radix *= base
+
+    all_states = np.arange(radix)
+
+    def states_where(column: str, j: int) -> np.ndarray:
+        column_radix, base = radices[column]
+        return np.flatnonzero((all_states // column_radix) % base == j)
+
+    filter_states = {}
+    for column, values in values_by_column.items():
+        if column not in radices:
+            continue
+        if column in fan_out_values:
+            # Columna de filtro y de fan-out: el filtro se resuelve contra sus valores
+            positions = {value: j for j, value in enumerate(fan_out_values[column][0])}
+            for value in values:
+                j = positions.get(value)
+                filter_states[(column, value)] = (states_where(column, j + 1) if j is not None
+                                                  else np.array([], dtype=np.int64))
+        else:
+            for value, j in values.items():
+                filter_states[(column, value)] = states_where(column, j)
+
+    fan_out_states = {
+        column: [(value, states_where(column, j + 1)) for j, (value, rows) in enumerate(zip(*fan_out_values[column]))
+                 if rows > 0]
+        for column in fan_out_columns if column in radices
+    }
+    return state, radix, filter_states, fan_out_states
+
+def _run_source(df: pd.DataFrame, charts: list) -> dict:
+    """Todas las gráficas de una fuente (y sus variantes): un bincount por columna de etiquetas (y medida)."""
+    state, n_states, filter_states, fan_out_states = _filter_states(df, charts)
+    charts = [(slug, spec) for slug, spec in charts if spec['filter'] is None or spec['filter'] in filter_states]
+    n_rows = len(df)
+
+    results = {}
+    by_dim = defaultdict(list)
+    for slug, spec in charts:
+        by_dim[(spec['dim'], spec['kind'] == 'array')].append((slug, spec))
+
+    for (dim, is_array), dim_charts in by_dim.items():
+        if is_array:
+            # Columna de arreglos: la llave va por elemento (estado de la fila a la que pertenece)
+            array = array_column(df, dim)
+            element_rows = np.repeat(np.arange(n_rows, dtype=np.int64), np.diff(array.offsets))
+            valid = np.flatnonzero(array.codes >= 0)
+            key = array.codes[valid].astype(np.int64) * n_states + state[element_rows[valid]]
+            size = len(array.uniques) * n_states
+            counts = np.bincount(key, minlength=size).reshape(-1, n_states)
+            firsts = np.full(size, len(array.codes), dtype=np.int64)
+            np.minimum.at(firsts, key, valid)
+            firsts = firsts.reshape(-1, n_states)
+            measures = {}
+
+            def build(spec, states):
+                return _build_array_chart(spec, array, counts, firsts, states)
+        else:
+            series = df[dim]
+            codes, uniques = _factorize(series)
+            key = codes * n_states + state
+            size = (len(uniques) + 1) * n_states
+            counts = np.bincount(key, minlength=size).reshape(-1, n_states)
+            firsts = np.full(size, n_rows, dtype=np.int64)
+            np.minimum.at(firsts, key, np.arange(n_rows, dtype=np.int64))
+            firsts = firsts.reshape(-1, n_states)
+
+            measures = {}
+            for value_col in {spec['value_col'] for _, spec in dim_charts if spec['value_col']}:
+                measure = _sum_measure(df[value_col])
+                if measure is not None:
+                    weights, dtype = measure
+                    measures[value_col] = (np.bincount(key, weights=weights, minlength=size).reshape(-1, n_states), dtype)
+
+            def build(spec, states):
+                return _build_chart(spec, series, counts, firsts, measures.get(spec['value_col']), states)
+
+        for slug, spec in dim_charts:
+            if spec['value_col'] and spec['value_col'] not in measures:
+                continue
+            states = np.arange(n_states) if spec['filter'] is None else filter_states[spec['filter']]
+            results[slug] = build(spec, states)
+            # Variantes: la misma gráfica restringida a los estados de cada valor de la dimensión
+            for column in spec['fan_out']:
+                if column in fan_out_states:
+                    results[variant_slug(slug, column)] = {
+                        str(value): build(spec, np.intersect1d(states, value_states, assume_unique=True))
+                        for value, value_states in fan_out_states[column]
+                    }
+    return results
+
+def plan_charts(data_sources: dict, chart_configs: list) -> dict:
+    """
+    Calcula de una vez las gráficas de analyze_categorical / analyze_top_ranking / analyze_array_frequency
+    que se pueden agrupar por fuente. Regresa {chart_slug: analysis_result}; las que no están se calculan
+    aparte. Las variantes de fan-out quedan en {variant_slug(chart_slug, dim): {str(valor): analysis_result}}.
+    """
+    by_source = defaultdict(list)
+    for chart in chart_configs:
+        df = data_sources.get(chart['data_source_key'])
+        spec = _chart_spec(chart, df, data_sources) if df is not None else None
+        if spec is not None:
+            spec['fan_out'] = [dim for dim in chart.get('fan_out', []) if dim in df.columns]
+            by_source[chart['data_source_key']].append((chart['slug'], spec))
+
+    results = {}
+    for source_key, charts in by_source.items():
+        try:
+            results.update(_run_source(data_sources[source_key], charts))
+        except Exception as e:
+            logger.warning(f"  - ⚠️  Planner could not aggregate '{source_key}', charts computed one by one: {e}")
+    logger.info(f"  - Planner: {len(results)} charts from {len(by_source)} source scans.")
+    return results
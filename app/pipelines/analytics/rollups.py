@@ -0,0 +1,185 @@
+"""
+Rollups incrementales del historial de responses para las gráficas de tendencia (analyze_time_series).
+
+Por cada periodo (semana / mes de response_date, en UTC) se guardan contadores aditivos:
+respuestas, planes de expansión (sí / contestadas), área de ingeniería (sí / contestadas) y
+respuestas con alguna certificación. En cada corrida solo se piden a la BD las respuestas nuevas
+(id > último id procesado) y sus contadores se suman a los periodos que tocan: el costo crece con
+los datos nuevos, no con el historial. Si la tabla no cambió (misma huella) no se pide nada.
+
+Se reconstruye desde cero si no hay store, si cambió ROLLUP_VERSION, si las cuentas no cuadran
+(filas en BD != filas procesadas + nuevas, ej. se borraron respuestas), si el ETL editó respuestas
+existentes después de la última reconstrucción (el upsert por (company_id, response_date) actualiza
+la fila en su lugar; ver rows_edited_at en source_snapshots) o, para ediciones que el ETL no reporta,
+si la reconstrucción tiene más de ANALYTICS_ROLLUP_MAX_AGE_HOURS. Borrar el archivo del store
+también fuerza la reconstrucción.
+"""
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from app.core.connections import supabase_service
+from app.core.logger import get_logger
+from app.pipelines.analytics.analysis_functions import TIME_SERIES_PERIODS
+from app.pipelines.analytics.array_columns import array_column
+from app.pipelines.source_snapshots import SourceSnapshots
+
+logger = get_logger(__name__)
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+ANALYTICS_ROLLUP_DIR = os.getenv('ANALYTICS_ROLLUP_DIR', os.path.join(_REPO_ROOT, 'data', 'outputs', 'rollups'))
+ANALYTICS_ROLLUP_MAX_AGE_HOURS = float(os.getenv('ANALYTICS_ROLLUP_MAX_AGE_HOURS', 24))
+
+# Cambiar cuando cambien los contadores o los periodos: el store anterior se reconstruye
+ROLLUP_VERSION = 1
+ROLLUP_FILE = 'responses_rollup.json'
+
+ROLLUP_COUNTERS = ['responses', 'expansion_yes', 'expansion_answered', 'engineering_yes', 'engineering_answered', 'certified']
+
+# Columnas de arreglos de responses que cuentan como "tiene certificación"
+_CERTIFICATION_COLUMNS = ['iso_certification_ids', 'other_certifications']
+
+def _row_counters(df: pd.DataFrame) -> pd.DataFrame:
+    """Contadores (0/1) de cada respuesta, para sumarlos por periodo."""
+    counters = pd.DataFrame({'responses': np.ones(len(df), dtype=np.int64)}, index=df.index)
+    for prefix, column in (('expansion', 'has_expansion_plans'), ('engineering', 'has_engineering_area')):
+        if column in df.columns:
+            values = df[column].astype('boolean')
+        else:
+            values = pd.Series(pd.NA, index=df.index, dtype='boolean')
+        counters[f'{prefix}_yes'] = values.fillna(False).astype(np.int64)
+        counters[f'{prefix}_answered'] = values.notna().astype(np.int64)
+
+    certified = np.zeros(len(df), dtype=bool)
+    for column in _CERTIFICATION_COLUMNS:
+        if column in df.columns:
+            certified |= array_column(df, column).populated
+    counters['certified'] = certified.astype(np.int64)
+    return counters
+
+def _bucket_counters(df: pd.DataFrame) -> dict:
+    """{periodo: {inicio del bucket 'YYYY-MM-DD': {contador: n}}} de un lote de respuestas."""
+    if df.empty or 'response_date' not in df.columns:
+        return {}
+    dates = pd.to_datetime(df['response_date'], errors='coerce', utc=True, format='ISO8601').dt.tz_localize(None)
+    valid = dates.notna().to_numpy()
+    if not valid.any():
+        return {}
+    dates = dates[valid]
+    counters = _row_counters(df)[valid]
+
+    batch = {}
+    for period, freq in TIME_SERIES_PERIODS.items():
+        buckets = dates.dt.to_period(freq).dt.start_time.dt.strftime('%Y-%m-%d').to_numpy()
+        grouped = counters.groupby(buckets).sum()
+        batch[period] = {
+            bucket: {counter: int(value) for counter, value in zip(grouped.columns, row)}
+            for bucket, row in zip(grouped.index, grouped.to_numpy())
+        }
+    return batch
+
+def _merge(buckets: dict, batch: dict) -> int:
+    """Suma los contadores del lote a los buckets guardados (in-place). Regresa cuántos buckets tocó."""
+    touched = 0
+    for period, period_batch in batch.items():
+        stored = buckets.setdefault(period, {})
+        for bucket, counters in period_batch.items():
+            current = stored.setdefault(bucket, dict.fromkeys(ROLLUP_COUNTERS, 0))
+            for counter, value in counters.items():
+                current[counter] = current.get(counter, 0) + value
+            touched += 1
+    return touched
+
+def _empty_store() -> dict:
+    return {'version': ROLLUP_VERSION, 'rows': 0, 'max_id': None, 'buckets': {},
+            'built_at': datetime.now(timezone.utc).isoformat()}
+
+def _rebuild_reason(store: dict):
+    """Por qué el store ya no sirve como base incremental (None si sirve)."""
+    if not store.get('built_at'):
+        return "no build time"
+    built_at = datetime.fromisoformat(store['built_at'])
+    age_hours = (datetime.now(timezone.utc) - built_at).total_seconds() / 3600
+    if age_hours > ANALYTICS_ROLLUP_MAX_AGE_HOURS:
+        return f"last rebuild is {age_hours:.1f}h old"
+    edited_at = SourceSnapshots().rows_edited_at('responses')
+    if edited_at is not None and edited_at > built_at:
+        return "the ETL updated existing responses"
+    return None
+
+def _load_store(store_dir: str):
+    try:
+        with open(os.path.join(store_dir, ROLLUP_FILE), 'r', encoding='utf-8') as f:
+            store = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return store if store.get('version') == ROLLUP_VERSION else None
+
+def _save_store(store: dict, store_dir: str):
+    """Escritura atómica (como el manifiesto de snapshots)."""
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, ROLLUP_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(store, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def rollup_frame(store: dict) -> pd.DataFrame:
+    """Los buckets del store como DataFrame (period, bucket, contadores...): la fuente de analyze_time_series."""
+    rows = [
+        {'period': period, 'bucket': bucket, **counters}
+        for period, buckets in (store or {}).get('buckets', {}).items()
+        for bucket, counters in sorted(buckets.items())
+    ]
+    return pd.DataFrame(rows, columns=['period', 'bucket'] + ROLLUP_COUNTERS)
+
+def update_responses_rollup(store_dir: str = None) -> pd.DataFrame:
+    """
+    Pone al día el store con las respuestas nuevas y regresa los rollups (ver rollup_frame).
+    Si no se puede leer la BD, regresa lo que ya estaba guardado (None si no hay nada: sin datos
+    de tendencias, las gráficas no se generan en vez de subirse vacías).
+    """
+    store_dir = store_dir or ANALYTICS_ROLLUP_DIR
+    stored = _load_store(store_dir)
+    store = stored
+    if store is not None:
+        reason = _rebuild_reason(store)
+        if reason:
+            logger.info(f"  - Rebuilding rollups: {reason}.")
+            store = None
+    try:
+        fingerprint = supabase_service.get_table_fingerprint('responses')
+        if store is not None and (store['rows'], store['max_id']) == (fingerprint['rows'], fingerprint['max_id']):
+            logger.info(f"  - Rollups up to date ({store['rows']} responses). Nothing to fetch.")
+            return rollup_frame(store)
+
+        mode = 'incremental'
+        new_rows = None
+        if store is not None:
+            new_rows = supabase_service.get_frame('responses', after_id=store['max_id'])
+            if store['rows'] + len(new_rows) != fingerprint['rows']:
+                logger.info(f"  - Responses changed beyond new rows ({store['rows']} + {len(new_rows)} vs "
+                            f"{fingerprint['rows']} in DB). Rebuilding rollups.")
+                new_rows = None
+        if new_rows is None:
+            store, mode = _empty_store(), 'full rebuild'
+            new_rows = supabase_service.get_frame('responses')
+    except Exception as e:
+        if stored is None:
+            logger.warning(f"  - ⚠️  Could not build rollups and there are none stored: {e}")
+            return None
+        logger.warning(f"  - ⚠️  Could not update rollups, using stored ones: {e}")
+        return rollup_frame(stored)
+
+    touched = _merge(store['buckets'], _bucket_counters(new_rows))
+    store['rows'] += len(new_rows)
+    if len(new_rows):
+        store['max_id'] = int(max(store['max_id'] or 0, new_rows['id'].max()))
+    store['updated_at'] = datetime.now(timezone.utc).isoformat()
+    _save_store(store, store_dir)
+    logger.info(f"  - Rollups ({mode}): {len(new_rows)} responses, {touched} buckets updated.")
+    return rollup_frame(store)
@@ -1,8 +1,31 @@
 import pandas as pd
 import json
 from app.core.connections import supabase_service
+from app.core.hashing import canonical_hash
+from app.core.schemas import apply_schema
+from app.pipelines.source_snapshots import SourceSnapshots
+from app.pipelines.analytics.planner import VARIANT_SLUG_PATTERN, fan_out_dimensions, plan_charts, variant_slug
+from app.pipelines.analytics.rollups import update_responses_rollup
+from app.core.logger import get_logger
 from config.dashboards_config import DASHBOARDS_CONFIG
 
+logger = get_logger(__name__)
+
+# Columnas de 'charts' que escribe este proceso. Son las que entran en el hash de contenido:
+# si ninguna cambió, la fila no se vuelve a escribir (y conserva su 'updated_at').
+CHART_CONTENT_FIELDS = ['dashboard_id', 'title', 'chart_type', 'chart_data', 'position', 'is_active']
+
+# Columnas de cada tabla fuente que usan los joins y las gráficas. Son las únicas que se leen
+# del snapshot del ETL (o que se conservan al leer de Supabase, para que ambos caminos den lo mismo).
+ANALYTICS_SOURCE_COLUMNS = {
+    'companies': ['id', 'clean_rfc', 'trade_name', 'sector', 'employee_count', 'procurement_tier',
+                  'municipality_id', 'industrial_park_id', 'industrial_park', 'certification_ids'],
+    'responses': ['company_id', 'has_expansion_plans', 'has_engineering_area'],
+    'municipality_catalog': ['id', 'municipality_name'],
+    'industrial_parks_catalog': ['id', 'park_name'],
+    'certifications_catalog': ['id', 'acronym', 'category'],
+}
+
 # ==============================================================================
 #  2. FORMATTING FUNCTION
 #  This function takes raw data and formats it into a Chart.js object.
@@ -56,27 +79,117 @@ def _format_chart_object(title, chart_type, data_label, analysis_result, **kwarg
 
     return final_object
 
-def run_analytics_etl():
-    print("--- Starting Analytics Update Process ---")
+def chart_content_hash(chart: dict) -> str:
+    """
+    Hash canónico del contenido de una gráfica (datos, título, posición, etc.).
+    Sirve igual para una fila recién generada que para una fila leída de la BD.
+    """
+    return canonical_hash({field: chart.get(field) for field in CHART_CONTENT_FIELDS})
 
-    # --- 1. EXTRACTION ---
-    print("Step 1: Fetching all required data sources...")
-    
-    # Traemos las tablas principales
-    df_companies = pd.DataFrame(supabase_service.get_all_from('companies'))
-    df_responses = pd.DataFrame(supabase_service.get_all_from('responses'))
+def _upload_hash(chart: dict) -> str:
+    """
+    chart_content_hash de una fila; las de variantes se comparan por el 'content_hash' que llevan en
+    chart_data (ver _variant_chart_row), así no hay que bajar todas las variantes en cada corrida.
+    """
+    chart_data = chart.get('chart_data')
+    if isinstance(chart_data, dict) and 'content_hash' in chart_data:
+        return chart_content_hash({**chart, 'chart_data': chart_data['content_hash']})
+    return chart_content_hash(chart)
+
+def _filter_changed_charts(charts_to_upload: list) -> list:
+    """
+    Compara cada gráfica generada contra el hash de lo que ya está guardado en 'charts'
+    y regresa SOLO las que cambiaron (o son nuevas).
+    Si no se puede leer el estado actual, regresa todas (comportamiento anterior).
+    """
+    other_fields = [field for field in CHART_CONTENT_FIELDS if field != 'chart_data']
+    try:
+        charts = supabase_service.supabase.table('charts').select(
+            ', '.join(['chart_slug'] + CHART_CONTENT_FIELDS)
+        ).not_.like('chart_slug', VARIANT_SLUG_PATTERN).execute()
+        # De las filas de variantes solo el hash de su chart_data, no las variantes
+        variants = supabase_service.supabase.table('charts').select(
+            ', '.join(['chart_slug'] + other_fields + ['content_hash:chart_data->>content_hash'])
+        ).like('chart_slug', VARIANT_SLUG_PATTERN).execute()
+        stored_hashes = {row['chart_slug']: chart_content_hash(row) for row in charts.data}
+        stored_hashes.update({
+            row['chart_slug']: chart_content_hash({**row, 'chart_data': row['content_hash']}) for row in variants.data
+        })
+    except Exception as e:
+        logger.warning(f"  - ⚠️  Could not read stored charts, uploading all of them: {e}")
+        return charts_to_upload
+
+    changed = [
+        chart for chart in charts_to_upload
+        if stored_hashes.get(chart['chart_slug']) != _upload_hash(chart)
+    ]
+    logger.info(f"  - {len(changed)} changed, {len(charts_to_upload) - len(changed)} unchanged (skipped).")
+    return changed
+
+def _fan_out_variants(df: pd.DataFrame, dimension: str, analysis_func, analysis_params: dict) -> dict:
+    """Variantes que el planner no resolvió (ej. analyze_continuous_binned): la función sobre cada grupo."""
+    if dimension not in df.columns:
+        return {}
+    return {
+        str(value): analysis_func(group, **analysis_params)
+        for value, group in df.groupby(dimension, observed=True, sort=False)
+    }
+
+def _variant_chart_row(chart_to_upload: dict, chart_object: dict, dimension: str, variants: dict) -> dict:
+    """
+    Fila compacta con todas las variantes de una gráfica por 'dimension': el dataset (etiqueta,
+    colores) se guarda una vez y por cada valor solo labels / values. Queda inactiva para que
+    no salga en los dashboards; la API la arma al vuelo (dashboard_service.get_chart_variant).
+    """
+    dataset = {key: value for key, value in chart_object["data"]["datasets"][0].items() if key != "data"}
+    chart_data = {
+        "dimension": dimension,
+        "dataset": dataset,
+        "variants": {
+            value: {"labels": result["labels"], "values": result["values"]}
+            for value, result in variants.items() if result
+        },
+    }
+    # Hash del contenido dentro de la misma fila: _filter_changed_charts compara solo este campo
+    chart_data["content_hash"] = canonical_hash(chart_data)
+    return {
+        **chart_to_upload,
+        "chart_slug": variant_slug(chart_to_upload["chart_slug"], dimension),
+        "chart_data": chart_data,
+        "is_active": False,
+    }
+
+def _load_source(table_name: str, snapshots: SourceSnapshots) -> pd.DataFrame:
+    """Snapshot del ETL si sigue vigente (misma versión que la BD); si no, la tabla desde Supabase."""
+    columns = ANALYTICS_SOURCE_COLUMNS[table_name]
+    df = snapshots.load(table_name, columns)
+    if df is None:
+        df = supabase_service.get_frame(table_name)
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
+def load_analytics_sources(snapshots: SourceSnapshots = None) -> dict:
+    """
+    Pasos 1 y 1.5: companies / responses ya cruzados con los catálogos (municipality, industrial_park,
+    sector en responses) y el catálogo de certificaciones. Lo usan las gráficas y el cubo de /api/analytics/query.
+    """
+    # Traemos las tablas principales (con dtypes compactos: categóricas, Int64, boolean),
+    # del snapshot del último ETL cuando la BD no ha cambiado desde entonces
+    snapshots = snapshots or SourceSnapshots()
+    df_companies = _load_source('companies', snapshots)
+    df_responses = _load_source('responses', snapshots)
     
     # [NUEVO] Traemos el catálogo de municipios para traducir los IDs
-    df_mun_catalog = pd.DataFrame(supabase_service.get_all_from('municipality_catalog'))
-    df_park_catalog = pd.DataFrame(supabase_service.get_all_from('industrial_parks_catalog'))
+    df_mun_catalog = _load_source('municipality_catalog', snapshots)
+    df_park_catalog = _load_source('industrial_parks_catalog', snapshots)
 
-    print(f"  - Fetched {len(df_companies)} company records.")
-    print(f"  - Fetched {len(df_mun_catalog)} municipalities.")
+    logger.info(f"  - Fetched {len(df_companies)} company records.")
+    logger.info(f"  - Fetched {len(df_mun_catalog)} municipalities.")
 
     # --- 1.5. ENRICHMENT (Corrección de colisión de nombres) ---
     # A) Lógica de Municipios
     if 'municipality_id' in df_companies.columns and not df_mun_catalog.empty:
-        print("  - Joining companies with municipality catalog...")
+        logger.info("  - Joining companies with municipality catalog...")
         
         df_companies = df_companies.merge(
             df_mun_catalog[['id', 'municipality_name']], 
@@ -94,7 +207,7 @@ def run_analytics_etl():
     # B) Lógica de Parques Industriales
     # Asumimos que tu columna de FK en companies se llama 'industrial_park_id'
     if 'industrial_park_id' in df_companies.columns and not df_park_catalog.empty:
-        print("  - Joining companies with industrial parks catalog...")
+        logger.info("  - Joining companies with industrial parks catalog...")
         
         # Merge: companies.industrial_park_id <-> catalog.id
         df_companies = df_companies.merge(
@@ -131,18 +244,38 @@ def run_analytics_etl():
             right_on='id',        # La llave en companies
             how='left'
         )
+
+    # Las columnas que salieron de los catálogos (municipality, industrial_park) también a categóricas
+    apply_schema(df_companies, 'companies')
+    apply_schema(df_responses, 'responses')
     
     # Empaquetamos para el análisis
-    data_sources = {
+    return {
         'companies': df_companies,
         'responses': df_responses,
-        'certifications_catalog': pd.DataFrame(supabase_service.get_all_from('certifications_catalog'))
+        'certifications_catalog': _load_source('certifications_catalog', snapshots)
     }
 
+def run_analytics_etl():
+    logger.info("--- Starting Analytics Update Process ---")
+
+    # --- 1. EXTRACTION ---
+    logger.info("Step 1: Fetching all required data sources...")
+    data_sources = load_analytics_sources()
+    # Tendencias: rollups por semana / mes, solo con las respuestas nuevas desde la última corrida
+    # (None si no hay rollups: las gráficas de tendencias se saltan)
+    data_sources['responses_rollup'] = update_responses_rollup()
+
     # --- 3. TRANSFORMATION: Generate all chart data ---
-    print("\nStep 2: Generating chart data...")
+    logger.info("Step 2: Generating chart data...")
     all_charts_to_upload = []
 
+    # Conteos y sumas de todas las gráficas agrupables (y sus variantes de fan-out), en una pasada por fuente
+    planned_results = plan_charts(data_sources, [
+        dict(chart, fan_out=fan_out_dimensions(chart, dashboard))
+        for dashboard in DASHBOARDS_CONFIG for chart in dashboard["charts"]
+    ])
+
     for dashboard_config in DASHBOARDS_CONFIG:
         dashboard_id = None
         # First, ensure the dashboard exists and get its ID
@@ -158,17 +291,21 @@ def run_analytics_etl():
             ).execute()
 
             dashboard_id = dashboard_data[1][0]['id']
-            print(f"  - Upserted dashboard '{dashboard_config['title']}' (ID: {dashboard_id})")
+            logger.info(f"  - Upserted dashboard '{dashboard_config['title']}' (ID: {dashboard_id})")
 
         except Exception as e:
-            print(f"❌ Error upserting dashboard '{dashboard_config['slug']}': {e}")
+            logger.error(f"❌ Error upserting dashboard '{dashboard_config['slug']}': {e}")
             continue
 
         for i, chart_config in enumerate(dashboard_config["charts"]):
-            print(f"    - Generating chart: {chart_config['slug']}")
+            logger.info(f"    - Generating chart: {chart_config['slug']}")
             
             # Select the correct DataFrame and analysis function from the config
             df = data_sources[chart_config["data_source_key"]]
+            if df is None:
+                # Ej. sin rollups de tendencias: se conserva la gráfica que ya está en la BD
+                logger.warning(f"    - ⚠️  No data for '{chart_config['slug']}' ({chart_config['data_source_key']}). Skipping.")
+                continue
             analysis_func = chart_config["analysis_type"]
             analysis_params = chart_config["params"].copy()
             
@@ -178,8 +315,11 @@ def run_analytics_etl():
                 if catalog_key in data_sources:
                     analysis_params["catalog_df"] = data_sources[catalog_key]
 
-            # Run the analysis
-            analysis_result = analysis_func(df, **analysis_params)
+            # Run the analysis (o tomamos la que ya calculó el planner)
+            if chart_config['slug'] in planned_results:
+                analysis_result = planned_results[chart_config['slug']]
+            else:
+                analysis_result = analysis_func(df, **analysis_params)
 
             # Format the result into a Chart.js object
             chart_object = _format_chart_object(**chart_config["formatter_params"], analysis_result=analysis_result)
@@ -195,24 +335,33 @@ def run_analytics_etl():
                     "is_active": chart_config.get("is_active", True)
                 }
                 all_charts_to_upload.append(chart_to_upload)
+
+                # Variantes por dimensión (fan-out): del planner, o una por grupo si no las resolvió
+                for dimension in fan_out_dimensions(chart_config, dashboard_config):
+                    variants = planned_results.get(variant_slug(chart_config['slug'], dimension))
+                    if variants is None:
+                        variants = _fan_out_variants(df, dimension, analysis_func, analysis_params)
+                    if variants:
+                        all_charts_to_upload.append(_variant_chart_row(chart_to_upload, chart_object, dimension, variants))
             else:
-                print(f"    - ⚠️  Could not generate chart '{chart_config['slug']}'. Skipping.")
+                logger.warning(f"    - ⚠️  Could not generate chart '{chart_config['slug']}'. Skipping.")
 
-    # --- 4. LOAD: Upsert all generated charts to Supabase ---
-    print(f"\nStep 3: Uploading {len(all_charts_to_upload)} charts to Supabase...")
-    if not all_charts_to_upload:
-        print("  - No charts to upload.")
+    # --- 4. LOAD: Upsert only the charts whose content changed ---
+    logger.info(f"Step 3: Uploading {len(all_charts_to_upload)} charts to Supabase...")
+    charts_to_write = _filter_changed_charts(all_charts_to_upload) if all_charts_to_upload else []
+    if not charts_to_write:
+        logger.info("  - No charts to upload.")
     else:
         try:
             data, count = supabase_service.supabase.table('charts').upsert(
-                all_charts_to_upload,
+                charts_to_write,
                 on_conflict='chart_slug'
             ).execute()
-            print(f"✅ Successfully upserted {len(data[1])} charts.")
+            logger.info(f"✅ Successfully upserted {len(data[1])} charts.")
         except Exception as e:
-            print(f"❌ An error occurred during chart upload: {e}")
+            logger.error(f"❌ An error occurred during chart upload: {e}")
 
-    print("\n--- Analytics Update Process Finished ---")
+    logger.info("--- Analytics Update Process Finished ---")
 
 if __name__ == '__main__':
     run_analytics_etl()
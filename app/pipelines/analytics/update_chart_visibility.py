@@ -6,60 +6,93 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.
 
 from dotenv import load_dotenv
 from app.core.connections import supabase_service
+from app.core.logger import get_logger
 from config.dashboards_config import DASHBOARDS_CONFIG
 
+logger = get_logger(__name__)
+
+def _desired_states_from_config() -> dict:
+    """
+    Extrae { chart_slug: is_active } de la configuración (True por defecto si no existe).
+    """
+    desired = {}
+    for dashboard in DASHBOARDS_CONFIG:
+        for chart in dashboard['charts']:
+            desired[chart['slug']] = chart.get('is_active', True)
+    return desired
+
+def _current_states_from_db() -> dict:
+    """
+    Lee { chart_slug: is_active } de la tabla 'charts' en UNA sola consulta.
+    Solo pedimos las dos columnas necesarias, nunca el chart_data.
+    """
+    response = supabase_service.supabase.table('charts').select('chart_slug, is_active').execute()
+    return {row['chart_slug']: row.get('is_active') for row in response.data}
+
+def diff_chart_visibility(desired: dict, current: dict) -> tuple:
+    """
+    Compara el estado deseado contra el de la BD.
+    Regresa (to_activate, to_deactivate, missing) como listas de slugs ordenadas.
+    'missing' son gráficas que existen en la config pero aún no en la BD
+    (las crea run_analytics_etl, aquí no se tocan).
+    """
+    to_activate, to_deactivate, missing = [], [], []
+    for slug, is_active in desired.items():
+        if slug not in current:
+            missing.append(slug)
+        elif current[slug] is not is_active:
+            (to_activate if is_active else to_deactivate).append(slug)
+    return sorted(to_activate), sorted(to_deactivate), sorted(missing)
+
 def sync_chart_visibility():
     """
     Sincroniza SOLO el estado 'is_active' de las gráficas desde el archivo de configuración
     hacia la base de datos Supabase. No recalcula datos ni toca nada más.
+
+    Lee el estado actual en una consulta, calcula el diff y aplica únicamente los cambios
+    con a lo más dos requests (uno para activar y otro para desactivar) usando filtros 'in_'.
+    Así evitamos el upsert (que reemplazaría las demás columnas) y el loop de un update por gráfica.
     """
-    print("--- ⚡ Iniciando Sincronización de Visibilidad ---")
-    
-    updates = []
-    
-    # 1. Recorrer la configuración para extraer los estados
-    for dashboard in DASHBOARDS_CONFIG:
-        print(f"📦 Procesando dashboard: {dashboard['title']}")
-        
-        for chart in dashboard['charts']:
-            # Extraemos slug y estado (True por defecto si no existe)
-            chart_slug = chart['slug']
-            is_active = chart.get('is_active', True)
-            
-            # Preparamos el objeto mínimo para el upsert
-            updates.append({
-                "chart_slug": chart_slug,
-                "is_active": is_active
-            })
-            
-            status_icon = "🟢" if is_active else "🔴"
-            print(f"   {status_icon} {chart_slug}")
-
-    # 2. Enviar actualización masiva a Supabase
-    if updates:
-        print(f"\n📤 Enviando {len(updates)} actualizaciones a Supabase...")
-        try:
-            # Upsert detectará el conflicto en 'chart_slug' y solo actualizará 'is_active'
-            # (Asegúrate de que no borre el resto de la data, Supabase hace merge por defecto en upsert 
-            #  si le pasas solo los campos a cambiar, PERO para estar seguros 100%, 
-            #  el upsert reemplaza la fila si no especificas. 
-            #  MEJOR ESTRATEGIA: Update uno por uno o Upsert con cuidado. 
-            #  Supabase-py upsert reemplaza. Haremos un loop de updates para ser quirúrgicos y seguros).
-            
-            count = 0
-            for item in updates:
-                response = supabase_service.supabase.table('charts').update(
-                    {'is_active': item['is_active']}
-                ).eq('chart_slug', item['chart_slug']).execute()
-                count += 1
-                
-            print(f"✅ Éxito: Se actualizaron {count} gráficas.")
-            
-        except Exception as e:
-            print(f"❌ Error al actualizar: {e}")
-    else:
-        print("⚠️ No se encontraron gráficas en la configuración.")
+    logger.info("--- ⚡ Iniciando Sincronización de Visibilidad ---")
+
+    desired = _desired_states_from_config()
+    if not desired:
+        logger.warning("⚠️ No se encontraron gráficas en la configuración.")
+        return
+
+    try:
+        current = _current_states_from_db()
+    except Exception as e:
+        logger.error(f"❌ Error al leer el estado actual de las gráficas: {e}")
+        return
+
+    to_activate, to_deactivate, missing = diff_chart_visibility(desired, current)
+
+    # Diff conciso: solo lo que cambia
+    for slug in to_activate:
+        logger.info(f"   🟢 {slug}")
+    for slug in to_deactivate:
+        logger.info(f"   🔴 {slug}")
+    if missing:
+        logger.info(f"   ⚪ {len(missing)} gráficas aún no existen en la BD (se crean con run_analytics_etl): {', '.join(missing)}")
+
+    if not to_activate and not to_deactivate:
+        logger.info(f"✅ Sin cambios: {len(desired) - len(missing)} gráficas ya están sincronizadas.")
+        return
+
+    try:
+        for is_active, slugs in ((True, to_activate), (False, to_deactivate)):
+            if slugs:
+                supabase_service.supabase.table('charts').update(
+                    {'is_active': is_active}
+                ).in_('chart_slug', slugs).execute()
+
+        logger.info(f"✅ Éxito: {len(to_activate)} activadas, {len(to_deactivate)} desactivadas "
+              f"({len(desired) - len(missing) - len(to_activate) - len(to_deactivate)} sin cambios).")
+
+    except Exception as e:
+        logger.error(f"❌ Error al actualizar: {e}")
 
 if __name__ == '__main__':
     load_dotenv() # Carga variables de entorno (.env)
-    sync_chart_visibility()
\ No newline at end of file
+    sync_chart_visibility()
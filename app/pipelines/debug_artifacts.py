@@ -0,0 +1,107 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from app.core.logger import get_logger
+
+# pyarrow es opcional: sin él los artefactos se escriben como CSV
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+logger = get_logger(__name__)
+
+DEBUG_ARTIFACTS_ENABLED = os.getenv('DEBUG_ARTIFACTS', 'false').lower() in ('1', 'true', 'yes')
+
+_WRITERS = {
+    'parquet': ('.parquet', lambda df, path: df.to_parquet(path, index=False)),
+    'feather': ('.feather', lambda df, path: df.reset_index(drop=True).to_feather(path)),
+    'csv': ('.csv', lambda df, path: df.to_csv(path, index=False, encoding='utf-8-sig')),
+}
+
+def _stringify_objects(df: pd.DataFrame) -> pd.DataFrame:
+    """Columnas object con listas/dicts mezclados no siempre caben en Arrow: las pasamos a texto."""
+    df = df.copy()
+    for col in df.select_dtypes(include='object').columns:
+        df[col] = df[col].map(lambda x: None if x is None else str(x))
+    return df
+
+class DebugArtifacts:
+    """
+    Snapshots intermedios del ETL (debug_01_raw, debug_02_initial_cleaning, ...).
+
+    Apagado por defecto (DEBUG_ARTIFACTS=true para activarlo). Cuando está activo:
+      - Se escriben en un hilo aparte, fuera del camino crítico del pipeline.
+      - Formato por DEBUG_ARTIFACTS_FORMAT: parquet (default) o feather si hay pyarrow; si no, csv.
+      - DEBUG_ARTIFACTS_SAMPLE_ROWS > 0 guarda solo una muestra de N filas.
+      - Cada corrida va en <output_dir>/debug/<run_id>/ y solo se conservan las
+        últimas DEBUG_ARTIFACTS_KEEP corridas (default 5).
+    """
+
+    def __init__(self, output_dir: str, run_id: str, enabled: bool = None):
+        self.enabled = DEBUG_ARTIFACTS_ENABLED if enabled is None else enabled
+        self.base_dir = os.path.join(output_dir, 'debug')
+        self.run_dir = os.path.join(self.base_dir, run_id)
+        self.sample_rows = int(os.getenv('DEBUG_ARTIFACTS_SAMPLE_ROWS', 0))
+        self.keep_runs = int(os.getenv('DEBUG_ARTIFACTS_KEEP', 5))
+        self.format = os.getenv('DEBUG_ARTIFACTS_FORMAT', 'parquet').lower()
+        if self.format not in _WRITERS:
+            logger.warning(f"Unknown DEBUG_ARTIFACTS_FORMAT '{self.format}'. Using parquet.")
+            self.format = 'parquet'
+        if self.format != 'csv' and pyarrow is None:
+            logger.warning(f"DEBUG_ARTIFACTS_FORMAT={self.format} needs pyarrow. Falling back to csv.")
+            self.format = 'csv'
+
+        self._executor = None
+        self._futures = []
+        if self.enabled:
+            os.makedirs(self.run_dir, exist_ok=True)
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='debug-artifacts')
+
+    def save(self, name: str, df: pd.DataFrame):
+        """Encola el snapshot de 'df'. Se copia aquí porque el pipeline sigue mutando el original."""
+        if not self.enabled:
+            return
+        if self.sample_rows and len(df) > self.sample_rows:
+            snapshot = df.sample(n=self.sample_rows, random_state=0).sort_index()
+        else:
+            snapshot = df.copy()
+        self._futures.append(self._executor.submit(self._write, name, snapshot))
+
+    def _write(self, name: str, df: pd.DataFrame):
+        extension, writer = _WRITERS[self.format]
+        path = os.path.join(self.run_dir, f"{name}{extension}")
+        try:
+            try:
+                writer(df, path)
+            except Exception:
+                if self.format == 'csv':
+                    raise
+                writer(_stringify_objects(df), path)
+            logger.debug(f"🔎 DEBUG: {name} ({len(df)} filas) guardado en {path}")
+        except Exception as e:
+            logger.warning(f"Could not write debug artifact '{name}': {e}")
+
+    def close(self):
+        """Espera las escrituras pendientes y aplica la retención de corridas viejas."""
+        if not self.enabled:
+            return
+        for future in self._futures:
+            future.result()
+        self._futures = []
+        self._executor.shutdown(wait=True)
+        self._prune_old_runs()
+        logger.info(f"🔎 Debug artifacts saved to {self.run_dir}")
+
+    def _prune_old_runs(self):
+        if self.keep_runs <= 0:
+            return
+        runs = sorted(
+            entry for entry in os.listdir(self.base_dir)
+            if os.path.isdir(os.path.join(self.base_dir, entry))
+        )
+        for old_run in runs[:-self.keep_runs]:
+            shutil.rmtree(os.path.join(self.base_dir, old_run), ignore_errors=True)
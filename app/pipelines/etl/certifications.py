@@ -2,8 +2,14 @@ import pandas as pd
 import ast
 import os
 from app.pipelines.etl import cleaning as cleaner
+from app.core.logger import get_logger
 from config.certifications_catalog_data import CERTIFICATIONS_CATALOG
 
+logger = get_logger(__name__)
+
+# Pregunta del formulario (dentro de additional_data) con las "otras" certificaciones en texto libre
+OTHER_CERTIFICATION_KEY = 'En caso de contar con otra certificación, especificar.'
+
 # 1. Crear un mapa de Acrónimo -> ID (Simulado o traído de BD)
 # NOTA: Idealmente esto se trae de Supabase, pero como tienes el archivo de config local,
 # podemos usarlo para mapear si asumimos que el orden/IDs coinciden o si subes el catálogo primero.
@@ -23,6 +29,10 @@ def _get_other_certification_text(json_str: str) -> str:
     Extracts the free-text value for 'other certifications' from a JSON string.
     Handles CSV parsing quirks and ensures safe evaluation.
     """
+    # Camino rápido: en el ETL 'additional_data' ya es un dict (no hace falta str() + literal_eval)
+    if isinstance(json_str, dict):
+        return str(json_str.get(OTHER_CERTIFICATION_KEY, '')).strip()
+
     if pd.isna(json_str) or not str(json_str).strip():
         return ''
 
@@ -36,10 +46,8 @@ def _get_other_certification_text(json_str: str) -> str:
         # ast.literal_eval is the safe way to parse a string literal of a Python object
         data_dict = ast.literal_eval(cleaned_str)
         
-        key = 'En caso de contar con otra certificación, especificar.'
-        
         if isinstance(data_dict, dict):
-            return str(data_dict.get(key, '')).strip()
+            return str(data_dict.get(OTHER_CERTIFICATION_KEY, '')).strip()
             
         return ''
     except (ValueError, SyntaxError):
@@ -55,7 +63,7 @@ def analyze_other_certifications(df_responses: pd.DataFrame, db_catalog_data: li
     acronym_to_id_map = {item['acronym']: item['id'] for item in db_catalog_data}
     
     if 'additional_data' not in df_responses.columns:
-        print("Warning: 'additional_data' column not found in responses DataFrame.")
+        logger.warning("'additional_data' column not found in responses DataFrame.")
         return pd.DataFrame(columns=['clean_rfc', 'response_date', 'other_cert_text_clean', 'other_certifications'])
 
     # 1. Extract raw text from the JSONB field
@@ -73,4 +81,92 @@ def analyze_other_certifications(df_responses: pd.DataFrame, db_catalog_data: li
         lambda x: map_acronyms_to_ids(x, acronym_to_id_map)
     )
 
-    return df_analysis
\ No newline at end of file
+    return df_analysis
+
+def build_certification_lookup(db_catalog_data: list) -> dict:
+    """
+    Mapa { TEXTO_EN_MAYÚSCULAS: id } para los checkboxes del formulario.
+    Misma prioridad que la búsqueda fila por fila: primero acrónimo / nombre, luego keywords
+    (y dentro de cada grupo gana la primera fila del catálogo).
+    """
+    direct, by_keyword = {}, {}
+    for item in db_catalog_data:
+        direct.setdefault(item['acronym'], item['id'])
+        direct.setdefault(str(item['name']).upper(), item['id'])
+        for kw in item.get('search_keywords') or []:
+            by_keyword.setdefault(str(kw).upper(), item['id'])
+    return {**by_keyword, **direct}
+
+def checkbox_certification_ids(cert_list, lookup: dict) -> list:
+    """Convierte la lista de checkboxes ['ISO 9001', 'OTRAS'] a lista de IDs."""
+    if not isinstance(cert_list, list):
+        return []
+    ids = set()
+    for cert_text in cert_list:
+        if not cert_text or cert_text in ['OTRAS', 'NULL', '']:
+            continue
+        found_id = lookup.get(str(cert_text).upper().strip())
+        if found_id:
+            ids.add(int(found_id))
+    return list(ids)
+
+def _as_id_list(value) -> list:
+    return value if isinstance(value, list) else []
+
+def union_certification_ids(checkbox_ids: pd.Series, text_ids: pd.Series) -> list:
+    """Unión (ordenada, sin duplicados) de dos columnas de listas de IDs, sin apply(axis=1)."""
+    return [
+        sorted(set(_as_id_list(a)) | set(_as_id_list(b)))
+        for a, b in zip(checkbox_ids.tolist(), text_ids.tolist())
+    ]
+
+def enrich_certifications(df_responses: pd.DataFrame, db_catalog_data: list, iso_source: pd.Series = None) -> pd.DataFrame:
+    """
+    Agrega a df_responses (IN PLACE, por posición) las columnas:
+      - 'other_certifications_ids': IDs detectados en el texto libre de additional_data.
+      - 'iso_certification_ids': IDs de los checkboxes ('iso_certifications').
+
+    Sin copias del DataFrame ni merge por (clean_rfc, response_date): cada resultado es
+    una lista alineada fila a fila con df_responses. El texto libre se analiza una sola vez
+    por valor distinto (la mayoría de las filas vienen vacías o repetidas).
+
+    iso_source: columna cruda de checkboxes (misma longitud y orden) para cuando
+    'iso_certifications' no viene en responses.
+    """
+    n_rows = len(df_responses)
+    acronym_to_id_map = {item['acronym']: item['id'] for item in db_catalog_data}
+
+    # A) Texto libre -> acrónimos -> IDs
+    if 'additional_data' in df_responses.columns:
+        ids_by_text = {}
+        other_ids = []
+        for payload in df_responses['additional_data'].tolist():
+            text = cleaner.clean_text_for_analysis(_get_other_certification_text(payload))
+            ids = ids_by_text.get(text)
+            if ids is None:
+                ids = map_acronyms_to_ids(cleaner.extract_certifications_acronyms(text), acronym_to_id_map)
+                ids_by_text[text] = ids
+            other_ids.append(list(ids))
+    else:
+        logger.warning("'additional_data' column not found in responses DataFrame.")
+        other_ids = [[] for _ in range(n_rows)]
+    df_responses['other_certifications_ids'] = pd.Series(other_ids, index=df_responses.index, dtype=object)
+
+    # B) Checkboxes -> IDs
+    if iso_source is not None and len(iso_source) != n_rows:
+        logger.warning(f"iso_source has {len(iso_source)} rows but responses has {n_rows}. Ignoring it.")
+        iso_source = None
+    if 'iso_certifications' not in df_responses.columns and iso_source is not None:
+        df_responses['iso_certifications'] = pd.Series(
+            [cleaner.clean_certifications_to_array(x) for x in iso_source.tolist()],
+            index=df_responses.index, dtype=object
+        )
+
+    if 'iso_certifications' in df_responses.columns:
+        lookup = build_certification_lookup(db_catalog_data)
+        iso_ids = [checkbox_certification_ids(x, lookup) for x in df_responses['iso_certifications'].tolist()]
+    else:
+        iso_ids = [[] for _ in range(n_rows)]
+    df_responses['iso_certification_ids'] = pd.Series(iso_ids, index=df_responses.index, dtype=object)
+
+    return df_responses
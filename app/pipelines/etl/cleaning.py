@@ -1,9 +1,16 @@
+import os
 import re
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 import unicodedata
 from typing import Tuple, Dict, List, Optional, Union
 from rapidfuzz import process, fuzz 
+from pandas.tseries.api import guess_datetime_format
 from app.core.connections.supabase_service import get_data_from_table
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
 
 # --- VARIABLES GLOBALES (CACHÉ) ---
 # Esta variable guardará el catálogo en memoria para no llamar a la BD mil veces
@@ -207,6 +214,189 @@ def clean_to_timestamp(text: Union[str, float]) -> Union[pd.Timestamp, None]:
     except Exception:
         return None
 
+# Cuántos valores se usan para adivinar el formato de la columna de fechas
+TIMESTAMP_FORMAT_SAMPLE_SIZE = 200
+
+def _same_timestamp(a, b) -> bool:
+    if a is None or pd.isna(a):
+        return b is None or pd.isna(b)
+    return b is not None and not pd.isna(b) and pd.Timestamp(a) == pd.Timestamp(b)
+
+def _infer_timestamp_format(values: pd.Series) -> Optional[str]:
+    """
+    Adivina el formato (strftime) de una columna de fechas a partir de una muestra: el candidato
+    que parsea más valores de la muestra (empates: el que apareció primero en la muestra).
+
+    Solo se acepta si da EXACTAMENTE lo mismo que clean_to_timestamp (pd.to_datetime por valor,
+    mes primero si la fecha es ambigua) en cada valor de la muestra que parsea; si no, None y la
+    columna va por el camino lento. response_date es parte de la llave del upsert de responses:
+    otra interpretación de '05/02/2024' duplicaría el historial.
+    """
+    sample = values.drop_duplicates().head(TIMESTAMP_FORMAT_SAMPLE_SIZE)
+    # dict.fromkeys: candidatos sin duplicados y en orden de aparición (determinístico)
+    candidates = list(dict.fromkeys(fmt for fmt in (guess_datetime_format(v) for v in sample) if fmt))
+    scored = []
+    for fmt in candidates:
+        parsed = pd.to_datetime(sample, format=fmt, errors='coerce')
+        scored.append((int(parsed.notna().sum()), fmt, parsed))
+    if not scored:
+        return None
+
+    hits, fmt, parsed = max(scored, key=lambda item: item[0])  # max se queda con el primero en empate
+    if not hits:
+        return None
+    baseline = {value: clean_to_timestamp(value) for value in sample[parsed.notna()]}
+    disagreeing = [value for value, fast in zip(sample, parsed) if not pd.isna(fast) and not _same_timestamp(fast, baseline[value])]
+    if disagreeing:
+        logger.info(f"  - Timestamp format '{fmt}' disagrees with the per-value parser on {len(disagreeing)} "
+                    f"sampled values (e.g. {disagreeing[:3]}). Using the per-value parser.")
+        return None
+    return fmt
+
+def _ambiguous_day_first(values: pd.Series, fmt: str, parsed: pd.Series) -> pd.Series:
+    """
+    Con un formato día-primero (%d antes de %m), las filas que también son fechas válidas con
+    mes primero: clean_to_timestamp las lee mes primero, así que van por el camino lento aunque
+    la muestra no tuviera ninguna ambigua.
+    """
+    if '%d' not in fmt or '%m' not in fmt or fmt.index('%d') > fmt.index('%m'):
+        return pd.Series(False, index=values.index)
+    swapped = re.sub(r'%[dm]', lambda m: '%m' if m.group() == '%d' else '%d', fmt)
+    month_first = pd.to_datetime(values, format=swapped, errors='coerce')
+    return month_first.notna() & (month_first != parsed)
+
+def _to_datetime_series(values: pd.Series) -> pd.Series:
+    try:
+        return pd.to_datetime(values, errors='coerce')
+    except (TypeError, ValueError):
+        # Mezcla de fechas con y sin zona horaria: todo a UTC y sin zona
+        return pd.to_datetime(values, errors='coerce', utc=True).dt.tz_localize(None)
+
+def parse_timestamp_column(series: pd.Series) -> pd.Series:
+    """
+    Versión por columna de clean_to_timestamp.
+
+    Infiere el formato UNA vez con una muestra y parsea toda la columna con
+    pd.to_datetime(format=...). Solo las filas que no coinciden con ese formato (o que con él
+    se leerían distinto que con clean_to_timestamp, ver _ambiguous_day_first) pasan por el
+    parseo lento (clean_to_timestamp, una vez por valor distinto) y se reportan en el log.
+    El resultado es el mismo que aplicar clean_to_timestamp fila por fila.
+    """
+    text = series.astype('string').str.strip()
+    present = text.notna() & (text != '')
+    values = text[present]
+    if values.empty:
+        return pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+
+    fmt = _infer_timestamp_format(values)
+    parsed = pd.Series(pd.NaT, index=series.index, dtype=object)
+    if fmt:
+        fast = pd.to_datetime(values, format=fmt, errors='coerce')
+        fast[_ambiguous_day_first(values, fmt, fast)] = pd.NaT
+        parsed.loc[present] = fast
+    mismatched = present & parsed.isna()
+
+    if mismatched.any():
+        slow_values = text[mismatched]
+        slow = {value: clean_to_timestamp(value) for value in slow_values.unique()}
+        parsed.loc[mismatched] = slow_values.map(slow)
+        failed = [value for value, parsed_value in slow.items() if parsed_value is None]
+        logger.warning(
+            f"⚠️ Timestamps: {mismatched.sum()} of {present.sum()} values did not match format '{fmt}' "
+            f"(slow parse). Unparseable values: {len(failed)}, e.g. {failed[:5]}. "
+            f"Mismatched examples: {list(slow)[:5]}"
+        )
+
+    return _to_datetime_series(parsed)
+
+# --- LIMPIEZA POR VALORES ÚNICOS (columnas de baja cardinalidad) ---
+
+# Funciones puras (el resultado depende solo del valor y no regresan objetos mutables):
+# se pueden evaluar una vez por valor distinto y repartir el resultado a todas sus filas.
+# OJO: clean_certifications_to_array regresa listas (mutables), por eso no está aquí.
+PURE_CLEANERS = frozenset({
+    'no_cleaning', 'clean_enum_nulls', 'clean_rfc', 'clean_email', 'clean_phone_to_e164',
+    'clean_company_name', 'clean_contact_name', 'clean_to_integer', 'clean_to_boolean',
+    'clean_string', 'clean_string_upper', 'clean_string_numeric', 'clean_cargo_smart_case',
+    'normalize_text', 'clean_text_for_analysis',
+})
+
+# Caché entre corridas (mismo proceso) por función: { nombre: OrderedDict((tipo, valor) -> resultado) }
+CLEANING_CACHE_SIZE = int(os.getenv('CLEANING_CACHE_SIZE', 50_000))
+_PURE_CACHES = {}
+
+_HOMOGENEOUS_DTYPES = frozenset({'string', 'empty', 'integer', 'floating', 'boolean'})
+
+def map_unique(series: pd.Series, func, cache: OrderedDict = None, cache_size: int = None) -> pd.Series:
+    """
+    Equivalente a series.apply(func) para funciones puras, evaluando func una sola vez por
+    valor distinto: factorize -> func(únicos) -> resultado[codes]. O(valores únicos) en vez de O(filas).
+
+    cache (opcional): LRU acotado (cache_size) de resultados por (tipo, valor), para reutilizar
+    entre columnas y corridas.
+    """
+    # factorize trata 1 == 1.0 == True como el mismo valor; si la columna mezcla tipos
+    # (ej. numericise dio int, float y str), no es seguro compartir el resultado.
+    # En ese caso se resuelve por separado cada grupo de filas con el mismo tipo.
+    if pd.api.types.infer_dtype(series, skipna=True) not in _HOMOGENEOUS_DTYPES:
+        value_types = series.map(type)
+        if value_types.nunique() == 1:
+            return series.apply(func)
+        out = np.empty(len(series), dtype=object)
+        type_codes, _ = pd.factorize(value_types)
+        for type_code in range(type_codes.max() + 1):
+            positions = np.flatnonzero(type_codes == type_code)
+            out[positions] = map_unique(series.iloc[positions], func, cache, cache_size).to_numpy(dtype=object)
+        return pd.Series(out.tolist(), index=series.index, name=series.name)
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    unique_values = list(uniques)
+
+    results = []
+    for value in unique_values:
+        key = (type(value), value)
+        if cache is not None and key in cache:
+            cache.move_to_end(key)
+            results.append(cache[key])
+            continue
+        result = func(value)
+        results.append(result)
+        if cache is not None:
+            cache[key] = result
+            if len(cache) > (cache_size or CLEANING_CACHE_SIZE):
+                cache.popitem(last=False)
+
+    out = np.empty(len(series), dtype=object)
+    valid = codes >= 0
+    if results:
+        result_array = np.empty(len(results), dtype=object)
+        result_array[:] = results
+        out[valid] = result_array[codes[valid]]
+    # Los nulos (None / NaN / NaT) comparten code -1 pero func puede distinguirlos: uno por tipo
+    null_positions = np.flatnonzero(~valid)
+    if len(null_positions):
+        null_values = series.to_numpy(dtype=object)[null_positions]
+        null_results = {}
+        for position, value in zip(null_positions, null_values):
+            value_type = type(value)
+            if value_type not in null_results:
+                null_results[value_type] = func(value)
+            out[position] = null_results[value_type]
+
+    # Misma inferencia de dtype que apply (ej. int + None -> float)
+    return pd.Series(out.tolist(), index=series.index, name=series.name, dtype=None if len(out) else object)
+
+def apply_pure_cleaner(series: pd.Series, func_name: str) -> pd.Series:
+    """map_unique con la caché acotada de la función de limpieza 'func_name'."""
+    cache = _PURE_CACHES.setdefault(func_name, OrderedDict())
+    return map_unique(series, globals()[func_name], cache)
+
+# Funciones de limpieza que trabajan sobre la columna completa (Series -> Series).
+# _apply_initial_cleaning las prefiere sobre la versión valor por valor del mismo nombre.
+COLUMN_CLEANERS = {
+    'clean_to_timestamp': parse_timestamp_column,
+}
+
 def clean_to_boolean(text: Union[str, float]) -> Union[bool, None]:
     """
     Convierte respuestas afirmativas a True y negativas a False.
@@ -0,0 +1,59 @@
+import json
+import os
+
+from app.core.connections import supabase_service
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Cuántas llaves mandamos por request en el filtro in_() (la URL tiene límite de tamaño)
+LOOKUP_CHUNK_SIZE = 200
+
+def load_id_maps(path: str) -> dict:
+    """Mapas { tabla: { llave: id } } guardados por la corrida anterior ({} si no hay)."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read ID map cache {path}: {e}. Starting empty.")
+        return {}
+
+def save_id_maps(path: str, id_maps: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(id_maps, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def update_id_map(id_map: dict, rows: list, key_column: str) -> dict:
+    """Agrega / corrige el mapa con las filas que regresó el upsert ([{'id': 1, key_column: 'X'}, ...])."""
+    for row in rows:
+        if row.get(key_column) is not None:
+            id_map[row[key_column]] = row['id']
+    return id_map
+
+def resolve_id_map(table_name: str, key_column: str, id_map: dict, keys) -> dict:
+    """
+    Completa id_map para las llaves que no conoce (ej. el upsert falló o no regresó filas),
+    pidiendo solo esas llaves con in_(): nunca se descarga la tabla completa.
+    """
+    missing = sorted({k for k in keys if k is not None and k == k and k not in id_map})
+    if not missing:
+        return id_map
+
+    logger.info(f"Looking up {len(missing)} missing IDs in '{table_name}'...")
+    for start in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+        chunk = missing[start:start + LOOKUP_CHUNK_SIZE]
+        try:
+            response = (
+                supabase_service.supabase.table(table_name)
+                .select(f"id, {key_column}")
+                .in_(key_column, chunk)
+                .execute()
+            )
+            update_id_map(id_map, response.data, key_column)
+        except Exception as e:
+            logger.error(f"Error looking up IDs in {table_name}: {e}")
+    return id_map
@@ -3,6 +3,10 @@ import os
 from app.pipelines.etl import cleaning as cleaner
 from app.pipelines.etl.cleaning import rescue_names, normalize_text
 from app.core.connections.supabase_service import get_all_from
+from app.core.schemas import apply_schema, frame_from_records
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
 
 def _prepare_catalog_maps(catalog_data: list, name_col: str, id_col: str = 'id') -> tuple:
     value_to_id_map = {}
@@ -27,22 +31,27 @@ def _prepare_catalog_maps(catalog_data: list, name_col: str, id_col: str = 'id')
                 
     return value_to_id_map, fuzzy_candidates
 
-def _standardize_catalogs(df_clean: pd.DataFrame, debug_dir: str = None) -> pd.DataFrame:
-    print("Standardizing catalogs (Municipios & Parques)...")
+def _standardize_catalogs(df_clean: pd.DataFrame, debug_dir: str = None, source_snapshots=None) -> pd.DataFrame:
+    logger.info("Standardizing catalogs (Municipios & Parques)...")
 
     # --- A. CARGA DE DATOS (Solo una vez) ---
     # Idealmente esto se cargaría fuera y se pasaría como argumento, pero aquí está bien por ahora.
     raw_municipios = get_all_from('municipality_catalog') # Tu tabla de municipios
     raw_parques = get_all_from('industrial_parks_catalog') # Tu tabla de parques
+
+    # Los catálogos recién leídos también le sirven a analytics (ver SourceSnapshots)
+    if source_snapshots is not None:
+        source_snapshots.save('municipality_catalog', frame_from_records(raw_municipios, 'municipality_catalog'))
+        source_snapshots.save('industrial_parks_catalog', frame_from_records(raw_parques, 'industrial_parks_catalog'))
     
     # --- B. PREPARACIÓN DE MAPAS ---
     muni_map, muni_candidates = _prepare_catalog_maps(raw_municipios, 'municipality_name')
     park_map, park_candidates = _prepare_catalog_maps(raw_parques, 'park_name')
     
-    print(f"🔎 DEBUG MAPAS:")
-    print(f"   - Municipios cargados: {len(muni_map)}")
-    print(f"   - Parques cargados: {len(park_map)}")
-    print(f"   - Ejemplo Keys Parques (normalizadas): {list(park_map.keys())[:5]}")
+    logger.debug("🔎 DEBUG MAPAS:")
+    logger.debug(f"   - Municipios cargados: {len(muni_map)}")
+    logger.debug(f"   - Parques cargados: {len(park_map)}")
+    logger.debug(f"   - Ejemplo Keys Parques (normalizadas): {list(park_map.keys())[:5]}")
 
     # --- C. APLICACIÓN DE LÓGICA (Vectorizada o Apply) ---
     # --- 1. MUNICIPIOS (Con el SUPER PODER de limpieza extra) ---
@@ -51,7 +60,8 @@ def _standardize_catalogs(df_clean: pd.DataFrame, debug_dir: str = None) -> pd.D
         # Definimos el ruido específico de esta región
         RUIDO_MUNICIPIOS = ['AGS', 'AGUASCALIENTES', 'EDO', 'MEX', 'ZONA CENTRO']
         
-        muni_results = df_clean['other_municipality'].apply(
+        # Fuzzy matching una vez por texto distinto (los municipios se repiten muchísimo)
+        muni_results = cleaner.map_unique(df_clean['other_municipality'],
             lambda x: cleaner.smart_catalog_match(
                 x, 
                 muni_map, 
@@ -70,7 +80,7 @@ def _standardize_catalogs(df_clean: pd.DataFrame, debug_dir: str = None) -> pd.D
         # pero a veces ayuda al fuzzy, así que lo dejamos vacío o probamos.
         RUIDO_PARQUES = [] 
         
-        park_results = df_clean['industrial_park'].apply(
+        park_results = cleaner.map_unique(df_clean['industrial_park'],
             lambda x: cleaner.smart_catalog_match(
                 x, 
                 park_map, 
@@ -84,13 +94,15 @@ def _standardize_catalogs(df_clean: pd.DataFrame, debug_dir: str = None) -> pd.D
 
     return df_clean
 
-def clean_and_process_data(df: pd.DataFrame, config: dict, debug_output_dir: str = None) -> dict:
+def clean_and_process_data(df: pd.DataFrame, config: dict, debug_artifacts=None, source_snapshots=None) -> dict:
     """
     Applies cleaning functions, finalizes critical IDs, and structures data into tables.
     
     Args:
         df: The raw DataFrame from the source (e.g., Google Sheets).
         config: The configuration dictionary from cleaning_map.json.
+        debug_artifacts: Optional DebugArtifacts to snapshot intermediate steps.
+        source_snapshots: Optional SourceSnapshots to keep the catalogs read for analytics.
 
     Returns:
         A dictionary containing three DataFrames: 'companies', 'contacts', and 'responses'.
@@ -99,15 +111,15 @@ def clean_and_process_data(df: pd.DataFrame, config: dict, debug_output_dir: str
     df_clean = _apply_initial_cleaning(df, config)
     
     # [DEBUG] Exportar tras limpieza inicial
-    if debug_output_dir:
-        df_clean.to_csv(os.path.join(debug_output_dir, 'debug_02_initial_cleaning.csv'), index=False, encoding='utf-8-sig')
+    if debug_artifacts is not None:
+        debug_artifacts.save('debug_02_initial_cleaning', df_clean)
     
     # 2. Post-Processing: Apply complex logic that depends on multiple columns.
     df_clean = _finalize_company_ids(df_clean)
     df_clean = _rescue_contact_names(df_clean)
     
     # --- NUEVA LÍNEA ---
-    df_clean = _standardize_catalogs(df_clean, debug_output_dir)
+    df_clean = _standardize_catalogs(df_clean, source_snapshots=source_snapshots)
     
     # 3. JSONB Creation: Consolidate extra data into a single JSONB column.
     df_clean = _create_jsonb_column(df, df_clean, config)
@@ -126,21 +138,32 @@ def _apply_initial_cleaning(df: pd.DataFrame, config: dict) -> pd.DataFrame:
         clean_func_name = params['clean_func']
         
         if original_col not in df.columns:
-            print(f"Warning: Source column '{original_col}' not found in DataFrame. Skipping.")
+            logger.warning(f"Source column '{original_col}' not found in DataFrame. Skipping.")
+            continue
+
+        # Limpieza por columna completa (ej. fechas) si existe; si no, valor por valor
+        column_cleaner = cleaner.COLUMN_CLEANERS.get(clean_func_name)
+        if column_cleaner is not None:
+            df_clean[target_col] = column_cleaner(df[original_col])
+            continue
+
+        # Funciones puras: una evaluación por valor distinto (sector, cargo, proveeduría, ...)
+        if clean_func_name in cleaner.PURE_CLEANERS:
+            df_clean[target_col] = cleaner.apply_pure_cleaner(df[original_col], clean_func_name)
             continue
 
         try:
             clean_function = getattr(cleaner, clean_func_name)
             df_clean[target_col] = df[original_col].apply(clean_function)
         except AttributeError:
-            print(f"ERROR: Cleaning function '{clean_func_name}' not found. Copying data as-is.")
+            logger.error(f"Cleaning function '{clean_func_name}' not found. Copying data as-is.")
             df_clean[target_col] = df[original_col]
             
     return df_clean
 
 def _finalize_company_ids(df_clean: pd.DataFrame) -> pd.DataFrame:
     """Generates a unique ID for companies where the RFC cleaning failed."""
-    print("Finalizing company IDs for entries with failed RFC cleaning...")
+    logger.info("Finalizing company IDs for entries with failed RFC cleaning...")
     mask_failed_rfc = df_clean['clean_rfc'].str.startswith('ID_FALLO', na=False)
     
     if mask_failed_rfc.any():
@@ -156,7 +179,7 @@ def _finalize_company_ids(df_clean: pd.DataFrame) -> pd.DataFrame:
 
 def _rescue_contact_names(df_clean: pd.DataFrame) -> pd.DataFrame:
     """Applies the name rescue logic row-wise."""
-    print("Correcting contact names and last names...")
+    logger.info("Correcting contact names and last names...")
     # Use .loc to ensure we are modifying the original df_clean
     df_clean.loc[:, ['first_name', 'last_name']] = df_clean.apply(
         cleaner.rescue_names, 
@@ -220,10 +243,12 @@ def _structure_data_into_tables(df_clean: pd.DataFrame, config: dict) -> dict:
     unique_response_cols = list(dict.fromkeys(all_response_cols))
     final_response_cols = [c for c in unique_response_cols if c in df_clean.columns]
 
+    # response_date ya viene como datetime64 desde parse_timestamp_column (no se vuelve a parsear)
     df_responses = df_clean[final_response_cols].copy().reset_index(drop=True)
-    
-    # Asegurar formato de fecha si existe la columna
-    if 'response_date' in df_responses.columns:
-        df_responses['response_date'] = pd.to_datetime(df_responses['response_date'], errors='coerce')
+
+    # Dtypes compactos desde el inicio (categóricas, Int64, boolean); ver app/core/schemas.py
+    apply_schema(df_companies, 'companies')
+    apply_schema(df_contacts, 'contacts')
+    apply_schema(df_responses, 'responses')
 
     return {'companies': df_companies, 'contacts': df_contacts, 'responses': df_responses}
\ No newline at end of file
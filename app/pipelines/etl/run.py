@@ -8,215 +8,194 @@ from thefuzz import process, fuzz
 # Import services
 from app.core.connections.google_sheets_service import read_worksheet_as_dataframe
 from app.pipelines.etl.processing import clean_and_process_data
-from app.pipelines.etl.certifications import analyze_other_certifications
+from app.pipelines.etl.certifications import enrich_certifications
+from app.pipelines.etl.snapshot import build_company_snapshot
+from app.pipelines.etl.id_maps import load_id_maps, save_id_maps, update_id_map, resolve_id_map
 from app.core.connections import supabase_service
+from app.core.logger import get_logger
+from app.pipelines.debug_artifacts import DebugArtifacts
+from app.pipelines.source_snapshots import SourceSnapshots
+from app.core.schemas import frame_from_records
+from app.pipelines.profiling import RunReport
 from config.certifications_catalog_data import CERTIFICATIONS_CATALOG
 
+logger = get_logger(__name__)
+
 def load_config(file_path='config/cleaning_map.json'):
     with open(file_path, 'r', encoding='utf-8') as f:
         return json.load(f)
     
-def get_id_map(table_name, key_column):
-    print(f"Fetching ID map for table '{table_name}'...")
-    try:
-        response = supabase_service.supabase.table(table_name).select(f"id, {key_column}").execute()
-        data = response.data
-        return {row[key_column]: row['id'] for row in data}
-    except Exception as e:
-        print(f"Error fetching map for {table_name}: {e}")
-        return {}
-    
-def find_cert_id(text, catalog_df):
-    """Busca el ID de una certificación dado un texto."""
-    if not text or text in ['OTRAS', 'NULL', '']: return None
-    text_upper = str(text).upper().strip()
-    
-    # 1. Match directo (Acrónimo o Nombre)
-    match = catalog_df[
-        (catalog_df['acronym'] == text_upper) | 
-        (catalog_df['name'].str.upper() == text_upper)
-    ]
-    if not match.empty:
-        return int(match.iloc[0]['id'])
-    
-    # 2. Match por Keywords
-    for _, row in catalog_df.iterrows():
-        keywords = [k.upper() for k in row['search_keywords']]
-        if text_upper in keywords:
-            return int(row['id'])
-            
-    return None
-
-def convert_checkboxes_to_ids(cert_string, db_cert_catalog):
-    """Convierte lista de strings de checkboxes a lista de IDs."""
-    if not isinstance(cert_string, list): return []
-    ids = set()
-    for cert_text in cert_string:
-        found_id = find_cert_id(cert_text, db_cert_catalog)
-        if found_id:
-            ids.add(found_id)
-    return list(ids)
+def source_columns(config: dict) -> list:
+    """Columnas de la hoja que consume el ETL (cleaning map + JSONB), sin duplicados y en orden."""
+    return list(dict.fromkeys(list(config['cleaning_map'].keys()) + config['jsonb_columns']))
 
 def run_etl_process():
     base_path = os.path.dirname(os.path.abspath(__file__))
     output_dir = os.path.join(base_path, '..', '..', '..', 'data', 'outputs')
     os.makedirs(output_dir, exist_ok=True)
     
-    print("--- Inicio del ETL SEDECyT Analytics ---")
+    logger.info("--- Inicio del ETL SEDECyT Analytics ---")
+
+    # Cada paso corre dentro de report.stage(...): tiempo, CPU, RSS y filas quedan en el reporte JSON
+    report = RunReport('etl', output_dir)
+    # Snapshots intermedios: solo con DEBUG_ARTIFACTS=true, escritos en segundo plano
+    artifacts = DebugArtifacts(output_dir, report.run_id)
+    # Copia versionada de las tablas que lee analytics (se publica solo si el ETL llega al final)
+    source_snapshots = SourceSnapshots(report.run_id)
+    try:
+        _run_etl_stages(report, artifacts, os.path.join(output_dir, 'cache', 'id_maps.json'), source_snapshots)
+    finally:
+        artifacts.close()
+        report.write()
 
+def _run_etl_stages(report: RunReport, artifacts: DebugArtifacts, id_map_cache_path: str,
+                    source_snapshots: SourceSnapshots):
     # ---------------------------------------------------------
     # Step 0: Catálogos
     # ---------------------------------------------------------
-    print("\nStep 0: Syncing Certifications Catalog...")
-    df_catalog = pd.DataFrame(CERTIFICATIONS_CATALOG)
-    supabase_service.upload_dataframe_to_supabase(df_catalog, 'certifications_catalog', on_conflict_col='name')
-    
-    # Descargar catálogo con IDs reales
-    db_cert_catalog = pd.DataFrame(supabase_service.get_all_from('certifications_catalog'))
+    logger.info("Step 0: Syncing Certifications Catalog...")
+    with report.stage('catalog_sync', rows_in=len(CERTIFICATIONS_CATALOG)) as stage:
+        df_catalog = pd.DataFrame(CERTIFICATIONS_CATALOG)
+        supabase_service.upload_dataframe_to_supabase(df_catalog, 'certifications_catalog', on_conflict_col='name')
+        
+        # Descargar catálogo con IDs reales
+        db_cert_catalog = supabase_service.get_frame('certifications_catalog')
+        stage.rows_out = len(db_cert_catalog)
+        source_snapshots.save('certifications_catalog', db_cert_catalog)
     
     # ---------------------------------------------------------
     # Step 1 & 2: Extracción y Limpieza Base
     # ---------------------------------------------------------
     # --- 1. EXTRACTION ---
-    print("Step 1: Extracting data from Google Sheets...")
-    df_raw = read_worksheet_as_dataframe("Formulario Desarrollo Industria")
-    print(f"Número total de filas obtenidas: {len(df_raw)}")
-    
-    # [DEBUG] Exportar RAW puro
-    debug_path = os.path.join(output_dir, 'debug_01_raw_from_sheets.csv')
-    df_raw.to_csv(debug_path, index=False, encoding='utf-8-sig')
-    print(f"🔎 DEBUG: Datos crudos guardados en {debug_path}")
+    logger.info("Step 1: Extracting data from Google Sheets...")
+    with report.stage('extraction') as stage:
+        # Solo las columnas que usa el pipeline: las del cleaning map + las que van al JSONB
+        config = load_config()
+        df_raw = read_worksheet_as_dataframe("Formulario Desarrollo Industria", columns=source_columns(config))
+        logger.info(f"Número total de filas obtenidas: {len(df_raw)}")
+        stage.rows_out = len(df_raw)
+        
+        # [DEBUG] Exportar RAW puro
+        artifacts.save('debug_01_raw_from_sheets', df_raw)
 
     # --- 2. TRANSFORMATION ---
-    print("\nStep 2: Transforming data...")
-    config = load_config()
-    
-    # Pasamos el output_dir a processing para que pueda guardar sus propios debugs
-    processed_data = clean_and_process_data(df_raw, config, output_dir) 
-    
-    print("Main data structured into 'companies', 'contacts', and 'responses'.")
-    
-    # Asegurar fechas correctas
-    processed_data['responses']['response_date'] = pd.to_datetime(processed_data['responses']['response_date'])
+    logger.info("Step 2: Transforming data...")
+    with report.stage('cleaning', rows_in=len(df_raw)) as stage:
+        # Pasamos los artifacts a processing para que pueda guardar sus propios debugs
+        processed_data = clean_and_process_data(df_raw, config, artifacts, source_snapshots)
+        
+        logger.info("Main data structured into 'companies', 'contacts', and 'responses'.")
+        stage.rows_out = len(processed_data['responses'])
+        stage.extra = {table: len(df) for table, df in processed_data.items()}
 
     # ---------------------------------------------------------
     # Step 2.5: Procesamiento de Certificaciones (HISTORIAL COMPLETO)
     # ---------------------------------------------------------
-    print("\nStep 2.5: Processing Certifications (Full History)...")
-    
-    # A) IDs de Texto Libre (Para todas las filas)
-    # analyze_other_certifications devuelve un DF con 'other_certifications_ids'
-    df_cert_analysis_full = analyze_other_certifications(
-        processed_data['responses'], 
-        db_cert_catalog.to_dict('records')
-    )
-    
-    # Pegamos esos IDs al dataframe principal de respuestas
-    processed_data['responses'] = processed_data['responses'].merge(
-        df_cert_analysis_full[['clean_rfc', 'response_date', 'other_certifications_ids']], 
-        on=['clean_rfc', 'response_date'], 
-        how='left'
-    )
-
-    # B) IDs de Checkboxes (Para todas las filas)
-    # Nota: Usamos iso_certifications que viene limpio en 'companies' o 'responses'
-    # Si iso_certifications está en companies (por tu cleaning map), necesitamos traerlo a responses
-    # Asumiremos que tu cleaning map lo pone en companies, así que lo mapeamos por RFC temporalmente
-    # o mejor, si el raw tenía esa columna, debió procesarse. 
-    
-    # *FIX RÁPIDO:* Recalculamos 'iso_certifications' desde el RAW para asegurar que esté en responses fila x fila
-    # O usamos el que ya tienes en companies si es 1 a 1. 
-    # Para ser precisos con el historial, vamos a procesar la columna 'iso_certifications' si existe en responses.
-    # Si no existe en responses (porque el map lo mandó a companies), usamos un truco:
-    
-    if 'iso_certifications' not in processed_data['responses'].columns:
-        # Traemos la columna raw original y la limpiamos aquí rápido para tener el histórico
-        # Ojo: Esto asume que la columna se llama "Certificaciones ISO " en el excel
-        col_name = "Certificaciones ISO " 
-        if col_name in df_raw.columns:
-            from app.pipelines.etl.cleaning import clean_certifications_to_array
-            processed_data['responses']['iso_certifications'] = df_raw[col_name].apply(clean_certifications_to_array)
-    
-    # Ahora sí convertimos a IDs
-    processed_data['responses']['iso_certification_ids'] = processed_data['responses']['iso_certifications'].apply(
-        lambda x: convert_checkboxes_to_ids(x, db_cert_catalog)
-    )
+    logger.info("Step 2.5: Processing Certifications (Full History)...")
+    with report.stage('certifications', rows_in=len(processed_data['responses'])) as stage:
+        # IDs de texto libre (additional_data) y de checkboxes (iso_certifications), fila x fila.
+        # Se asignan por posición sobre el mismo DataFrame: sin copia y sin merge por (clean_rfc, response_date).
+        # Si el cleaning map manda 'iso_certifications' a companies, usamos la columna cruda
+        # "Certificaciones ISO " (responses y df_raw están alineados fila a fila).
+        col_name = "Certificaciones ISO "
+        enrich_certifications(
+            processed_data['responses'],
+            db_cert_catalog.to_dict('records'),
+            iso_source=df_raw[col_name] if col_name in df_raw.columns else None
+        )
+        stage.rows_out = len(processed_data['responses'])
 
     # ---------------------------------------------------------
     # Step 3: Upload Master Tables (LATEST SNAPSHOT)
     # ---------------------------------------------------------
-    print("\nStep 3: Uploading Master Tables (Latest Snapshot)...")
-    
-    # 1. Ordenar por fecha y tomar la última respuesta por empresa
-    df_latest_snapshot = processed_data['responses'].sort_values('response_date', ascending=False).drop_duplicates(subset=['clean_rfc'], keep='first')
-    
-    # 2. Preparar el DF de Companies
-    # Tomamos la base limpia de companies
-    df_companies = processed_data['companies'].copy()
-    
-    # 3. Traer los IDs de certificaciones DEL SNAPSHOT
-    # Hacemos merge con el snapshot que ya tiene los IDs calculados (Paso 2.5)
-    df_companies = df_companies.merge(
-        df_latest_snapshot[['clean_rfc', 'iso_certification_ids', 'other_certifications_ids']],
-        on='clean_rfc',
-        how='left'
-    )
-    
-    # 4. Crear la columna MAESTRA (Unión de ambos)
-    def merge_cert_lists(row):
-        ids_checkbox = row['iso_certification_ids'] if isinstance(row['iso_certification_ids'], list) else []
-        ids_text = row['other_certifications_ids'] if isinstance(row['other_certifications_ids'], list) else []
-        return list(set(ids_checkbox + ids_text))
-
-    df_companies['certification_ids'] = df_companies.apply(merge_cert_lists, axis=1)
-    
-    # Subir Companies
-    # Excluimos columnas temporales para no ensuciar, pero mandamos certification_ids
-    cols_companies = [c for c in df_companies.columns if c not in ['iso_certification_ids', 'other_certifications_ids']]
-    supabase_service.upload_dataframe_to_supabase(df_companies[cols_companies], 'companies', on_conflict_col='clean_rfc')
-    
-    # Subir Contacts
-    supabase_service.upload_dataframe_to_supabase(processed_data['contacts'], 'contacts', on_conflict_col='clean_email')
+    logger.info("Step 3: Uploading Master Tables (Latest Snapshot)...")
+    with report.stage('snapshot', rows_in=len(processed_data['responses'])) as stage:
+        
+        # Última respuesta por empresa (un solo lexsort sobre códigos de RFC + fecha, sin merge)
+        # y certification_ids = unión de checkboxes + texto libre de esa respuesta (Paso 2.5)
+        df_companies = build_company_snapshot(processed_data['companies'], processed_data['responses'])
+        stage.rows_out = len(df_companies)
+    
+    with report.stage('upload_master', rows_in=len(df_companies) + len(processed_data['contacts'])):
+        # Subir Companies
+        # El upsert regresa solo (id, llave) de cada fila: con eso armamos los mapas de FKs del Step 4
+        company_rows = supabase_service.upload_dataframe_to_supabase(
+            df_companies, 'companies', on_conflict_col='clean_rfc', returning_cols=['id', 'clean_rfc']
+        )
+        
+        # Subir Contacts
+        contact_rows = supabase_service.upload_dataframe_to_supabase(
+            processed_data['contacts'], 'contacts', on_conflict_col='clean_email', returning_cols=['id', 'clean_email']
+        )
 
     # ---------------------------------------------------------
     # Step 4: Foreign Keys
     # ---------------------------------------------------------
-    print("\nStep 4: Fetching Foreign Keys...")
-    company_map = get_id_map('companies', 'clean_rfc')
-    contact_map = get_id_map('contacts', 'clean_email')
+    logger.info("Step 4: Fetching Foreign Keys...")
+    with report.stage('fk_mapping') as stage:
+        # Mapas de la corrida anterior + lo que regresaron los upserts. Solo se consulta
+        # a la BD por llaves que sigan faltando (sin descargar las tablas completas).
+        id_maps = load_id_maps(id_map_cache_path)
+        company_map = update_id_map(id_maps.setdefault('companies', {}), company_rows, 'clean_rfc')
+        contact_map = update_id_map(id_maps.setdefault('contacts', {}), contact_rows, 'clean_email')
+        resolve_id_map('companies', 'clean_rfc', company_map, processed_data['responses']['clean_rfc'])
+        resolve_id_map('contacts', 'clean_email', contact_map, processed_data['responses']['clean_email'])
+        save_id_maps(id_map_cache_path, id_maps)
+        stage.extra = {'companies': len(company_map), 'contacts': len(contact_map)}
 
     # ---------------------------------------------------------
     # Step 5 & 6: Upload Responses (History)
     # ---------------------------------------------------------
-    print("\nStep 5 & 6: Uploading Responses (History)...")
-    df_responses = processed_data['responses'].copy()
-    
-    # Map FKs
-    df_responses['company_id'] = df_responses['clean_rfc'].map(company_map)
-    df_responses['contact_id'] = df_responses['clean_email'].map(contact_map)
-    
-    # Renombrar para coincidir con BD
-    df_responses.rename(columns={'other_certifications_ids': 'other_certifications'}, inplace=True)
-    
-    # Limpieza final de nulos en listas
-    for col in ['other_certifications', 'iso_certification_ids']:
-        df_responses[col] = df_responses[col].apply(lambda x: x if isinstance(x, list) else [])
+    logger.info("Step 5 & 6: Uploading Responses (History)...")
+    with report.stage('upload_responses', rows_in=len(processed_data['responses'])) as stage:
+        df_responses = processed_data['responses'].copy()
+        
+        # Map FKs
+        df_responses['company_id'] = df_responses['clean_rfc'].map(company_map)
+        df_responses['contact_id'] = df_responses['clean_email'].map(contact_map)
+        
+        # Renombrar para coincidir con BD
+        df_responses.rename(columns={'other_certifications_ids': 'other_certifications'}, inplace=True)
+        
+        # Limpieza final de nulos en listas
+        for col in ['other_certifications', 'iso_certification_ids']:
+            df_responses[col] = df_responses[col].apply(lambda x: x if isinstance(x, list) else [])
 
-    # Filtrar y Subir
-    cols_to_upload = [
-        'company_id', 'contact_id', 'response_date', 
-        'has_expansion_plans', 'has_engineering_area', 
-        'additional_data', 'other_certifications', 'iso_certification_ids'
-    ]
-    # Validar que las columnas existan
-    final_cols = [c for c in cols_to_upload if c in df_responses.columns]
-    
-    # Validar FKs
-    df_responses = df_responses.dropna(subset=['company_id'])
-    
-    supabase_service.upload_dataframe_to_supabase(df_responses[final_cols], 'responses', on_conflict_col='company_id, response_date')
+        # Filtrar y Subir
+        cols_to_upload = [
+            'company_id', 'contact_id', 'response_date', 
+            'has_expansion_plans', 'has_engineering_area', 
+            'additional_data', 'other_certifications', 'iso_certification_ids'
+        ]
+        # Validar que las columnas existan
+        final_cols = [c for c in cols_to_upload if c in df_responses.columns]
+        
+        # Validar FKs
+        df_responses = df_responses.dropna(subset=['company_id'])
+        stage.rows_out = len(df_responses)
+        
+        # Solo los ids de vuelta: si regresan todas las filas, el upsert completo llegó a la BD
+        response_rows = supabase_service.upload_dataframe_to_supabase(
+            df_responses[final_cols], 'responses', on_conflict_col='company_id, response_date', returning_cols=['id']
+        )
+
+    # ---------------------------------------------------------
+    # Step 7: Snapshots para analytics
+    # ---------------------------------------------------------
+    logger.info("Step 7: Saving source snapshots for analytics...")
+    with report.stage('source_snapshots') as stage:
+        # Se guardan las filas tal como se subieron (mismos valores que regresaría la BD),
+        # solo si el upsert regresó todas las filas
+        if len(company_rows) == len(df_companies):
+            df_snapshot = df_companies.copy()
+            df_snapshot['id'] = df_snapshot['clean_rfc'].map({row['clean_rfc']: row['id'] for row in company_rows})
+            source_snapshots.save('companies', frame_from_records(supabase_service.dataframe_to_records(df_snapshot), 'companies'))
+        if len(response_rows) == len(df_responses):
+            source_snapshots.save('responses', frame_from_records(supabase_service.dataframe_to_records(df_responses[final_cols]), 'responses'))
+        source_snapshots.commit()
+        stage.extra = {'tables': sorted(source_snapshots.tables)}
 
-    print("\n✅ ETL Completo: Snapshot maestro y Historial de respuestas sincronizados.")
+    logger.info("✅ ETL Completo: Snapshot maestro y Historial de respuestas sincronizados.")
 
 if __name__ == '__main__':
     load_dotenv()
@@ -0,0 +1,86 @@
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+CERTIFICATION_ID_COLUMNS = ['iso_certification_ids', 'other_certifications_ids']
+
+def latest_rows_by_key(df: pd.DataFrame, key: str = 'clean_rfc', date_col: str = 'response_date') -> pd.DataFrame:
+    """
+    Última fila (por date_col) de cada valor de 'key', sin sort_values + drop_duplicates sobre strings.
+
+    Un solo lexsort sobre (código de la llave, fecha como int64): la última posición de cada
+    grupo es su respuesta más reciente. Fechas nulas cuentan como las más viejas; en empate
+    gana la fila que aparece después. Filas con la llave nula se descartan.
+    """
+    if df.empty:
+        return df.iloc[0:0]
+
+    codes, uniques = pd.factorize(df[key], sort=False)
+    dates = pd.to_datetime(df[date_col], errors='coerce')
+    # NaT es el int64 mínimo, así que queda primero dentro de su grupo
+    date_values = dates.to_numpy(dtype='datetime64[ns]').view('int64')
+
+    order = np.lexsort((date_values, codes)) # estable: en empate conserva el orden original
+    sorted_codes = codes[order]
+    # Último elemento de cada grupo: donde cambia el código (o termina el arreglo)
+    is_last = np.append(sorted_codes[1:] != sorted_codes[:-1], True)
+    latest_positions = order[is_last & (sorted_codes >= 0)]
+
+    return df.iloc[np.sort(latest_positions)]
+
+def certification_ids_by_key(df: pd.DataFrame, key: str = 'clean_rfc', id_cols: list = None) -> pd.Series:
+    """
+    Unión de las columnas de listas de IDs por llave: explode -> drop_duplicates -> agrupar en listas.
+    Regresa una Serie { key: [ids ordenados] } (las llaves sin IDs no aparecen).
+
+    El explode se hace a arreglos planos (código de la llave, id) y la agrupación cortando
+    el arreglo ordenado por código: groupby(...).agg(list) crea un objeto por grupo y es
+    lo más caro de todo el paso con 100k+ respuestas.
+    """
+    id_cols = [c for c in (id_cols or CERTIFICATION_ID_COLUMNS) if c in df.columns]
+    codes, uniques = pd.factorize(df[key], sort=False)
+
+    # 1. Explode: un par (código, id) por cada id de cada lista
+    code_parts, id_parts = [], []
+    for col in id_cols:
+        lists = [ids if isinstance(ids, list) else [] for ids in df[col].tolist()]
+        lengths = np.fromiter((len(ids) for ids in lists), dtype=np.int64, count=len(lists))
+        code_parts.append(np.repeat(codes, lengths))
+        id_parts.append(np.fromiter(chain.from_iterable(lists), dtype=np.int64, count=int(lengths.sum())))
+
+    if not code_parts or not sum(len(part) for part in code_parts):
+        return pd.Series(dtype=object)
+
+    # 2. drop_duplicates + orden por (código, id); fuera las llaves nulas (código -1)
+    pairs = pd.DataFrame({'code': np.concatenate(code_parts), 'cert_id': np.concatenate(id_parts)})
+    pairs = pairs[pairs['code'] >= 0].drop_duplicates().sort_values(['code', 'cert_id'])
+    if pairs.empty:
+        return pd.Series(dtype=object)
+
+    # 3. Agrupar: cortar donde cambia el código
+    sorted_codes = pairs['code'].to_numpy()
+    boundaries = np.flatnonzero(sorted_codes[1:] != sorted_codes[:-1]) + 1
+    groups = np.split(pairs['cert_id'].to_numpy(), boundaries)
+    group_keys = uniques[sorted_codes[np.r_[0, boundaries]]]
+
+    return pd.Series([ids.tolist() for ids in groups], index=group_keys, dtype=object)
+
+def build_company_snapshot(df_companies: pd.DataFrame, df_responses: pd.DataFrame) -> pd.DataFrame:
+    """
+    Companies + 'certification_ids' = unión de checkboxes y texto libre de la
+    respuesta MÁS RECIENTE de cada empresa.
+    """
+    df_latest = latest_rows_by_key(df_responses, 'clean_rfc', 'response_date')
+    cert_ids = certification_ids_by_key(df_latest, 'clean_rfc')
+
+    df_companies = df_companies.copy()
+    mapped = df_companies['clean_rfc'].map(cert_ids)
+    df_companies['certification_ids'] = [ids if isinstance(ids, list) else [] for ids in mapped.tolist()]
+
+    logger.info(f"Snapshot: {len(df_latest)} latest responses for {len(df_companies)} companies.")
+    return df_companies
@@ -0,0 +1,176 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from app.core.logger import get_logger
+
+# 'resource' solo existe en Unix (Cloud Run / Linux). En Windows no reportamos RSS.
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = get_logger(__name__)
+
+def _peak_rss_mb():
+    """Pico de memoria residente del proceso (MB). ru_maxrss viene en KB en Linux y en bytes en macOS."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+class StageRecord:
+    """
+    Métricas de una etapa. El código de la etapa llena rows_in / rows_out
+    (y puede agregar datos extra en 'extra').
+    """
+
+    def __init__(self, name: str, rows_in: int = None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.extra = {}
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.peak_rss_mb = None
+        self.rss_growth_mb = None
+        self.status = 'running'
+        self.error = None
+        self.profile = None
+
+    def to_dict(self) -> dict:
+        record = {
+            'name': self.name,
+            'status': self.status,
+            'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds,
+            'peak_rss_mb': self.peak_rss_mb,
+            'rss_growth_mb': self.rss_growth_mb,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+        }
+        if self.extra:
+            record['extra'] = self.extra
+        if self.error:
+            record['error'] = self.error
+        if self.profile:
+            record['profile'] = self.profile
+        return record
+
+class RunReport:
+    """
+    Reporte de una corrida de pipeline: una lista de etapas con tiempo de pared, CPU,
+    pico de RSS y conteo de filas, escrito como JSON al terminar.
+
+        report = RunReport('etl', output_dir)
+        with report.stage('extraction') as stage:
+            df = ...
+            stage.rows_out = len(df)
+        report.write()
+
+    Con PIPELINE_PROFILE=cprofile (o pyinstrument, si está instalado) cada etapa
+    además guarda su perfil en <output_dir>/profiles/.
+    """
+
+    def __init__(self, pipeline: str, output_dir: str, profiler: str = None):
+        self.pipeline = pipeline
+        self.output_dir = output_dir
+        self.profiler = (profiler if profiler is not None else os.getenv('PIPELINE_PROFILE', '')).lower() or None
+        self.started_at = datetime.now()
+        self.run_id = self.started_at.strftime('%Y%m%d_%H%M%S')
+        self.stages = []
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int = None):
+        record = StageRecord(name, rows_in)
+        self.stages.append(record)
+
+        rss_before = _peak_rss_mb()
+        profiler = self._start_profiler()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+            record.status = 'ok'
+        except Exception as e:
+            record.status = 'error'
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record.wall_seconds = round(time.perf_counter() - wall_start, 3)
+            record.cpu_seconds = round(time.process_time() - cpu_start, 3)
+            record.peak_rss_mb = _peak_rss_mb()
+            if rss_before is not None:
+                record.rss_growth_mb = round(record.peak_rss_mb - rss_before, 1)
+            record.profile = self._stop_profiler(profiler, name)
+            logger.info(
+                f"⏱️  [{name}] {record.status} · {record.wall_seconds}s wall · {record.cpu_seconds}s CPU"
+                f" · peak RSS {record.peak_rss_mb} MB · rows {record.rows_in} -> {record.rows_out}"
+            )
+
+    def _start_profiler(self):
+        if self.profiler == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        if self.profiler == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                logger.warning("PIPELINE_PROFILE=pyinstrument but pyinstrument is not installed. Profiling disabled.")
+                self.profiler = None
+                return None
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        return None
+
+    def _stop_profiler(self, profiler, stage_name: str):
+        if profiler is None:
+            return None
+
+        profiles_dir = os.path.join(self.output_dir, 'profiles')
+        os.makedirs(profiles_dir, exist_ok=True)
+        base_path = os.path.join(profiles_dir, f"{self.pipeline}_{self.run_id}_{stage_name}")
+
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            profiler.dump_stats(f"{base_path}.prof")
+            # Top 15 por tiempo acumulado, para leerlo directo en el reporte
+            summary = io.StringIO()
+            pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(15)
+            return {'file': f"{base_path}.prof", 'top_cumulative': summary.getvalue().splitlines()[-20:]}
+
+        profiler.stop()
+        with open(f"{base_path}.html", 'w', encoding='utf-8') as f:
+            f.write(profiler.output_html())
+        return {'file': f"{base_path}.html"}
+
+    def to_dict(self) -> dict:
+        return {
+            'pipeline': self.pipeline,
+            'run_id': self.run_id,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'total_wall_seconds': round(time.perf_counter() - self._start_wall, 3),
+            'total_cpu_seconds': round(time.process_time() - self._start_cpu, 3),
+            'peak_rss_mb': _peak_rss_mb(),
+            'stages': [stage.to_dict() for stage in self.stages],
+        }
+
+    def write(self) -> str:
+        """Escribe el reporte en <output_dir>/run_reports/<pipeline>_<run_id>.json y regresa la ruta."""
+        reports_dir = os.path.join(self.output_dir, 'run_reports')
+        os.makedirs(reports_dir, exist_ok=True)
+        path = os.path.join(reports_dir, f"{self.pipeline}_{self.run_id}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        logger.info(f"📝 Run report saved to {path}")
+        return path
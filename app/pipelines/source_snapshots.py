@@ -0,0 +1,272 @@
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from app.core.connections import supabase_service
+from app.core.logger import get_logger
+
+# pyarrow es opcional: sin él los snapshots se guardan como pickle (sin proyección al leer)
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+logger = get_logger(__name__)
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SOURCE_SNAPSHOTS_ENABLED = os.getenv('SOURCE_SNAPSHOTS', 'true').lower() in ('1', 'true', 'yes')
+SOURCE_SNAPSHOT_DIR = os.getenv('SOURCE_SNAPSHOT_DIR', os.path.join(_REPO_ROOT, 'data', 'outputs', 'snapshots'))
+SOURCE_SNAPSHOT_MAX_AGE_HOURS = float(os.getenv('SOURCE_SNAPSHOT_MAX_AGE_HOURS', 24))
+SOURCE_SNAPSHOT_KEEP = int(os.getenv('SOURCE_SNAPSHOT_KEEP', 2))
+
+MANIFEST_NAME = 'manifest.json'
+
+# Tablas en las que el upsert del ETL edita filas existentes: llave natural y columnas vigiladas (las que
+# cuentan los rollups de tendencias). Al guardar se compara contra el snapshot publicado para saber si
+# alguna fila ya existente cambió en esas columnas (rows_edited_at)
+SNAPSHOT_EDIT_TRACKING = {
+    'responses': {
+        'key': ['company_id', 'response_date'],
+        'columns': ['has_expansion_plans', 'has_engineering_area', 'iso_certification_ids', 'other_certifications'],
+    },
+}
+
+def _write_frame(df: pd.DataFrame, path_base: str) -> str:
+    """Parquet si hay pyarrow (y las columnas caben en Arrow); si no, pickle. Regresa el archivo escrito."""
+    if pyarrow is not None:
+        try:
+            df.to_parquet(f"{path_base}.parquet", index=False)
+            return f"{path_base}.parquet"
+        except Exception as e:
+            logger.warning(f"  - ⚠️  Parquet snapshot failed for {os.path.basename(path_base)}, using pickle: {e}")
+    df.reset_index(drop=True).to_pickle(f"{path_base}.pkl")
+    return f"{path_base}.pkl"
+
+def _read_frame(path: str, columns: list = None) -> pd.DataFrame:
+    if path.endswith('.parquet'):
+        # Solo las columnas pedidas, con el archivo mapeado en memoria
+        return pd.read_parquet(path, columns=columns, memory_map=True)
+    df = pd.read_pickle(path)
+    return df[columns] if columns is not None else df
+
+def _as_fetched(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Con SUPABASE_FETCH_FORMAT=csv, get_frame regresa '' como nulo (frame_from_csv); el snapshot
+    se guarda igual para que analytics vea lo mismo venga de donde venga la tabla.
+    """
+    if supabase_service.SUPABASE_FETCH_FORMAT != 'csv':
+        return df
+    df = df.copy()
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            if '' in values.cat.categories:
+                df[column] = values.cat.remove_categories([''])
+        elif pd.api.types.is_string_dtype(values) or values.dtype == object:
+            blank = values.map(lambda v: isinstance(v, str) and v == '').astype(bool)
+            if blank.any():
+                df[column] = values.mask(blank)
+    return df
+
+def _cell_text(value) -> str:
+    """
+    Texto comparable de una celda, venga de pickle o de parquet y con el dtype que le haya tocado
+    (arreglos como listas, booleanos y flotantes enteros como int, nulos como '').
+    """
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    if pd.isna(value):
+        return ''
+    if isinstance(value, (bool, np.bool_)) or (isinstance(value, (float, np.floating)) and float(value).is_integer()):
+        return str(int(value))
+    return str(value)
+
+def _row_texts(df: pd.DataFrame, key_columns: list, value_columns: list) -> dict:
+    """{llave: valores de value_columns} como texto, para comparar snapshots fila por fila."""
+    texts = {column: df[column].map(_cell_text).astype(object) for column in key_columns + value_columns}
+    keys = texts[key_columns[0]]
+    for column in key_columns[1:]:
+        keys = keys + '\x1f' + texts[column]
+    values = pd.Series('', index=df.index, dtype=object)
+    for column in value_columns:
+        values = values + '\x1f' + texts[column]
+    return dict(zip(keys, values))
+
+def _edited_rows(previous: pd.DataFrame, current: pd.DataFrame, key_columns: list, value_columns: list) -> int:
+    """Filas de 'previous' que ya no están en 'current' o cambiaron en value_columns (las nuevas no cuentan)."""
+    value_columns = [c for c in value_columns if c in previous.columns or c in current.columns]
+    columns = key_columns + value_columns
+    if not all(c in previous.columns and c in current.columns for c in columns):
+        return len(previous)
+    current_rows = _row_texts(current, key_columns, value_columns)
+    return sum(1 for key, values in _row_texts(previous, key_columns, value_columns).items()
+               if current_rows.get(key) != values)
+
+class SourceSnapshots:
+    """
+    Snapshots versionados de las tablas fuente de analytics (companies, responses y catálogos).
+
+    El ETL guarda lo que acaba de subir (save) y al final publica el manifiesto (commit):
+    cada tabla queda con su huella en la BD (filas + id máximo) al momento de escribirla.
+    analytics (load) usa el snapshot solo si la huella actual de la BD es la misma y no es
+    más viejo que SOURCE_SNAPSHOT_MAX_AGE_HOURS; si no, regresa None y se lee de Supabase.
+
+    Cada corrida escribe en <SOURCE_SNAPSHOT_DIR>/<run_id>/ y se conservan las últimas
+    SOURCE_SNAPSHOT_KEEP. Parquet si hay pyarrow; si no, pickle.
+    Supuesto: el ETL es el único que escribe estas tablas (ediciones manuales que no cambian
+    filas ni ids no se detectan hasta que el snapshot expira). Las ediciones que hace el propio
+    ETL (upsert sobre filas existentes) quedan en 'rows_edited_at' de las tablas de SNAPSHOT_EDIT_TRACKING.
+    """
+
+    def __init__(self, run_id: str = None, base_dir: str = None, enabled: bool = None):
+        self.enabled = SOURCE_SNAPSHOTS_ENABLED if enabled is None else enabled
+        self.base_dir = base_dir or SOURCE_SNAPSHOT_DIR
+        self.run_id = run_id
+        self._tables = {}
+
+    @property
+    def tables(self) -> list:
+        return list(self._tables)
+
+    # --- Escritura (ETL) ---
+    def save(self, table_name: str, df: pd.DataFrame):
+        """
+        Guarda 'df' como el contenido actual de 'table_name' (con los dtypes de lectura, ver
+        frame_from_records). Si la BD tiene otro número de filas (ej. empresas que ya no están
+        en la hoja) el snapshot no se publica.
+        """
+        if not self.enabled or df is None:
+            return
+        try:
+            fingerprint = supabase_service.get_table_fingerprint(table_name)
+            if fingerprint['rows'] != len(df):
+                logger.info(f"  - Snapshot '{table_name}' skipped: {len(df)} rows here vs {fingerprint['rows']} in DB.")
+                return
+            run_dir = os.path.join(self.base_dir, self.run_id)
+            os.makedirs(run_dir, exist_ok=True)
+            snapshot = _as_fetched(df)
+            path = _write_frame(snapshot, os.path.join(run_dir, table_name))
+            self._tables[table_name] = {**fingerprint, 'file': os.path.relpath(path, self.base_dir),
+                                        'columns': list(df.columns)}
+            if table_name in SNAPSHOT_EDIT_TRACKING:
+                self._tables[table_name]['rows_edited_at'] = self._rows_edited_at(table_name, snapshot)
+        except Exception as e:
+            logger.warning(f"  - ⚠️  Could not snapshot '{table_name}': {e}")
+
+    def _rows_edited_at(self, table_name: str, df: pd.DataFrame) -> str:
+        """
+        Cuándo cambió por última vez alguna fila existente de la tabla (en las columnas vigiladas):
+        la fecha del manifiesto publicado si ninguna cambió desde ese snapshot; ahora si alguna
+        cambió o no hay con qué comparar.
+        """
+        tracking = SNAPSHOT_EDIT_TRACKING[table_name]
+        now = datetime.now(timezone.utc).isoformat()
+        previous = self._manifest().get('tables', {}).get(table_name)
+        if not previous or not previous.get('rows_edited_at'):
+            return now
+        try:
+            columns = [c for c in tracking['key'] + tracking['columns'] if c in previous['columns']]
+            edited = _edited_rows(_read_frame(os.path.join(self.base_dir, previous['file']), columns), df,
+                                  tracking['key'], tracking['columns'])
+        except Exception as e:
+            logger.warning(f"  - ⚠️  Could not compare '{table_name}' with the previous snapshot: {e}")
+            return now
+        if edited:
+            logger.info(f"  - '{table_name}': {edited} existing rows changed since the previous snapshot.")
+            return now
+        return previous['rows_edited_at']
+
+    def commit(self):
+        """Publica el manifiesto (escritura atómica) y borra las corridas viejas."""
+        if not self.enabled or not self._tables:
+            return
+        manifest = {
+            'run_id': self.run_id,
+            'written_at': datetime.now(timezone.utc).isoformat(),
+            'tables': self._tables,
+        }
+        path = os.path.join(self.base_dir, MANIFEST_NAME)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        logger.info(f"📦 Source snapshots published: {sorted(self._tables)}")
+        self._prune()
+
+    def _prune(self):
+        runs = sorted(
+            name for name in os.listdir(self.base_dir)
+            if os.path.isdir(os.path.join(self.base_dir, name)) and name != self.run_id
+        )
+        for name in runs[:max(len(runs) - (SOURCE_SNAPSHOT_KEEP - 1), 0)]:
+            shutil.rmtree(os.path.join(self.base_dir, name), ignore_errors=True)
+
+    # --- Lectura (analytics) ---
+    def _manifest(self) -> dict:
+        if not hasattr(self, '_cached_manifest'):
+            path = os.path.join(self.base_dir, MANIFEST_NAME)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._cached_manifest = json.load(f)
+            except (OSError, ValueError):
+                self._cached_manifest = {}
+        return self._cached_manifest
+
+    def version(self):
+        """'<run_id>@<written_at>' del manifiesto publicado (None si no hay): cambia con cada ETL que publica."""
+        if not self.enabled:
+            return None
+        manifest = self._manifest()
+        if not manifest.get('run_id'):
+            return None
+        return f"{manifest['run_id']}@{manifest['written_at']}"
+
+    def rows_edited_at(self, table_name: str):
+        """
+        datetime (UTC) de la última vez que el ETL cambió filas existentes de la tabla, según el
+        manifiesto publicado (None si no hay dato: snapshots apagados, sin manifiesto o tabla no vigilada).
+        """
+        if not self.enabled:
+            return None
+        edited_at = self._manifest().get('tables', {}).get(table_name, {}).get('rows_edited_at')
+        return datetime.fromisoformat(edited_at) if edited_at else None
+
+    def load(self, table_name: str, columns: list = None):
+        """DataFrame del snapshot (solo 'columns') si sigue vigente; None si hay que ir a la BD."""
+        if not self.enabled:
+            return None
+        manifest = self._manifest()
+        entry = manifest.get('tables', {}).get(table_name)
+        if entry is None:
+            return None
+
+        age_hours = (datetime.now(timezone.utc) - datetime.fromisoformat(manifest['written_at'])).total_seconds() / 3600
+        if age_hours > SOURCE_SNAPSHOT_MAX_AGE_HOURS:
+            logger.info(f"  - Snapshot '{table_name}' is {age_hours:.1f}h old. Reading from the database.")
+            return None
+        try:
+            current = supabase_service.get_table_fingerprint(table_name)
+        except Exception as e:
+            logger.warning(f"  - ⚠️  Could not check version of '{table_name}': {e}")
+            return None
+        if current['rows'] != entry['rows'] or current['max_id'] != entry['max_id']:
+            logger.info(f"  - Snapshot '{table_name}' is outdated ({entry['rows']}/{entry['max_id']} vs "
+                        f"{current['rows']}/{current['max_id']}). Reading from the database.")
+            return None
+        try:
+            # El snapshot tiene todas las columnas de la tabla: las que falten tampoco están en la BD
+            if columns is not None:
+                columns = [c for c in columns if c in entry['columns']]
+            df = _read_frame(os.path.join(self.base_dir, entry['file']), columns)
+        except Exception as e:
+            logger.warning(f"  - ⚠️  Could not read snapshot '{table_name}': {e}")
+            return None
+        logger.info(f"  - '{table_name}' from snapshot {manifest['run_id']} ({len(df)} rows).")
+        return df
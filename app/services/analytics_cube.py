@@ -0,0 +1,266 @@
+"""
+Cubo en memoria para /api/analytics/query: cruces ad hoc (ej. certificaciones por sector dentro
+de un municipio) sin agregar una gráfica a DASHBOARDS_CONFIG ni correr analytics completo.
+
+Por cada tabla (companies, responses) y cada dimensión categórica se guarda un bitmap por valor
+(uint64 empacados, bit i = fila i tiene ese valor). Un filtro es OR de bitmaps dentro de la misma
+dimensión y AND entre dimensiones; el group_by es el AND del filtro con cada bitmap de la dimensión
+y el conteo es un popcount. Certificaciones es una dimensión multivaluada: una empresa cuenta una
+vez en cada certificación que tiene.
+
+El cubo se arma con las mismas fuentes que las gráficas (load_analytics_sources: snapshots del ETL
+si siguen vigentes, si no Supabase). Su versión es la de esas tablas (data_version: huella por tabla
++ manifiesto del ETL), revisada como mucho cada ANALYTICS_CUBE_CHECK_SECONDS; solo se reconstruye
+cuando cambia, en segundo plano mientras el cubo anterior sigue respondiendo. Si las tablas no tienen
+columna de versión, el cambio se detecta con count + id máximo (no ve ediciones) y el cubo no da ETag.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.core.logger import get_logger
+from app.core.metrics import span
+from app.pipelines.analytics.analysis_functions import chart_labels
+from app.pipelines.analytics.array_columns import array_column, catalog_map
+from app.services.data_version import data_version, table_fingerprints
+
+logger = get_logger(__name__)
+
+# Cada cuánto se revisa la versión de las fuentes (requests de una fila, no la descarga)
+ANALYTICS_CUBE_CHECK_SECONDS = float(os.getenv('ANALYTICS_CUBE_CHECK_SECONDS', 60))
+
+# Tablas que lee load_analytics_sources: la versión del cubo es la de estas
+CUBE_SOURCE_TABLES = ['companies', 'responses', 'municipality_catalog', 'industrial_parks_catalog', 'certifications_catalog']
+
+# Dimensión pública -> columna de la tabla (ya cruzada con los catálogos en load_analytics_sources)
+CUBE_DIMENSIONS = {
+    'companies': {
+        'sector': 'sector',
+        'municipality': 'municipality',
+        'industrial_park': 'industrial_park',
+        'procurement_tier': 'procurement_tier',
+        'certification': 'certification_ids',
+    },
+    'responses': {
+        'sector': 'sector',
+        'municipality': 'municipality',
+        'has_expansion_plans': 'has_expansion_plans',
+        'has_engineering_area': 'has_engineering_area',
+    },
+}
+
+# Medida pública -> columna que se suma (None = conteo de filas)
+CUBE_MEASURES = {
+    'companies': {'count': None, 'employee_count': 'employee_count'},
+    'responses': {'count': None},
+}
+
+# Dimensiones multivaluadas (columnas de arreglos) y su catálogo para traducir los IDs
+_ARRAY_DIMENSIONS = {'certification_ids': ('certifications_catalog', 'id', 'acronym')}
+
+FILL_NA = "SIN ESPECIFICAR"
+_BOOL_LABELS = {True: 'true', False: 'false'}
+
+# popcount por palabra: np.bitwise_count (NumPy >= 2.0) o tabla de 256 entradas sobre los bytes
+if hasattr(np, 'bitwise_count'):
+    def _popcount(words: np.ndarray) -> np.ndarray:
+        """Bits encendidos por renglón de una matriz de palabras uint64."""
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words: np.ndarray) -> np.ndarray:
+        """Bits encendidos por renglón de una matriz de palabras uint64."""
+        as_bytes = words.view(np.uint8).reshape(words.shape[:-1] + (-1,))
+        return _POPCOUNT_TABLE[as_bytes].sum(axis=-1, dtype=np.int64)
+
+def _bitmaps(rows: np.ndarray, codes: np.ndarray, n_values: int, n_rows: int) -> np.ndarray:
+    """Matriz (n_values, n_palabras): bit 'row' encendido en el renglón 'code' por cada par (row, code)."""
+    n_words = (n_rows + 63) // 64
+    bitmaps = np.zeros((n_values, n_words), dtype=np.uint64)
+    bits = np.left_shift(np.uint64(1), (rows & 63).astype(np.uint64))
+    np.bitwise_or.at(bitmaps, (codes, rows >> 6), bits)
+    return bitmaps
+
+def _scalar_index(series: pd.Series) -> tuple:
+    """Una etiqueta por fila: nulos y vacíos -> FILL_NA (igual que analyze_categorical); booleanos 'true'/'false'."""
+    mapping = _BOOL_LABELS if pd.api.types.is_bool_dtype(series.dtype) else None
+    codes, labels = pd.factorize(chart_labels(series, FILL_NA, mapping), use_na_sentinel=True)
+    rows = np.arange(len(series), dtype=np.int64)
+    return rows, codes.astype(np.int64), [str(label) for label in labels]
+
+def _array_index(df: pd.DataFrame, column: str, catalog_df: pd.DataFrame, id_col: str, name_col: str) -> tuple:
+    """Un par (fila, etiqueta) por elemento del arreglo; IDs traducidos con el catálogo ("ID x" si no está)."""
+    array = array_column(df, column)
+    rows = np.repeat(np.arange(len(df), dtype=np.int64), np.diff(array.offsets))
+    mapping = catalog_map(catalog_df, id_col, name_col) if catalog_df is not None and not catalog_df.empty else {}
+    label_codes, labels = pd.factorize(
+        pd.Series([mapping.get(str(value), f"ID {value}") for value in array.uniques], dtype=object))
+    valid = array.codes >= 0
+    return rows[valid], label_codes[array.codes[valid]].astype(np.int64), [str(label) for label in labels]
+
+class CubeTable:
+    """
+    Bitmaps por valor de cada dimensión de una tabla, más las medidas a sumar.
+    labels[dim]: etiquetas en orden de primera aparición; bitmaps[dim][i]: filas con labels[dim][i].
+    """
+
+    def __init__(self, table_name: str, df: pd.DataFrame, data_sources: dict):
+        self.n_rows = len(df)
+        self.labels, self.bitmaps, self._positions = {}, {}, {}
+        for dim, column in CUBE_DIMENSIONS[table_name].items():
+            if column not in df.columns:
+                continue
+            if column in _ARRAY_DIMENSIONS:
+                catalog_key, id_col, name_col = _ARRAY_DIMENSIONS[column]
+                rows, codes, labels = _array_index(df, column, data_sources.get(catalog_key), id_col, name_col)
+            else:
+                rows, codes, labels = _scalar_index(df[column])
+            self.labels[dim] = labels
+            self.bitmaps[dim] = _bitmaps(rows, codes, len(labels), self.n_rows)
+            self._positions[dim] = {label: i for i, label in enumerate(labels)}
+
+        self.measures = {
+            name: pd.to_numeric(df[column], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+            for name, column in CUBE_MEASURES[table_name].items() if column is not None and column in df.columns
+        }
+
+        # Todas las filas (sin los bits sobrantes de la última palabra)
+        self.all_rows = _bitmaps(np.arange(self.n_rows, dtype=np.int64), np.zeros(self.n_rows, dtype=np.int64),
+                                 1, self.n_rows)[0]
+
+    def _check_dimension(self, dim: str):
+        if dim not in self.labels:
+            raise ValueError(f"Unknown dimension '{dim}'. Available: {sorted(self.labels)}")
+
+    def selection(self, filters: dict) -> np.ndarray:
+        """Bitmap de filas que cumplen {dim: [valores]}: OR dentro de la dimensión, AND entre dimensiones."""
+        for dim in filters:
+            self._check_dimension(dim)
+        selected = self.all_rows.copy()
+        for dim, values in filters.items():
+            positions = [self._positions[dim][v] for v in values if v in self._positions[dim]]
+            if not positions:
+                return np.zeros_like(selected)  # ningún valor existe: no hay filas
+            selected &= np.bitwise_or.reduce(self.bitmaps[dim][positions], axis=0)
+        return selected
+
+    def _measure_total(self, bitmaps: np.ndarray, measure: str) -> np.ndarray:
+        if measure == 'count':
+            return _popcount(bitmaps)
+        # Suma: bits -> máscara por fila y producto con la medida (un renglón por valor)
+        mask = np.unpackbits(bitmaps.astype('<u8', copy=False).view(np.uint8), axis=-1, bitorder='little')[..., :self.n_rows]
+        return mask @ self.measures[measure]
+
+    def query(self, filters: dict = None, group_by: str = None, measure: str = 'count', limit: int = None) -> dict:
+        """
+        {"labels", "values", "total"}: la medida por valor de 'group_by' (descendente, empates en orden
+        de primera aparición, sin valores en cero) dentro de las filas filtradas. Sin group_by solo el total.
+        """
+        if measure != 'count' and measure not in self.measures:
+            raise ValueError(f"Unknown measure '{measure}'. Available: {['count'] + sorted(self.measures)}")
+        selected = self.selection(filters or {})
+        total = int(self._measure_total(selected[np.newaxis], measure)[0])
+        if group_by is None:
+            return {"labels": [], "values": [], "total": total}
+
+        self._check_dimension(group_by)
+        grouped = self.bitmaps[group_by] & selected
+        present = np.flatnonzero(_popcount(grouped))
+        values = self._measure_total(grouped[present], measure)
+        order = np.argsort(-values, kind='stable')
+        if limit:
+            order = order[:limit]
+        labels = self.labels[group_by]
+        return {"labels": [labels[i] for i in present[order]], "values": values[order].tolist(), "total": total}
+
+class AnalyticsCube:
+    """
+    Una CubeTable por tabla de CUBE_DIMENSIONS, con la versión de las fuentes con que se armó.
+    exact=False: la versión es count + id máximo (ver _source_version), no sirve de ETag.
+    """
+
+    def __init__(self, data_sources: dict, version: str, exact: bool = True):
+        self.version = version
+        self.exact = exact
+        self.built_at = time.monotonic()
+        self.tables = {
+            table_name: CubeTable(table_name, data_sources[table_name], data_sources)
+            for table_name in CUBE_DIMENSIONS if data_sources.get(table_name) is not None
+        }
+
+    def query(self, table_name: str, **kwargs) -> dict:
+        if table_name not in self.tables:
+            raise ValueError(f"Unknown table '{table_name}'. Available: {sorted(self.tables)}")
+        return {**self.tables[table_name].query(**kwargs), "version": self.version}
+
+_CUBE = None
+_CUBE_LOCK = threading.Lock()
+_CHECKED_AT = None  # time.monotonic() de la última revisión de versión
+_REBUILDING = False
+
+def _source_version() -> tuple:
+    """(versión de CUBE_SOURCE_TABLES, exacta): data_version o, si no la hay, count + id máximo."""
+    version = data_version(CUBE_SOURCE_TABLES)
+    if version is not None:
+        return version, True
+    return table_fingerprints(CUBE_SOURCE_TABLES), False
+
+def _build_cube(version: str, exact: bool) -> AnalyticsCube:
+    from app.pipelines.analytics.run import load_analytics_sources
+
+    start = time.perf_counter()
+    with span('analytics.cube_build'):
+        cube = AnalyticsCube(load_analytics_sources(), version, exact)
+    rows = {name: table.n_rows for name, table in cube.tables.items()}
+    logger.info(f"📦 Analytics cube built in {time.perf_counter() - start:.2f}s {rows} (version {version[:12]})")
+    return cube
+
+def _rebuild_in_background(version: str, exact: bool):
+    global _CUBE, _REBUILDING
+    try:
+        cube = _build_cube(version, exact)
+        with _CUBE_LOCK:
+            _CUBE = cube
+    except Exception as e:
+        logger.error(f"❌ Could not rebuild analytics cube, keeping version {_CUBE.version[:12]}: {e}")
+    finally:
+        with _CUBE_LOCK:
+            _REBUILDING = False
+
+def get_cube() -> AnalyticsCube:
+    """
+    El cubo vigente del proceso. La versión de las fuentes se revisa como mucho cada
+    ANALYTICS_CUBE_CHECK_SECONDS (una sola petición revisa; las demás siguen con el cubo actual).
+    Si cambió, se reconstruye en un hilo y mientras tanto responde el cubo anterior, con su versión:
+    el ETag sigue correspondiendo a los datos. Solo la primera petición del proceso espera la
+    construcción (y lanza la excepción si no se pudo armar).
+    """
+    global _CUBE, _CHECKED_AT, _REBUILDING
+    with _CUBE_LOCK:
+        cube = _CUBE
+        if cube is None:
+            # Primera petición: no hay nada que servir mientras tanto; las demás esperan esta construcción
+            _CUBE = _build_cube(*_source_version())
+            _CHECKED_AT = time.monotonic()
+            return _CUBE
+        if _REBUILDING or time.monotonic() - _CHECKED_AT < ANALYTICS_CUBE_CHECK_SECONDS:
+            return cube
+        _CHECKED_AT = time.monotonic()
+
+    try:
+        version, exact = _source_version()
+    except Exception as e:
+        logger.warning(f"⚠️  Could not check analytics cube version, serving {cube.version[:12]}: {e}")
+        return cube
+    if version != cube.version:
+        with _CUBE_LOCK:
+            if _REBUILDING:
+                return cube
+            _REBUILDING = True
+        logger.info(f"📦 Analytics sources changed ({cube.version[:12]} -> {version[:12]}). Rebuilding cube.")
+        threading.Thread(target=_rebuild_in_background, args=(version, exact), name='analytics-cube', daemon=True).start()
+    return cube
@@ -1,4 +1,15 @@
 from app.core.connections import supabase_service
+from app.core.hashing import canonical_hash
+from app.core.logger import get_logger
+from app.pipelines.analytics.planner import VARIANT_SLUG_PATTERN, variant_slug
+from config.dashboards_config import DASHBOARDS_CONFIG
+
+logger = get_logger(__name__)
+
+# Metadatos que el analytics run escribe en 'dashboards' (parte de la versión de /api/dashboards)
+DASHBOARDS_METADATA_HASH = canonical_hash([
+    {key: dashboard[key] for key in ('slug', 'title', 'description', 'position')} for dashboard in DASHBOARDS_CONFIG
+])
 
 def get_all_dashboards_list():
     """
@@ -9,7 +20,7 @@ def get_all_dashboards_list():
         dashboards_response = supabase_service.supabase.table('dashboards').select('id, slug, title, description, position').order('position').execute()
         return dashboards_response.data
     except Exception as e:
-        print(f"Error fetching dashboard list from Supabase: {e}")
+        logger.error(f"Error fetching dashboard list from Supabase: {e}")
         return []
 
 def get_dashboards_with_data():
@@ -21,8 +32,10 @@ def get_dashboards_with_data():
         dashboards_response = supabase_service.supabase.table('dashboards').select('*').order('position').execute()
         dashboards = dashboards_response.data
         
-        # 2. Fetch all charts
-        charts_response = supabase_service.supabase.table('charts').select('*').order('position').execute()
+        # 2. Fetch all charts (sin las filas de variantes del fan-out: no salen en los dashboards)
+        charts_response = supabase_service.supabase.table('charts').select('*').not_.like(
+            'chart_slug', VARIANT_SLUG_PATTERN
+        ).order('position').execute()
         all_charts = charts_response.data
         
         # 3. Create a map...
@@ -32,7 +45,7 @@ def get_dashboards_with_data():
             # Si is_active es explícitamente False, ignoramos este registro.
             # Usamos .get() para que si la columna no existe aún, asuma True (visible) por defecto.
             if chart.get('is_active') is False:
-                print(f"Skipping inactive chart: {chart.get('chart_slug')}")
+                logger.debug(f"Skipping inactive chart: {chart.get('chart_slug')}")
                 continue
 
             dashboard_id = chart['dashboard_id']
@@ -55,5 +68,49 @@ def get_dashboards_with_data():
         return dashboards
 
     except Exception as e:
-        print(f"❌ Error fetching dashboards from Supabase: {e}")
-        return []
\ No newline at end of file
+        logger.error(f"❌ Error fetching dashboards from Supabase: {e}")
+        return []
+
+def dashboard_version(dashboard: dict) -> str:
+    """
+    Versión (ETag fuerte) de un dashboard ya ensamblado: hash de sus metadatos
+    más el hash de cada una de sus gráficas. Si ninguna gráfica cambió, la versión es la misma.
+    """
+    chart_hashes = [canonical_hash(chart) for chart in dashboard.get('charts', [])]
+    metadata = {key: value for key, value in dashboard.items() if key != 'charts'}
+    return canonical_hash([metadata, chart_hashes])
+
+def get_chart_variants(chart_slug: str, dimension: str):
+    """
+    Fila con las variantes precalculadas de una gráfica por 'dimension' (fan-out del analytics run):
+    {'title', 'chart_type', 'chart_data': {'dimension', 'dataset', 'variants'}} o None si no existe.
+    """
+    try:
+        response = supabase_service.supabase.table('charts').select('title, chart_type, chart_data').eq(
+            'chart_slug', variant_slug(chart_slug, dimension)
+        ).limit(1).execute()
+        return response.data[0] if response.data else None
+    except Exception as e:
+        logger.error(f"Error fetching variants of chart '{chart_slug}' by '{dimension}': {e}")
+        return None
+
+def build_chart_variant(variants_row: dict, chart_slug: str, value: str):
+    """
+    La gráfica para un valor de la dimensión, con el mismo formato que en get_dashboards_with_data
+    (más 'dimension' y 'value'). Solo arma el objeto: no recalcula nada. None si el valor no tiene variante.
+    """
+    chart_data = variants_row['chart_data']
+    variant = chart_data['variants'].get(value)
+    if variant is None:
+        return None
+    return {
+        "chart_id": chart_slug,
+        "title": variants_row["title"],
+        "type": variants_row["chart_type"],
+        "data": {
+            "labels": variant["labels"],
+            "datasets": [{**chart_data["dataset"], "data": variant["values"]}],
+        },
+        "dimension": chart_data["dimension"],
+        "value": value,
+    }
@@ -0,0 +1,63 @@
+"""
+Versión barata de las tablas que hay detrás de una respuesta de la API, para los ETags:
+se calcula ANTES de descargar nada, así un 304 cuesta un request de una fila por tabla.
+
+Por tabla: count exacto + el valor más alto de DATA_VERSION_COLUMN ('updated_at', que el trigger de
+supabase/migrations/20261019000000_data_version_updated_at.sql mueve en cada alta o edición, venga
+o no del ETL). Se le suma la versión del último ETL publicado (manifiesto de snapshots) cuando este
+host la ve.
+
+Si alguna tabla no tiene la columna (migración sin aplicar) no hay versión: data_version regresa
+None y la respuesta sale sin ETag. Un count + id máximo no ve ediciones y daría 304 con datos viejos.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app.core.connections import supabase_service
+from app.core.hashing import canonical_hash
+from app.core.logger import get_logger
+from app.pipelines.source_snapshots import SourceSnapshots
+
+logger = get_logger(__name__)
+
+DATA_VERSION_COLUMN = os.getenv('DATA_VERSION_COLUMN', 'updated_at')
+
+# Tablas sin DATA_VERSION_COLUMN (se descubre en la primera consulta y ya no se vuelve a intentar)
+_WITHOUT_VERSION_COLUMN = set()
+
+def table_version(table_name: str) -> Optional[dict]:
+    """
+    Huella de una tabla: {'rows', 'version'} (ver módulo), o None si la tabla no tiene
+    DATA_VERSION_COLUMN. Lanza la excepción del cliente si no se pudo consultar.
+    """
+    if not DATA_VERSION_COLUMN or table_name in _WITHOUT_VERSION_COLUMN:
+        return None
+    # Si la consulta falla (columna inexistente o red) la excepción sube: sin ETag en esta petición
+    fingerprint = supabase_service.get_table_fingerprint(table_name, DATA_VERSION_COLUMN)
+    if fingerprint['version'] is None and fingerprint['rows']:
+        logger.warning(f"⚠️  '{table_name}' has no '{DATA_VERSION_COLUMN}' values: its responses go without ETag "
+                       f"(apply supabase/migrations/20261019000000_data_version_updated_at.sql)")
+        _WITHOUT_VERSION_COLUMN.add(table_name)
+        return None
+    return fingerprint
+
+def data_version(table_names: list) -> Optional[str]:
+    """
+    Hash de la huella de cada tabla (consultadas en paralelo) + versión del ETL publicado.
+    Misma versión = mismos datos. None si alguna tabla no tiene versión (ver módulo).
+    """
+    with ThreadPoolExecutor(max_workers=max(1, len(table_names))) as executor:
+        fingerprints = list(executor.map(table_version, table_names))
+    if any(fingerprint is None for fingerprint in fingerprints):
+        return None
+    return canonical_hash([SourceSnapshots().version(), dict(zip(table_names, fingerprints))])
+
+def table_fingerprints(table_names: list) -> str:
+    """
+    Hash de count + id máximo de cada tabla + versión del ETL publicado. No ve ediciones: solo para
+    decidir reconstrucciones internas cuando data_version no está disponible, nunca para un ETag.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, len(table_names))) as executor:
+        fingerprints = list(executor.map(supabase_service.get_table_fingerprint, table_names))
+    return canonical_hash([SourceSnapshots().version(), dict(zip(table_names, fingerprints))])
@@ -0,0 +1,100 @@
+"""
+Microbenchmark: consultas ad hoc de /api/analytics/query sobre el cubo de bitmaps
+(app/services/analytics_cube.py) vs lo mismo con pandas (máscaras booleanas + groupby).
+
+Consultas de drill-down: certificaciones por municipio, empleados por sector dentro de
+municipio + nivel de proveeduría, y respuestas con planes de expansión por sector y municipio.
+Para pandas las etiquetas (nulos -> SIN ESPECIFICAR, certificaciones traducidas) se preparan una
+sola vez, igual que el cubo; solo se mide la consulta. Verifica que ambos den lo mismo.
+
+Uso (desde la raíz del repo; supabase_service necesita SUPABASE_URL / SUPABASE_SERVICE_KEY
+definidos, aunque no se hace ninguna llamada):
+    python -m benchmarks.bench_analytics_cube [n_companies]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from app.core.schemas import frame_from_records
+from app.pipelines.analytics.analysis_functions import chart_labels
+from app.services.analytics_cube import CUBE_DIMENSIONS, FILL_NA, AnalyticsCube
+from benchmarks.bench_array_columns import _ensure_list, build_frames
+from benchmarks.bench_schema_dtypes import best_of, build_records
+from benchmarks.seed_local_backend import MUNICIPIOS, PROVEEDURIA
+
+def build_sources(n_companies: int) -> dict:
+    companies, responses = build_records(n_companies)
+    certifications, catalog = build_frames(n_companies)
+    df_companies = frame_from_records(companies, 'companies')
+    df_companies['certification_ids'] = certifications['certification_ids'].to_numpy()
+    return {'companies': df_companies, 'responses': frame_from_records(responses, 'responses'),
+            'certifications_catalog': catalog}
+
+def drilldown_queries() -> list:
+    queries = []
+    for municipio in MUNICIPIOS:
+        queries.append(('companies', {'municipality': [municipio]}, 'certification', 'count'))
+        queries.append(('companies', {'municipality': [municipio], 'procurement_tier': [PROVEEDURIA[0]]},
+                        'sector', 'employee_count'))
+        queries.append(('responses', {'municipality': [municipio], 'has_expansion_plans': ['true']}, 'sector', 'count'))
+    queries.append(('companies', {'certification': ['CERT1', 'CERT2'], 'municipality': MUNICIPIOS[:3]},
+                    'industrial_park', 'count'))
+    return queries
+
+# --- Referencia en pandas ---
+def label_frames(data_sources: dict) -> dict:
+    catalog = data_sources['certifications_catalog']
+    names = dict(zip(catalog['id'].astype(str), catalog['acronym']))
+    frames = {}
+    for table_name, dimensions in CUBE_DIMENSIONS.items():
+        df = data_sources[table_name]
+        labels = pd.DataFrame(index=df.index)
+        for dim, column in dimensions.items():
+            if column == 'certification_ids':
+                labels[dim] = df[column].map(lambda ids: list(dict.fromkeys(
+                    names.get(str(x), f"ID {x}") for x in _ensure_list(ids))))
+            else:
+                mapping = {True: 'true', False: 'false'} if pd.api.types.is_bool_dtype(df[column].dtype) else None
+                labels[dim] = chart_labels(df[column], FILL_NA, mapping).astype(str)
+        if 'employee_count' in df.columns:
+            labels['employee_count'] = pd.to_numeric(df['employee_count']).fillna(0).astype('int64')
+        frames[table_name] = labels
+    return frames
+
+def pandas_query(labels: pd.DataFrame, filters: dict, group_by: str, measure: str) -> dict:
+    mask = pd.Series(True, index=labels.index)
+    for dim, values in filters.items():
+        if dim == 'certification':  # multivaluada: la fila entra si alguna de sus certificaciones está
+            exploded = labels[dim].explode()
+            mask &= exploded.isin(values).groupby(level=0).any()
+        else:
+            mask &= labels[dim].isin(values)
+    rows = labels[mask].explode(group_by).dropna(subset=[group_by])
+    grouped = rows.groupby(group_by, sort=False)
+    result = grouped.size() if measure == 'count' else grouped[measure].sum()
+    return result.sort_values(ascending=False, kind='stable').to_dict()
+
+def run(n_companies: int = 20_000):
+    data_sources = build_sources(n_companies)
+    queries = drilldown_queries()
+
+    start = time.perf_counter()
+    cube = AnalyticsCube(data_sources, 'bench')
+    build_s = time.perf_counter() - start
+    frames = label_frames(data_sources)
+
+    for table_name, filters, group_by, measure in queries:
+        result = cube.query(table_name, filters=filters, group_by=group_by, measure=measure)
+        expected = pandas_query(frames[table_name], filters, group_by, measure)
+        assert dict(zip(result['labels'], result['values'])) == expected, f"No coincide: {filters} / {group_by}"
+
+    pandas_s = best_of(lambda: [pandas_query(frames[t], f, g, m) for t, f, g, m in queries])
+    cube_s = best_of(lambda: [cube.query(t, filters=f, group_by=g, measure=m) for t, f, g, m in queries])
+    print(f"Analytics cube, {n_companies} companies, {len(queries)} consultas")
+    print(f"  armado del cubo           {build_s * 1000:8.1f} ms (una vez por versión de snapshots)")
+    print(f"  pandas (máscaras+groupby) {pandas_s * 1000:8.1f} ms")
+    print(f"  bitmaps                   {cube_s * 1000:8.1f} ms ({pandas_s / cube_s:.1f}x)")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
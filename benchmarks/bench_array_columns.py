@@ -0,0 +1,106 @@
+"""
+Microbenchmark: gráficas sobre columnas de arreglos (companies.certification_ids).
+
+Compara las tres gráficas de 'industrial-quality' (dos analyze_array_frequency con catálogo y
+un analyze_array_populated_bool) contra la implementación anterior por fila (df.copy(),
+ensure_list con apply, filtro con map(len), explode y dict del catálogo en cada llamada).
+El camino nuevo se mide en frío: cada repetición usa un frame nuevo, así que incluye la
+normalización a CSR (una vez para las tres gráficas). Verifica que los resultados coincidan.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_array_columns [n_companies]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.pipelines.analytics.analysis_functions import analyze_array_frequency, analyze_array_populated_bool
+from config.dashboards_config import DASHBOARDS_CONFIG
+
+def build_frames(n_companies: int, seed: int = 7) -> tuple:
+    rng = np.random.default_rng(seed)
+    catalog = pd.DataFrame({'id': np.arange(1, 55), 'acronym': [f"CERT{i}" for i in range(1, 55)],
+                            'category': [f"CATEGORIA {i % 7}" for i in range(1, 55)]})
+    certification_ids = []
+    for _ in range(n_companies):
+        roll = rng.random()
+        if roll < 0.35:
+            certification_ids.append([])
+        elif roll < 0.40:
+            certification_ids.append(None)
+        elif roll < 0.45:
+            certification_ids.append('{' + ','.join(map(str, rng.integers(1, 55, 2))) + '}')  # arreglo como texto
+        else:
+            certification_ids.append(rng.integers(1, 55, int(rng.integers(1, 5))).tolist())
+    companies = pd.DataFrame({'id': np.arange(n_companies), 'certification_ids': certification_ids,
+                              'trade_name': [f"EMPRESA {i}" for i in range(n_companies)]})
+    return companies, catalog
+
+# --- Implementación anterior (referencia) ---
+def _ensure_list(x):
+    if isinstance(x, list): return x
+    if isinstance(x, str):
+        clean = x.replace('{', '').replace('}', '').replace('[', '').replace(']', '').replace('"', '')
+        return [i.strip() for i in clean.split(',') if i.strip()]
+    return []
+
+def _has_data(x):
+    if isinstance(x, list): return len(x) > 0
+    if isinstance(x, str): return x.strip() not in ['[]', '{}', '']
+    return False
+
+def per_row_frequency(df, column, top_n=10, catalog_df=None, map_id_col='id', map_name_col='acronym', **kwargs):
+    valid_rows = df.copy()
+    valid_rows[column] = valid_rows[column].apply(_ensure_list)
+    valid_rows = valid_rows[valid_rows[column].map(len) > 0]
+    if valid_rows.empty:
+        return {"labels": [], "values": []}
+    counts = valid_rows[column].explode().value_counts().head(top_n)
+    labels = counts.index.tolist()
+    if catalog_df is not None:
+        mapping = dict(zip(catalog_df[map_id_col].astype(str), catalog_df[map_name_col]))
+        labels = [mapping.get(str(x), f"ID {x}") for x in labels]
+    return {"labels": labels, "values": counts.values.tolist()}
+
+def per_row_populated(df, column, true_label="Certificada", false_label="Sin Certificación", **kwargs):
+    counts = df[column].apply(_has_data).value_counts()
+    return {"labels": [true_label if idx else false_label for idx in counts.index], "values": counts.values.tolist()}
+
+def run_charts(companies: pd.DataFrame, catalog: pd.DataFrame, functions: dict) -> list:
+    results = []
+    for dashboard in DASHBOARDS_CONFIG:
+        for chart in dashboard['charts']:
+            func = functions.get(chart['analysis_type'])
+            if func is not None:
+                params = dict(chart['params'], catalog_df=catalog) if 'catalog_source_key' in chart else chart['params']
+                results.append(func(companies, **params))
+    return results
+
+def best_of(func, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def run(n_companies: int = 20_000):
+    companies, catalog = build_frames(n_companies)
+    per_row = {analyze_array_frequency: per_row_frequency, analyze_array_populated_bool: per_row_populated}
+    vectorized = {analyze_array_frequency: analyze_array_frequency, analyze_array_populated_bool: analyze_array_populated_bool}
+
+    expected = run_charts(companies, catalog, per_row)
+    assert run_charts(companies.copy(deep=False), catalog, vectorized) == expected, "Las gráficas no coinciden"
+
+    old_s = best_of(lambda: run_charts(companies, catalog, per_row))
+    new_s = best_of(lambda: run_charts(companies.copy(deep=False), catalog, vectorized))
+    warm_s = best_of(lambda: run_charts(companies, catalog, vectorized))
+    print(f"Array columns, {n_companies} companies, {len(expected)} gráficas")
+    print(f"  por fila (anterior)      {old_s * 1000:8.1f} ms")
+    print(f"  CSR (con normalización) {new_s * 1000:8.1f} ms ({old_s / new_s:.1f}x)")
+    print(f"  CSR (ya normalizada)    {warm_s * 1000:8.1f} ms")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,123 @@
+"""
+Microbenchmark: enriquecimiento de certificaciones del ETL (Step 2.5 + unión del Step 3).
+
+Compara el camino anterior (copia de responses + analyze_other_certifications + merge por
+(clean_rfc, response_date) + find_cert_id con iterrows + merge_cert_lists con apply(axis=1))
+contra enrich_certifications (in-place, por posición) + union_certification_ids.
+Reporta tiempo y pico de memoria asignada (tracemalloc).
+
+Uso (desde la raíz del repo; supabase_service necesita SUPABASE_URL / SUPABASE_SERVICE_KEY
+definidos, aunque no se hace ninguna llamada):
+    python -m benchmarks.bench_certifications_enrichment [n_rows]
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from app.pipelines.etl.certifications import (
+    OTHER_CERTIFICATION_KEY, analyze_other_certifications, enrich_certifications, union_certification_ids,
+)
+from app.pipelines.etl.cleaning import clean_certifications_to_array
+from config.certifications_catalog_data import CERTIFICATIONS_CATALOG
+
+def build_catalog() -> pd.DataFrame:
+    """El catálogo como vuelve de Supabase (con 'id')."""
+    catalog = pd.DataFrame(CERTIFICATIONS_CATALOG)
+    catalog.insert(0, 'id', range(1, len(catalog) + 1))
+    return catalog
+
+def build_responses(n_rows: int, seed: int = 7) -> tuple:
+    """Responses sintéticas + la columna cruda de checkboxes (alineada fila a fila)."""
+    rng = np.random.default_rng(seed)
+    other_texts = np.array(["ISO 9001:2015 y SMETA", "IATF 16949", "NINGUNA", "", "ISO 14001, OHSAS 18001", "C-TPAT"])
+    checkboxes = np.array(["ISO 9001", "ISO 9001; ISO 14001", "IATF 16949, ISO 45001", "OTRAS", ""])
+    n_companies = max(n_rows // 3, 1)
+    df = pd.DataFrame({
+        'clean_rfc': [f"RFC{i:07d}" for i in rng.integers(0, n_companies, n_rows)],
+        'clean_email': [f"contacto{i}@empresa.com.mx" for i in range(n_rows)],
+        'response_date': pd.date_range("2022-01-01", periods=n_rows, freq="h"),
+        'additional_data': [
+            {OTHER_CERTIFICATION_KEY: text, 'Principales clientes': 'CLIENTE A, CLIENTE B'}
+            for text in rng.choice(other_texts, n_rows)
+        ],
+    })
+    return df, pd.Series(rng.choice(checkboxes, n_rows))
+
+# --- Camino anterior (copiado de run.py antes del cambio) ---
+def _legacy_find_cert_id(text, catalog_df):
+    if not text or text in ['OTRAS', 'NULL', '']: return None
+    text_upper = str(text).upper().strip()
+    match = catalog_df[(catalog_df['acronym'] == text_upper) | (catalog_df['name'].str.upper() == text_upper)]
+    if not match.empty:
+        return int(match.iloc[0]['id'])
+    for _, row in catalog_df.iterrows():
+        if text_upper in [k.upper() for k in row['search_keywords']]:
+            return int(row['id'])
+    return None
+
+def _legacy_checkbox_ids(cert_list, catalog_df):
+    if not isinstance(cert_list, list): return []
+    ids = set()
+    for cert_text in cert_list:
+        found_id = _legacy_find_cert_id(cert_text, catalog_df)
+        if found_id:
+            ids.add(found_id)
+    return list(ids)
+
+def legacy(df_responses, iso_raw, catalog):
+    analysis = analyze_other_certifications(df_responses, catalog.to_dict('records'))
+    df_responses = df_responses.merge(
+        analysis[['clean_rfc', 'response_date', 'other_certifications_ids']],
+        on=['clean_rfc', 'response_date'], how='left'
+    )
+    df_responses['iso_certifications'] = iso_raw.apply(clean_certifications_to_array)
+    df_responses['iso_certification_ids'] = df_responses['iso_certifications'].apply(
+        lambda x: _legacy_checkbox_ids(x, catalog)
+    )
+
+    def merge_cert_lists(row):
+        ids_checkbox = row['iso_certification_ids'] if isinstance(row['iso_certification_ids'], list) else []
+        ids_text = row['other_certifications_ids'] if isinstance(row['other_certifications_ids'], list) else []
+        return list(set(ids_checkbox + ids_text))
+
+    df_responses['certification_ids'] = df_responses.apply(merge_cert_lists, axis=1)
+    return df_responses
+
+def optimized(df_responses, iso_raw, catalog):
+    enrich_certifications(df_responses, catalog.to_dict('records'), iso_source=iso_raw)
+    df_responses['certification_ids'] = union_certification_ids(
+        df_responses['iso_certification_ids'], df_responses['other_certifications_ids']
+    )
+    return df_responses
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+def run(n_rows: int = 5_000):
+    catalog = build_catalog()
+    df, iso_raw = build_responses(n_rows)
+
+    legacy_result, legacy_s, legacy_mb = measure(legacy, df.copy(), iso_raw, catalog)
+    new_result, new_s, new_mb = measure(optimized, df.copy(), iso_raw, catalog)
+
+    # Mismos IDs, fila por fila (el camino anterior no garantizaba orden dentro de la lista)
+    for col in ['other_certifications_ids', 'iso_certification_ids', 'certification_ids']:
+        same = all(sorted(a) == sorted(b) for a, b in zip(legacy_result[col], new_result[col]))
+        assert same, f"Mismatch en {col}"
+    assert len(legacy_result) == len(new_result) == n_rows
+
+    print(f"Certification enrichment, {n_rows} filas")
+    print(f"  {'legacy (copy + merge + iterrows + apply)':<45} {legacy_s * 1000:9.1f} ms   peak {legacy_mb:7.1f} MB")
+    print(f"  {'enrich_certifications (in-place)':<45} {new_s * 1000:9.1f} ms   peak {new_mb:7.1f} MB")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5_000)
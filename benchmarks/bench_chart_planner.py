@@ -0,0 +1,98 @@
+"""
+Microbenchmark: gráficas una por una (analyze_categorical / analyze_top_ranking) vs el planner
+(app/pipelines/analytics/planner.py), que agrupa por fuente y cuenta / suma todo en un bincount
+por columna de etiquetas.
+
+Corre las gráficas de DASHBOARDS_CONFIG más un escenario con dashboards por sector y por
+municipio (varias gráficas filtradas por cada valor), sobre frames con los dtypes del schema.
+También el fan-out (cada gráfica por cada municipio y sector): planner vs la función sobre cada
+grupo de un groupby. Verifica que ambos caminos den exactamente los mismos resultados.
+
+Uso (desde la raíz del repo; supabase_service necesita SUPABASE_URL / SUPABASE_SERVICE_KEY
+definidos, aunque no se hace ninguna llamada):
+    python -m benchmarks.bench_chart_planner [n_companies]
+"""
+import sys
+
+from app.core.schemas import frame_from_records
+from app.pipelines.analytics.analysis_functions import analyze_categorical, analyze_top_ranking
+from app.pipelines.analytics.planner import plan_charts, variant_slug
+from benchmarks.bench_schema_dtypes import best_of, build_records
+from benchmarks.seed_local_backend import MUNICIPIOS, SECTORES
+from config.dashboards_config import DASHBOARDS_CONFIG
+
+def drilldown_charts() -> list:
+    """Dashboards por sector y por municipio: lo que se quiere agregar por docenas."""
+    charts = []
+    for sector in SECTORES:
+        charts += [
+            {'slug': f"{sector}-by-municipality", 'data_source_key': 'companies', 'analysis_type': analyze_top_ranking,
+             'params': {'label_col': 'municipality', 'filter_col': 'sector', 'filter_value': sector, 'limit': 10}},
+            {'slug': f"{sector}-parks-workforce", 'data_source_key': 'companies', 'analysis_type': analyze_top_ranking,
+             'params': {'label_col': 'industrial_park', 'value_col': 'employee_count', 'aggregation': 'sum',
+                        'filter_col': 'sector', 'filter_value': sector, 'exclude_value': 'SIN PARQUE', 'limit': 5}},
+        ]
+    for municipio in MUNICIPIOS:
+        charts += [
+            {'slug': f"{municipio}-by-sector", 'data_source_key': 'companies', 'analysis_type': analyze_top_ranking,
+             'params': {'label_col': 'sector', 'filter_col': 'municipality', 'filter_value': municipio, 'limit': 10}},
+            {'slug': f"{municipio}-tiers", 'data_source_key': 'companies', 'analysis_type': analyze_top_ranking,
+             'params': {'label_col': 'procurement_tier', 'filter_col': 'municipality', 'filter_value': municipio}},
+        ]
+    charts.append({'slug': 'expansion-by-municipality', 'data_source_key': 'responses', 'analysis_type': analyze_categorical,
+                   'params': {'column': 'municipality'}})
+    return charts
+
+def one_by_one(data_sources: dict, charts: list) -> dict:
+    return {chart['slug']: chart['analysis_type'](data_sources[chart['data_source_key']].copy(deep=False), **chart['params'])
+            for chart in charts}
+
+def per_group(data_sources: dict, charts: list) -> dict:
+    """Variantes de fan-out sin planner: la función sobre cada grupo (como _fan_out_variants en run.py)."""
+    results = {}
+    for chart in charts:
+        df = data_sources[chart['data_source_key']]
+        for dim in chart['fan_out']:
+            results[variant_slug(chart['slug'], dim)] = {
+                str(value): chart['analysis_type'](group, **chart['params'])
+                for value, group in df.groupby(dim, observed=True, sort=False)
+            }
+    return results
+
+def run(n_companies: int = 20_000):
+    companies, responses = build_records(n_companies)
+    data_sources = {'companies': frame_from_records(companies, 'companies'),
+                    'responses': frame_from_records(responses, 'responses')}
+    config_charts = [chart for dashboard in DASHBOARDS_CONFIG for chart in dashboard['charts']
+                     if chart['data_source_key'] in data_sources]
+
+    print(f"Chart planner, {n_companies} companies")
+    for name, charts in [('DASHBOARDS_CONFIG', config_charts), ('+ drill-down', config_charts + drilldown_charts())]:
+        planned = plan_charts(data_sources, charts)
+        expected = one_by_one(data_sources, [chart for chart in charts if chart['slug'] in planned])
+        assert planned == expected, "Los resultados no coinciden"
+
+        # Se compara solo lo que resuelve el planner (el resto se calcula igual en ambos caminos)
+        planned_charts = [chart for chart in charts if chart['slug'] in planned]
+        single = best_of(lambda: one_by_one(data_sources, planned_charts))
+        together = best_of(lambda: plan_charts(data_sources, planned_charts))
+        print(f"  {name:<18} {len(planned_charts):3d} gráficas | una por una {single * 1000:8.1f} ms | "
+              f"planner {together * 1000:8.1f} ms ({single / together:.1f}x)")
+
+    # Fan-out: cada gráfica de DASHBOARDS_CONFIG por municipio y por sector (sin su propia columna)
+    fan_out_charts = [dict(chart, fan_out=[dim for dim in ('municipality', 'sector')
+                                          if dim not in (chart['params'].get('column'), chart['params'].get('label_col'))])
+                      for chart in config_charts]
+    planned = plan_charts(data_sources, fan_out_charts)
+    planned_charts = [chart for chart in fan_out_charts if chart['slug'] in planned]
+    expected = per_group(data_sources, planned_charts)
+    assert {slug: planned[slug] for slug in expected} == expected, "Las variantes no coinciden"
+
+    n_variants = sum(len(variants) for variants in expected.values())
+    grouped = best_of(lambda: per_group(data_sources, planned_charts))
+    together = best_of(lambda: plan_charts(data_sources, planned_charts))
+    print(f"  {'fan-out':<18} {n_variants:3d} variantes | por grupo   {grouped * 1000:8.1f} ms | "
+          f"planner {together * 1000:8.1f} ms ({grouped / together:.1f}x, incluye las globales)")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
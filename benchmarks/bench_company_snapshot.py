@@ -0,0 +1,62 @@
+"""
+Microbenchmark: Step 3 del ETL (snapshot de la última respuesta por empresa + certification_ids).
+
+Compara sort_values + drop_duplicates + merge + apply(merge_cert_lists, axis=1) contra
+build_company_snapshot (lexsort sobre códigos + explode -> drop_duplicates -> listas por grupo).
+
+Uso (desde la raíz del repo; supabase_service necesita SUPABASE_URL / SUPABASE_SERVICE_KEY
+definidos, aunque no se hace ninguna llamada):
+    python -m benchmarks.bench_company_snapshot [n_responses]
+"""
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from app.pipelines.etl.snapshot import build_company_snapshot
+
+def build_frames(n_rows: int, seed: int = 7) -> tuple:
+    rng = np.random.default_rng(seed)
+    n_companies = max(n_rows // 4, 1)
+    rfcs = np.array([f"RFC{i:07d}" for i in range(n_companies)])
+    id_lists = [[], [1], [1, 3], [2, 5, 7], [4]]
+    responses = pd.DataFrame({
+        'clean_rfc': rng.choice(rfcs, n_rows),
+        'response_date': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 5 * 365 * 24, n_rows), unit='h'),
+        'iso_certification_ids': [id_lists[i] for i in rng.integers(0, len(id_lists), n_rows)],
+        'other_certifications_ids': [id_lists[i] for i in rng.integers(0, len(id_lists), n_rows)],
+    })
+    companies = pd.DataFrame({'clean_rfc': rfcs, 'trade_name': [f"EMPRESA {i}" for i in range(n_companies)]})
+    return companies, responses
+
+def legacy(companies, responses):
+    latest = responses.sort_values('response_date', ascending=False).drop_duplicates(subset=['clean_rfc'], keep='first')
+    df = companies.copy().merge(
+        latest[['clean_rfc', 'iso_certification_ids', 'other_certifications_ids']], on='clean_rfc', how='left'
+    )
+
+    def merge_cert_lists(row):
+        ids_checkbox = row['iso_certification_ids'] if isinstance(row['iso_certification_ids'], list) else []
+        ids_text = row['other_certifications_ids'] if isinstance(row['other_certifications_ids'], list) else []
+        return list(set(ids_checkbox + ids_text))
+
+    df['certification_ids'] = df.apply(merge_cert_lists, axis=1)
+    return df
+
+def run(n_rows: int = 100_000, repeat: int = 3):
+    companies, responses = build_frames(n_rows)
+
+    old = legacy(companies, responses).set_index('clean_rfc')['certification_ids']
+    new = build_company_snapshot(companies, responses).set_index('clean_rfc')['certification_ids']
+    # Con fechas empatadas el camino anterior (quicksort, no estable) elige cualquiera de las filas
+    tied = set(responses.loc[responses.duplicated(['clean_rfc', 'response_date'], keep=False), 'clean_rfc'])
+    assert all(sorted(old[k]) == new[k] for k in companies['clean_rfc'] if k not in tied), "Mismatch en certification_ids"
+
+    print(f"Company snapshot, {n_rows} respuestas / {len(companies)} empresas (mejor de {repeat})")
+    for label, func in [("legacy (sort + merge + apply)", legacy), ("build_company_snapshot", build_company_snapshot)]:
+        best = min(timeit.repeat(lambda: func(companies, responses), number=1, repeat=repeat))
+        print(f"  {label:<32} {best * 1000:9.1f} ms")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
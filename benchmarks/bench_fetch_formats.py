@@ -0,0 +1,72 @@
+"""
+Microbenchmark: armar los DataFrames de analytics desde la respuesta de PostgREST.
+
+Para las cinco tablas que carga run_analytics_etl compara, sobre los mismos bytes que
+mandaría el servidor (generados con el backend local):
+  json -> orjson.loads(bytes) -> lista de dicts -> frame_from_records (camino de get_all_from)
+  csv  -> frame_from_csv(texto) (Accept: text/csv, sin lista de dicts intermedia)
+Reporta tiempo, pico de memoria (tracemalloc) y tamaño de la respuesta; verifica que los
+DataFrames coincidan.
+
+Uso (desde la raíz del repo; siembra una BD temporal con benchmarks/seed_local_backend.py):
+    python -m benchmarks.bench_fetch_formats [n_companies]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import orjson
+import pandas as pd
+
+from app.core.connections.local_backend import LocalClient, to_postgrest_csv
+from app.core.connections.postgrest_csv import CSV_ENGINE, frame_from_csv
+from app.core.schemas import frame_from_records
+
+TABLES = ['companies', 'responses', 'municipality_catalog', 'industrial_parks_catalog', 'certifications_catalog']
+
+def measure(func, repeat: int = 3) -> tuple:
+    """(resultado, mejor tiempo de 'repeat' corridas, pico de memoria en una corrida aparte)."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, min(timings), peak
+
+def _comparable(df: pd.DataFrame) -> list:
+    return [[None if not isinstance(v, (list, dict)) and pd.isna(v) else v for v in df[c].tolist()] for c in df.columns]
+
+def run(n_companies: int = 20_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.sqlite3')
+        subprocess.run([sys.executable, '-m', 'benchmarks.seed_local_backend', '--db', db_path,
+                        '--companies', str(n_companies)], check=True, stdout=subprocess.DEVNULL)
+        client = LocalClient(db_path)
+        payloads = {}
+        for table in TABLES:
+            rows = client.table(table).select('*').execute().data
+            payloads[table] = (orjson.dumps(rows), to_postgrest_csv(rows))
+
+    print(f"Fetch formats, {n_companies} companies (read_csv engine: {CSV_ENGINE})")
+    totals = {'json': [0.0, 0], 'csv': [0.0, 0]}
+    for table, (json_bytes, csv_text) in payloads.items():
+        from_json, json_s, json_peak = measure(lambda: frame_from_records(orjson.loads(json_bytes), table))
+        from_csv, csv_s, csv_peak = measure(lambda: frame_from_csv(csv_text, table))
+        assert _comparable(from_json) == _comparable(from_csv[from_json.columns]), f"'{table}' no coincide"
+
+        totals['json'][0] += json_s; totals['json'][1] = max(totals['json'][1], json_peak)
+        totals['csv'][0] += csv_s; totals['csv'][1] = max(totals['csv'][1], csv_peak)
+        print(f"  {table:<26} json {json_s * 1000:8.1f} ms {json_peak / 1e6:7.1f} MB {len(json_bytes) / 1e6:6.1f} MB payload | "
+              f"csv {csv_s * 1000:8.1f} ms {csv_peak / 1e6:7.1f} MB {len(csv_text.encode()) / 1e6:6.1f} MB payload")
+    print(f"  {'total':<26} json {totals['json'][0] * 1000:8.1f} ms (pico {totals['json'][1] / 1e6:.1f} MB) | "
+          f"csv {totals['csv'][0] * 1000:8.1f} ms (pico {totals['csv'][1] / 1e6:.1f} MB)")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
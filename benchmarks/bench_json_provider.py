@@ -0,0 +1,76 @@
+"""
+Microbenchmark: serialización del payload de /data/responses-view.
+
+Compara el proveedor JSON por defecto de Flask (stdlib json + to_dict) contra OrjsonProvider
+(DataFrame directo) y los formatos compactos ?shape=columnar / ?shape=arrays.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_json_provider [n_rows]
+"""
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.api.serialization import OrjsonProvider, frame_to_json_bytes
+
+# Mismas columnas (y en el mismo orden) que arma get_responses_view
+RESPONSES_VIEW_COLUMNS = [
+    "Fecha", "Empresa", "Contacto", "¿Expansión?", "¿Ingeniería?", "HubSpot ID", "Contact email",
+    "Proveeduría", "Certs (Selección Original)", "Certs (Texto Original)", "Certificaciones (Limpias)",
+    "Principales clientes", "Necesidades y problemáticas", "¿Capacidad de transformadores a adquirir?",
+    "Principal producto o servicio que proporciona", "Proyecto Expansión (Detalle)",
+    "¿Cuál es la demanda de electricidad esperada ma...", "¿Cuál es su demanda max actual de energia regis...",
+]
+
+def build_responses_view_frame(n_rows: int, seed: int = 7) -> pd.DataFrame:
+    """DataFrame sintético con la forma real de /data/responses-view (todo string, con '-' en vacíos)."""
+    rng = np.random.default_rng(seed)
+    certs = np.array(["ISO9001", "IATF16949", "ISO9001, ISO14001", "ISO9001, IATF16949, ISO45001", "-"])
+    companies = np.array([f"EMPRESA INDUSTRIAL {i}" for i in range(max(n_rows // 3, 1))])
+    data = {
+        "Fecha": pd.date_range("2022-01-01", periods=n_rows, freq="h").strftime("%Y-%m-%d"),
+        "Empresa": rng.choice(companies, n_rows),
+        "Contacto": rng.choice(["Juan Pérez", "María López", "Ana García", "ID Desconocido"], n_rows),
+        "¿Expansión?": rng.choice(["Sí", "No"], n_rows),
+        "¿Ingeniería?": rng.choice(["Sí", "No"], n_rows),
+        "HubSpot ID": rng.integers(10_000, 99_999, n_rows).astype(str),
+        "Contact email": [f"contacto{i}@empresa.com.mx" for i in range(n_rows)],
+        "Proveeduría": rng.choice(["Tier 1", "Tier 2", "Tier 3", "-"], n_rows),
+        "Certs (Selección Original)": rng.choice(certs, n_rows),
+        "Certs (Texto Original)": rng.choice(["ISO 9001:2015 y SMETA", "NINGUNA", "-"], n_rows),
+        "Certificaciones (Limpias)": rng.choice(certs, n_rows),
+    }
+    for col in RESPONSES_VIEW_COLUMNS:
+        if col not in data:
+            data[col] = rng.choice(["Texto libre de respuesta bastante largo para simular la encuesta", "-"], n_rows)
+    return pd.DataFrame(data)[RESPONSES_VIEW_COLUMNS]
+
+def run(n_rows: int = 20_000, repeat: int = 5):
+    df = build_responses_view_frame(n_rows)
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    orjson_provider = OrjsonProvider(app)
+    columns = RESPONSES_VIEW_COLUMNS
+
+    cases = {
+        "stdlib (to_dict + DefaultJSONProvider)": lambda: default_provider.dumps(
+            {"data": df.to_dict(orient='records'), "columns": columns}).encode('utf-8'),
+        "orjson (DataFrame directo)": lambda: orjson_provider.dumps({"data": df, "columns": columns}).encode('utf-8'),
+        "orjson ?shape=columnar": lambda: frame_to_json_bytes(df, columns, 'columnar'),
+        "orjson ?shape=arrays": lambda: frame_to_json_bytes(df, columns, 'arrays'),
+    }
+
+    print(f"responses-view payload: {n_rows} filas x {len(columns)} columnas (mejor de {repeat})")
+    baseline = None
+    for name, func in cases.items():
+        size = len(func())
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        baseline = baseline or best
+        print(f"  {name:<42} {best * 1000:8.1f} ms  {size / 1e6:6.2f} MB  x{baseline / best:4.1f}")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
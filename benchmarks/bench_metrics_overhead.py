@@ -0,0 +1,54 @@
+"""
+Mide el costo de un span habilitado (app.core.metrics.span) contra un bloque vacío.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_metrics_overhead [iteraciones]
+"""
+import sys
+import time
+
+from app.core.metrics import span
+
+def _loop_empty(n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        pass
+    return time.perf_counter() - start
+
+def _loop_span(n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        with span('bench.overhead', table='companies'):
+            pass
+    return time.perf_counter() - start
+
+@span('bench.decorated')
+def _decorated():
+    pass
+
+def _loop_decorated(n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        _decorated()
+    return time.perf_counter() - start
+
+def _loop_plain_call(n: int) -> float:
+    def plain():
+        pass
+    start = time.perf_counter()
+    for _ in range(n):
+        plain()
+    return time.perf_counter() - start
+
+def run(n: int = 200_000):
+    baseline = min(_loop_empty(n) for _ in range(3))
+    with_span = min(_loop_span(n) for _ in range(3))
+    call_baseline = min(_loop_plain_call(n) for _ in range(3))
+    decorated = min(_loop_decorated(n) for _ in range(3))
+
+    print(f"Overhead por span ({n} iteraciones, mejor de 3):")
+    print(f"  with span(...):  {(with_span - baseline) / n * 1e6:6.2f} µs")
+    print(f"  @span decorador: {(decorated - call_baseline) / n * 1e6:6.2f} µs")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
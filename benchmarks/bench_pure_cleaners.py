@@ -0,0 +1,63 @@
+"""
+Microbenchmark: limpieza inicial del ETL (Step 2) con funciones puras.
+
+Compara series.apply(func) valor por valor contra apply_pure_cleaner (factorize + una
+evaluación por valor distinto + caché LRU acotada) para cada columna del cleaning map que
+usa una función de PURE_CLEANERS, sobre respuestas sintéticas de baja cardinalidad.
+La segunda pasada de apply_pure_cleaner reutiliza la caché (como una segunda corrida del ETL).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_pure_cleaners [n_rows]
+"""
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.pipelines.etl import cleaning
+
+CLEANING_MAP_PATH = 'config/cleaning_map.json'
+
+SAMPLE_VALUES = [
+    'Gerente de Compras', 'director gral.', 'HR manager', '', '  Jefe de   QA ', 'N/A',
+    'ABC010203XY9', 'contacto@empresa.com.mx', '449 123 4567', '+52 (449) 987-6543',
+    'Sí', 'no', 'AUTOMOTRIZ', 'Tier 1', '1,200', 4491234567, 35, None,
+]
+
+def build_frame(columns: list, n_rows: int, seed: int = 7) -> pd.DataFrame:
+    """Cada columna con ~40 valores distintos (texto del formulario + variantes numeradas)."""
+    rng = np.random.default_rng(seed)
+    pool = np.empty(len(SAMPLE_VALUES) + 20, dtype=object)
+    pool[:len(SAMPLE_VALUES)] = SAMPLE_VALUES
+    pool[len(SAMPLE_VALUES):] = [f"Valor repetido {i}" for i in range(20)]
+    return pd.DataFrame({column: rng.choice(pool, n_rows) for column in columns})
+
+def run(n_rows: int = 50_000):
+    with open(CLEANING_MAP_PATH, 'r', encoding='utf-8') as f:
+        cleaning_map = json.load(f)['cleaning_map']
+    pure = {col: params['clean_func'] for col, params in cleaning_map.items()
+            if params['clean_func'] in cleaning.PURE_CLEANERS}
+    df = build_frame(list(pure), n_rows)
+
+    start = time.perf_counter()
+    legacy = {col: df[col].apply(getattr(cleaning, func)) for col, func in pure.items()}
+    legacy_s = time.perf_counter() - start
+
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        memoized = {col: cleaning.apply_pure_cleaner(df[col], func) for col, func in pure.items()}
+        timings.append(time.perf_counter() - start)
+
+    for col in pure:
+        pd.testing.assert_series_equal(legacy[col], memoized[col])
+
+    print(f"Limpieza inicial, {n_rows} filas x {len(pure)} columnas con funciones puras")
+    print(f"  {'series.apply(func)':<36} {legacy_s * 1000:9.1f} ms")
+    print(f"  {'apply_pure_cleaner (caché fría)':<36} {timings[0] * 1000:9.1f} ms")
+    print(f"  {'apply_pure_cleaner (caché caliente)':<36} {timings[1] * 1000:9.1f} ms")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -0,0 +1,98 @@
+"""
+Microbenchmark: dtypes del schema (app/core/schemas.py) contra frames object "crudos".
+
+Arma companies / responses como los regresa get_all_from (listas de dicts), ya cruzados con
+los catálogos como en analytics, y compara:
+  - memoria (memory_usage(deep=True)) de pd.DataFrame(records) vs frame_from_records
+  - tiempo de las gráficas de DASHBOARDS_CONFIG (analyze_*) sobre cada versión
+  - value_counts / groupby-sum sueltos sobre 'sector' y 'municipality'
+Verifica además que todas las gráficas den exactamente el mismo resultado.
+
+Uso (desde la raíz del repo; supabase_service necesita SUPABASE_URL / SUPABASE_SERVICE_KEY
+definidos, aunque no se hace ninguna llamada):
+    python -m benchmarks.bench_schema_dtypes [n_companies]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.core.schemas import frame_from_records
+from benchmarks.seed_local_backend import MUNICIPIOS, PROVEEDURIA, SECTORES
+from config.dashboards_config import DASHBOARDS_CONFIG
+
+def build_records(n_companies: int, responses_per_company: int = 3, seed: int = 7) -> tuple:
+    rng = np.random.default_rng(seed)
+    parques = [f"PARQUE INDUSTRIAL {i}" for i in range(1, 31)] + ["SIN PARQUE"]
+    companies = [{
+        'id': i + 1,
+        'clean_rfc': f"RFC{i:09d}",
+        'trade_name': f"EMPRESA INDUSTRIAL {i}",
+        'sector': str(rng.choice(SECTORES)) if rng.random() < 0.95 else None,
+        'employee_count': int(rng.integers(5, 2500)) if rng.random() < 0.9 else None,
+        'municipality_id': int(rng.integers(1, len(MUNICIPIOS) + 1)),
+        'municipality': str(rng.choice(MUNICIPIOS)),
+        'industrial_park': str(rng.choice(parques)),
+        'procurement_tier': PROVEEDURIA[int(rng.integers(0, len(PROVEEDURIA)))],
+    } for i in range(n_companies)]
+
+    n_responses = n_companies * responses_per_company
+    company_idx = rng.integers(0, n_companies, n_responses)
+    booleans = [True, False, None]
+    responses = [{
+        'id': j + 1,
+        'company_id': companies[c]['id'],
+        'contact_id': companies[c]['id'],
+        'clean_rfc': companies[c]['clean_rfc'],
+        'sector': companies[c]['sector'],
+        'municipality': companies[c]['municipality'],
+        'has_expansion_plans': booleans[int(rng.integers(0, 3))],
+        'has_engineering_area': booleans[int(rng.integers(0, 3))],
+    } for j, c in enumerate(company_idx)]
+    return companies, responses
+
+def run_charts(data_sources: dict) -> list:
+    results = []
+    for dashboard in DASHBOARDS_CONFIG:
+        for chart in dashboard['charts']:
+            df = data_sources.get(chart['data_source_key'])
+            if df is None:
+                continue
+            results.append(chart['analysis_type'](df.copy(), **chart['params']))
+    return results
+
+def best_of(func, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def run(n_companies: int = 20_000):
+    companies, responses = build_records(n_companies)
+    plain = {'companies': pd.DataFrame(companies), 'responses': pd.DataFrame(responses)}
+    typed = {'companies': frame_from_records(companies, 'companies'),
+             'responses': frame_from_records(responses, 'responses')}
+
+    assert run_charts(plain) == run_charts(typed), "Las gráficas no coinciden"
+
+    print(f"Schema dtypes, {len(companies)} companies / {len(responses)} responses")
+    for table in plain:
+        before = plain[table].memory_usage(deep=True).sum() / 1e6
+        after = typed[table].memory_usage(deep=True).sum() / 1e6
+        print(f"  {'memoria ' + table:<36} {before:8.2f} MB -> {after:8.2f} MB  ({before / after:.1f}x)")
+
+    for label, func in [
+        ('gráficas de DASHBOARDS_CONFIG', run_charts),
+        ("responses.sector value_counts", lambda d: d['responses']['sector'].value_counts()),
+        ("responses groupby municipality", lambda d: d['responses'].groupby('municipality', observed=True)['company_id'].count()),
+        ("companies groupby sector sum", lambda d: d['companies'].groupby('sector', observed=True)['employee_count'].sum()),
+    ]:
+        before = best_of(lambda: func(plain))
+        after = best_of(lambda: func(typed))
+        print(f"  {label:<36} {before * 1000:8.1f} ms -> {after * 1000:8.1f} ms  ({before / after:.1f}x)")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
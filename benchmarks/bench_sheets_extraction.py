@@ -0,0 +1,43 @@
+"""
+Microbenchmark: extracción de la hoja del formulario (Step 1 del ETL), sin red.
+
+Compara get_all_records() + DataFrame fila por fila (hoja completa) contra
+read_worksheet_columns (solo las columnas del cleaning map, rangos A1 por bloques de filas,
+DataFrame columna por columna) sobre el backend falso de benchmarks/fake_sheets.py.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_sheets_extraction [n_rows]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from app.core.connections.google_sheets_service import read_worksheet_columns
+from benchmarks.fake_sheets import build_form_worksheet
+
+def run(n_rows: int = 20_000, n_columns: int = 80, n_used: int = 36):
+    worksheet = build_form_worksheet(n_rows, n_columns)
+    # Columnas que pide el ETL (cleaning map + JSONB), repartidas por la hoja
+    used_columns = worksheet.header[::max(n_columns // n_used, 1)][:n_used]
+
+    start = time.perf_counter()
+    legacy = pd.DataFrame(worksheet.get_all_records())
+    legacy_s = time.perf_counter() - start
+    legacy_requests, legacy_cells = worksheet.requests, worksheet.cells_sent
+
+    worksheet.requests = worksheet.cells_sent = 0
+    start = time.perf_counter()
+    projected = read_worksheet_columns(worksheet, used_columns, block_rows=5000)
+    projected_s = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(legacy[used_columns], projected, check_dtype=False)
+
+    print(f"Sheets extraction, {n_rows} filas x {n_columns} columnas ({n_used} usadas)")
+    print(f"  {'get_all_records + DataFrame(records)':<40} {legacy_s * 1000:9.1f} ms  "
+          f"{legacy_requests} req  {legacy_cells:>9} celdas")
+    print(f"  {'read_worksheet_columns':<40} {projected_s * 1000:9.1f} ms  "
+          f"{worksheet.requests} req  {worksheet.cells_sent:>9} celdas")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
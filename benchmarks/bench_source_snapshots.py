@@ -0,0 +1,57 @@
+"""
+Microbenchmark: carga de las tablas fuente de analytics desde Supabase vs desde el snapshot del ETL.
+
+Siembra una BD local, guarda un snapshot de cada tabla (como al final del ETL) y compara:
+  db       -> get_frame(tabla) completo y proyección a ANALYTICS_SOURCE_COLUMNS
+  snapshot -> verificación de versión (1 request de una fila) + lectura de solo esas columnas
+Verifica que ambos caminos den los mismos DataFrames. Con el backend local no hay red:
+en Supabase real el camino 'db' además paga la descarga de toda la tabla.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_source_snapshots [n_companies]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+def run(n_companies: int = 20_000):
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, 'bench.sqlite3')
+    subprocess.run([sys.executable, '-m', 'benchmarks.seed_local_backend', '--db', db_path,
+                    '--companies', str(n_companies)], check=True, stdout=subprocess.DEVNULL)
+    # supabase_service lee el backend al importarse
+    os.environ.update(DATA_BACKEND='local', LOCAL_DB_PATH=db_path)
+
+    import pandas as pd
+    from app.core.connections import supabase_service
+    from app.pipelines.analytics.run import ANALYTICS_SOURCE_COLUMNS, _load_source
+    from app.pipelines.source_snapshots import SourceSnapshots, pyarrow
+
+    writer = SourceSnapshots('bench', base_dir=os.path.join(tmp, 'snapshots'), enabled=True)
+    for table in ANALYTICS_SOURCE_COLUMNS:
+        writer.save(table, supabase_service.get_frame(table))
+    writer.commit()
+
+    print(f"Source snapshots, {n_companies} companies (formato: {'parquet' if pyarrow else 'pickle'})")
+    totals = {'db': 0.0, 'snapshot': 0.0}
+    for table in ANALYTICS_SOURCE_COLUMNS:
+        timings = {}
+        frames = {}
+        for mode in totals:
+            best = float('inf')
+            for _ in range(3):
+                snapshots = SourceSnapshots(base_dir=writer.base_dir, enabled=(mode == 'snapshot'))
+                start = time.perf_counter()
+                frames[mode] = _load_source(table, snapshots)
+                best = min(best, time.perf_counter() - start)
+            timings[mode] = best
+            totals[mode] += best
+        pd.testing.assert_frame_equal(frames['db'].reset_index(drop=True), frames['snapshot'].reset_index(drop=True))
+        print(f"  {table:<26} db {timings['db'] * 1000:8.1f} ms | snapshot {timings['snapshot'] * 1000:8.1f} ms "
+              f"({len(frames['db'])} filas, {len(frames['db'].columns)} columnas)")
+    print(f"  {'total':<26} db {totals['db'] * 1000:8.1f} ms | snapshot {totals['snapshot'] * 1000:8.1f} ms")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
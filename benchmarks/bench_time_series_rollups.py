@@ -0,0 +1,83 @@
+"""
+Microbenchmark: rollups de tendencias (app/pipelines/analytics/rollups.py), corrida incremental
+vs recalcular todo el historial de responses.
+
+Siembra una BD local, arma el store una vez y luego simula varias corridas del ETL que agregan
+un lote pequeño de respuestas nuevas (fechas recientes y algunas atrasadas). Por cada lote mide:
+  historial completo -> store desde cero (leer toda la tabla y contar todos los periodos)
+  incremental        -> solo las respuestas con id > último procesado, sumadas a sus periodos
+Verifica que ambos stores queden iguales.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_time_series_rollups [n_companies] [nuevas_por_corrida]
+"""
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+def new_responses(rng: random.Random, n: int, n_companies: int) -> list:
+    rows = []
+    for i in range(n):
+        # 1 de cada 5 llega atrasada (toca un periodo viejo)
+        year, month = (2023, rng.randint(1, 12)) if i % 5 == 0 else (2025, rng.randint(1, 2))
+        rows.append({
+            'company_id': rng.randint(1, n_companies),
+            'contact_id': rng.randint(1, n_companies),
+            'response_date': f"{year}-{month:02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{i % 60:02d}:{rng.randint(0, 59):02d}",
+            'has_expansion_plans': rng.choice([True, False, None]),
+            'has_engineering_area': rng.choice([True, False, None]),
+            'iso_certification_ids': rng.choice([[], [1, 2], [7]]),
+            'other_certifications': rng.choice([[], [3]]),
+        })
+    return rows
+
+def run(n_companies: int = 20_000, batch_size: int = 500, batches: int = 3):
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, 'bench.sqlite3')
+    subprocess.run([sys.executable, '-m', 'benchmarks.seed_local_backend', '--db', db_path,
+                    '--companies', str(n_companies)], check=True, stdout=subprocess.DEVNULL)
+    # supabase_service lee el backend al importarse
+    os.environ.update(DATA_BACKEND='local', LOCAL_DB_PATH=db_path)
+
+    from app.core.connections import supabase_service
+    from app.pipelines.analytics.rollups import ROLLUP_FILE, update_responses_rollup
+
+    incremental_dir, full_dir = os.path.join(tmp, 'incremental'), os.path.join(tmp, 'full')
+    update_responses_rollup(incremental_dir)
+
+    def load(store_dir: str) -> dict:
+        with open(os.path.join(store_dir, ROLLUP_FILE), encoding='utf-8') as f:
+            return json.load(f)
+
+    rng = random.Random(11)
+    print(f"Time-series rollups, {n_companies} companies, lotes de {batch_size} respuestas nuevas")
+    for batch in range(1, batches + 1):
+        supabase_service.supabase.table('responses').insert(new_responses(rng, batch_size, n_companies)).execute()
+
+        start = time.perf_counter()
+        update_responses_rollup(incremental_dir)
+        incremental_s = time.perf_counter() - start
+
+        shutil.rmtree(full_dir, ignore_errors=True)
+        start = time.perf_counter()
+        update_responses_rollup(full_dir)
+        full_s = time.perf_counter() - start
+
+        incremental, full = load(incremental_dir), load(full_dir)
+        assert incremental['buckets'] == full['buckets'] and incremental['rows'] == full['rows'], "Los rollups no coinciden"
+        print(f"  corrida {batch} ({full['rows']} respuestas) | historial completo {full_s * 1000:8.1f} ms | "
+              f"incremental {incremental_s * 1000:7.1f} ms ({full_s / incremental_s:.0f}x)")
+
+    start = time.perf_counter()
+    update_responses_rollup(incremental_dir)
+    print(f"  sin respuestas nuevas: {(time.perf_counter() - start) * 1000:.1f} ms (solo la huella de la tabla)")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 500)
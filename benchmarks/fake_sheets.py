@@ -0,0 +1,69 @@
+"""
+Backend falso de Google Sheets (en memoria) para medir la extracción sin red.
+
+FakeWorksheet implementa lo que usa el ETL de un gspread.Worksheet (get_all_records,
+row_values, batch_get, row_count, title) y simula la red: una latencia fija por request
+más un costo por celda transferida.
+"""
+import time
+
+import numpy as np
+from gspread.utils import a1_range_to_grid_range, numericise_all, to_records
+
+class FakeWorksheet:
+
+    def __init__(self, header: list, rows: list, title: str = 'Fake', extra_grid_rows: int = 500,
+                 latency_s: float = 0.15, seconds_per_cell: float = 2e-6):
+        self.header = header
+        self.rows = rows # lista de filas (listas de strings, como las regresa la API)
+        self.title = title
+        # Los formularios suelen tener filas vacías al final de la rejilla
+        self.row_count = len(rows) + 1 + extra_grid_rows
+        self.latency_s = latency_s
+        self.seconds_per_cell = seconds_per_cell
+        self.requests = 0
+        self.cells_sent = 0
+
+    def _network(self, n_cells: int):
+        self.requests += 1
+        self.cells_sent += n_cells
+        time.sleep(self.latency_s + n_cells * self.seconds_per_cell)
+
+    def row_values(self, row: int) -> list:
+        values = self.header if row == 1 else self.rows[row - 2]
+        self._network(len(values))
+        return list(values)
+
+    def get_all_records(self) -> list:
+        self._network(len(self.header) * (len(self.rows) + 1))
+        values = [numericise_all(list(row)) for row in self.rows]
+        return to_records(self.header, values)
+
+    def batch_get(self, ranges, major_dimension: str = 'ROWS') -> list:
+        results, n_cells = [], 0
+        for a1 in ranges:
+            grid = a1_range_to_grid_range(a1)
+            # Fila 1 de la hoja = encabezado; la API regresa los datos recortados al final
+            first, last = grid['startRowIndex'] - 1, grid['endRowIndex'] - 1
+            block = [row[grid['startColumnIndex']:grid['endColumnIndex']] for row in self.rows[first:last]]
+            if major_dimension == 'COLUMNS':
+                width = grid['endColumnIndex'] - grid['startColumnIndex']
+                columns = [[row[i] if i < len(row) else '' for row in block] for i in range(width)]
+                for column in columns:
+                    while column and column[-1] == '':
+                        column.pop()
+                while columns and not columns[-1]:
+                    columns.pop()
+                block = columns
+            n_cells += sum(len(part) for part in block)
+            results.append(block)
+        self._network(n_cells)
+        return results
+
+def build_form_worksheet(n_rows: int, n_columns: int = 80, seed: int = 7, **kwargs) -> FakeWorksheet:
+    """Hoja sintética con la forma del formulario: muchas columnas de texto, algunas numéricas."""
+    rng = np.random.default_rng(seed)
+    header = [f"Pregunta {i}" for i in range(n_columns)]
+    choices = np.array(["Sí", "No", "", "Texto libre de una respuesta de la encuesta", "12345", "3.5"])
+    grid = rng.choice(choices, size=(n_rows, n_columns))
+    return FakeWorksheet(header, grid.tolist(), **kwargs)
@@ -0,0 +1,177 @@
+"""
+Llena el backend local (SQLite, DATA_BACKEND=local) con volúmenes realistas para benchmarks:
+catálogos, empresas / contactos / respuestas sintéticas y dashboards + gráficas a partir de
+data/inputs/mock_dashboards.json (o mock_dashboards.py si el JSON está vacío).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.seed_local_backend [--companies 5000] [--responses-per-company 3]
+        [--charts-per-dashboard 12] [--db data/local/supabase_local.sqlite3] [--reset]
+
+Después:
+    DATA_BACKEND=local python run.py      # token: LOCAL_AUTH_TOKEN (default 'local-dev-token')
+"""
+import argparse
+import json
+import os
+import runpy
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.core.connections.local_backend import LOCAL_AUTH_TOKEN_DEFAULT, LocalClient
+from config.certifications_catalog_data import CERTIFICATIONS_CATALOG
+
+MOCK_DASHBOARDS_JSON = 'data/inputs/mock_dashboards.json'
+MOCK_DASHBOARDS_PY = 'data/inputs/mock_dashboards.py'
+
+MUNICIPIOS = [
+    'AGUASCALIENTES', 'ASIENTOS', 'CALVILLO', 'COSIO', 'JESUS MARIA', 'PABELLON DE ARTEAGA',
+    'RINCON DE ROMOS', 'SAN JOSE DE GRACIA', 'TEPEZALA', 'EL LLANO', 'SAN FRANCISCO DE LOS ROMO',
+]
+SECTORES = ['AUTOMOTRIZ', 'AEROESPACIAL', 'ALIMENTOS', 'TEXTIL', 'METALMECANICA', 'ELECTRONICA', 'PLASTICOS']
+PROVEEDURIA = ['Tier 1', 'Tier 2', 'Tier 3', None]
+CARGOS = ['Gerente de Compras', 'Director General', 'Jefe de Ingeniería', 'Coordinador de Calidad']
+NOMBRES = ['Juan', 'María', 'Ana', 'Luis', 'Carlos', 'Sofía', 'Jorge', 'Fernanda']
+APELLIDOS = ['Pérez', 'López', 'García', 'Hernández', 'Martínez', 'Romo', 'Esparza']
+
+def load_mock_dashboards() -> list:
+    """mock_dashboards.json si tiene contenido; si no, la lista MOCK_DASHBOARDS del .py."""
+    if os.path.exists(MOCK_DASHBOARDS_JSON) and os.path.getsize(MOCK_DASHBOARDS_JSON) > 0:
+        with open(MOCK_DASHBOARDS_JSON, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return runpy.run_path(MOCK_DASHBOARDS_PY)['MOCK_DASHBOARDS']
+
+def _upsert(client: LocalClient, table: str, rows: list, on_conflict: str, returning_cols: list = None) -> list:
+    query = client.table(table).upsert(rows, on_conflict=on_conflict)
+    if returning_cols:
+        query = query.select(*returning_cols)
+    return query.execute().data
+
+def seed_catalogs(client: LocalClient, rng) -> dict:
+    certs = _upsert(client, 'certifications_catalog', CERTIFICATIONS_CATALOG, 'name', ['id', 'acronym'])
+    municipios = _upsert(
+        client, 'municipality_catalog',
+        [{'municipality_name': name, 'keywords': []} for name in MUNICIPIOS], 'municipality_name', ['id']
+    )
+    parques = _upsert(
+        client, 'industrial_parks_catalog',
+        [{'park_name': f"PARQUE INDUSTRIAL {i}", 'keywords': []} for i in range(1, 31)], 'park_name', ['id']
+    )
+    return {
+        'cert_ids': [row['id'] for row in certs],
+        'municipality_ids': [row['id'] for row in municipios],
+        'park_ids': [row['id'] for row in parques],
+    }
+
+def seed_companies(client: LocalClient, rng, n_companies: int, responses_per_company: int, catalogs: dict):
+    cert_ids = np.array(catalogs['cert_ids'])
+
+    def cert_sample(max_n: int) -> list:
+        return sorted(int(x) for x in rng.choice(cert_ids, rng.integers(0, max_n + 1), replace=False))
+
+    companies = [{
+        'clean_rfc': f"RFC{i:09d}",
+        'trade_name': f"EMPRESA INDUSTRIAL {i}",
+        'clean_legal_name': f"EMPRESA INDUSTRIAL {i} SA DE CV",
+        'sector': str(rng.choice(SECTORES)),
+        'main_activity': 'Fabricación de partes y componentes',
+        'employee_count': int(rng.integers(5, 2500)),
+        'full_address': f"Av. Industria {i}, Aguascalientes",
+        'postal_code': str(20000 + int(rng.integers(0, 999))),
+        'municipality_id': int(rng.choice(catalogs['municipality_ids'])) if rng.random() < 0.9 else None,
+        'other_municipality': None,
+        'industrial_park_id': int(rng.choice(catalogs['park_ids'])) if rng.random() < 0.6 else None,
+        'other_industrial_park': None,
+        'procurement_tier': PROVEEDURIA[int(rng.integers(0, len(PROVEEDURIA)))],
+        'certification_ids': cert_sample(4),
+    } for i in range(n_companies)]
+    company_rows = _upsert(client, 'companies', companies, 'clean_rfc', ['id', 'clean_rfc'])
+
+    contacts = [{
+        'clean_email': f"contacto{i}@empresa{i}.com.mx",
+        'first_name': str(rng.choice(NOMBRES)),
+        'last_name': str(rng.choice(APELLIDOS)),
+        'clean_position': str(rng.choice(CARGOS)),
+        'company_phone_e164': f"+52449{int(rng.integers(1000000, 9999999))}",
+        'personal_phone_e164': None,
+    } for i in range(n_companies)]
+    contact_rows = _upsert(client, 'contacts', contacts, 'clean_email', ['id', 'clean_email'])
+
+    start = pd.Timestamp('2022-01-01')
+    responses = []
+    for company, contact in zip(company_rows, contact_rows):
+        for _ in range(int(rng.integers(1, 2 * responses_per_company))):
+            responses.append({
+                'company_id': company['id'],
+                'contact_id': contact['id'],
+                'response_date': str(start + pd.Timedelta(minutes=int(rng.integers(0, 3 * 365 * 24 * 60)))),
+                'has_expansion_plans': bool(rng.random() < 0.4),
+                'has_engineering_area': bool(rng.random() < 0.3),
+                'other_certifications': cert_sample(2),
+                'iso_certification_ids': cert_sample(3),
+                'additional_data': {
+                    'Principal producto o servicio que proporciona': 'Maquinados de precisión',
+                    'Principales clientes': 'NISSAN, CONTINENTAL',
+                    'Necesidades y problemáticas': 'Energía, personal calificado',
+                    'En caso de contar con otra certificación, especificar.': 'SMETA' if rng.random() < 0.1 else '',
+                    '¿Capacidad de transformadores a adquirir?': f"{int(rng.integers(1, 10)) * 500} kVA",
+                },
+            })
+    _upsert(client, 'responses', responses, 'company_id, response_date')
+    return len(company_rows), len(contact_rows), len(responses)
+
+def seed_dashboards(client: LocalClient, charts_per_dashboard: int) -> int:
+    mock = load_mock_dashboards()
+    template_charts = [chart for dashboard in mock for chart in dashboard.get('charts', [])]
+    n_charts = 0
+    for position, dashboard in enumerate(mock, start=1):
+        row = _upsert(client, 'dashboards', [{
+            'slug': dashboard['id'],
+            'title': dashboard['title'],
+            'description': dashboard.get('description'),
+            'position': position,
+        }], 'slug', ['id'])[0]
+
+        # Repetimos las gráficas de ejemplo hasta tener charts_per_dashboard por dashboard
+        charts = [{
+            'dashboard_id': row['id'],
+            'chart_slug': f"{dashboard['id']}__{template['chart_id']}__{i}",
+            'title': template['title'],
+            'chart_type': template['type'],
+            'chart_data': template['data'],
+            'position': i,
+            'is_active': True,
+        } for i, template in ((i, template_charts[i % len(template_charts)]) for i in range(charts_per_dashboard))]
+        if charts:
+            _upsert(client, 'charts', charts, 'chart_slug')
+        n_charts += len(charts)
+    return n_charts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=os.getenv('LOCAL_DB_PATH', 'data/local/supabase_local.sqlite3'))
+    parser.add_argument('--companies', type=int, default=5000)
+    parser.add_argument('--responses-per-company', type=int, default=3)
+    parser.add_argument('--charts-per-dashboard', type=int, default=12)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--reset', action='store_true', help='Borra la BD local antes de sembrar')
+    args = parser.parse_args()
+
+    if args.reset and os.path.exists(args.db):
+        os.remove(args.db)
+
+    start = time.perf_counter()
+    rng = np.random.default_rng(args.seed)
+    client = LocalClient(args.db)
+    catalogs = seed_catalogs(client, rng)
+    n_companies, n_contacts, n_responses = seed_companies(client, rng, args.companies, args.responses_per_company, catalogs)
+    n_charts = seed_dashboards(client, args.charts_per_dashboard)
+
+    print(f"Seeded {args.db} in {time.perf_counter() - start:.1f}s: {n_companies} companies, "
+          f"{n_contacts} contacts, {n_responses} responses, {n_charts} charts.")
+    print(f"Run with DATA_BACKEND=local LOCAL_DB_PATH={args.db} (Bearer token: "
+          f"{os.getenv('LOCAL_AUTH_TOKEN', LOCAL_AUTH_TOKEN_DEFAULT)})")
+
+if __name__ == '__main__':
+    main()
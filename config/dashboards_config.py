@@ -1,7 +1,12 @@
 # This file defines the structure and configuration for all dynamically generated dashboards.
 # The analytics_service will use this config to generate and update the data in Supabase.
+#
+# "fan_out" (opcional, en el dashboard o en una gráfica): lista de dimensiones (columnas de la fuente).
+# Cada gráfica se genera además para cada valor de esas dimensiones y se guarda como la fila
+# '<chart_slug>__by_<dimension>' (inactiva); la API la sirve en /api/charts/<chart_slug>/by/<dimension>/<valor>.
+# Una gráfica con su propio "fan_out" (puede ser []) ignora el del dashboard.
 
-from app.pipelines.analytics.analysis_functions import analyze_categorical, analyze_continuous_binned, analyze_top_ranking, analyze_array_frequency, analyze_array_populated_bool
+from app.pipelines.analytics.analysis_functions import analyze_categorical, analyze_continuous_binned, analyze_top_ranking, analyze_array_frequency, analyze_array_populated_bool, analyze_time_series
 
 DASHBOARDS_CONFIG = [
     {
@@ -9,6 +14,7 @@ DASHBOARDS_CONFIG = [
         "title": "Análisis de Empresas",
         "description": "Distribución de empresas registradas por sector, municipio y otros indicadores clave.",
         "position": 1,
+        "fan_out": ["municipality", "sector"],
         "charts": [
             # 1. Municipios (LIMITADO a Top 10)
             {
@@ -228,6 +234,7 @@ DASHBOARDS_CONFIG = [
         "title": "Calidad y Certificaciones",
         "description": "Análisis de madurez industrial, cumplimiento normativo y estándares de calidad.",
         "position": 2,
+        "fan_out": ["municipality", "sector"],
         "charts": [
             # --- CHART 1: EL TOP 10 (La joya de la corona) ---
             # Muestra cuáles son las certificaciones que realmente dominan el estado
@@ -303,5 +310,42 @@ DASHBOARDS_CONFIG = [
                 }
             },
         ]
+    },
+    {
+        "slug": "response-trends",
+        "title": "Tendencias",
+        "description": "Evolución de las respuestas, planes de expansión y certificaciones a lo largo del tiempo.",
+        "position": 4,
+        "charts": [
+            # Sale de los rollups por periodo (responses_rollup), no de la tabla completa
+            {
+                "slug": "responses-per-month",
+                "data_source_key": "responses_rollup",
+                "analysis_type": analyze_time_series,
+                "formatter_params": {"title": "Respuestas por Mes", "chart_type": "line", "data_label": "Respuestas"},
+                "params": {"metric": "responses", "period": "month"}
+            },
+            {
+                "slug": "responses-per-week",
+                "data_source_key": "responses_rollup",
+                "analysis_type": analyze_time_series,
+                "formatter_params": {"title": "Respuestas por Semana (Últimas 26)", "chart_type": "bar", "data_label": "Respuestas"},
+                "params": {"metric": "responses", "period": "week", "last_n": 26}
+            },
+            {
+                "slug": "expansion-rate-trend",
+                "data_source_key": "responses_rollup",
+                "analysis_type": analyze_time_series,
+                "formatter_params": {"title": "% con Planes de Expansión por Mes", "chart_type": "line", "data_label": "% de Respuestas"},
+                "params": {"metric": "expansion_rate", "period": "month"}
+            },
+            {
+                "slug": "certification-adoption-trend",
+                "data_source_key": "responses_rollup",
+                "analysis_type": analyze_time_series,
+                "formatter_params": {"title": "% con Alguna Certificación por Mes", "chart_type": "line", "data_label": "% de Respuestas"},
+                "params": {"metric": "certification_rate", "period": "month"}
+            },
+        ]
     }
-]
\ No newline at end of file
+]
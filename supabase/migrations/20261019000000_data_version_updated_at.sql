@@ -0,0 +1,40 @@
+-- Versión de datos para los ETags de la API (app/services/data_version.py):
+-- cada tabla lleva updated_at, que un trigger mueve en cada alta o edición real de una fila
+-- (un upsert del ETL que no cambia nada no la toca). La versión de una tabla es
+-- count exacto + max(updated_at): cambia con altas, bajas y ediciones, vengan o no del ETL.
+--
+-- clock_timestamp() (y no now()): dentro de una transacción larga cada fila toma la hora
+-- en que se escribe, no la del inicio de la transacción.
+
+create or replace function public.set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op = 'INSERT' or new is distinct from old then
+        new.updated_at := clock_timestamp();
+    end if;
+    return new;
+end;
+$$;
+
+do $$
+declare
+    t text;
+begin
+    foreach t in array array[
+        'companies', 'contacts', 'responses',
+        'municipality_catalog', 'industrial_parks_catalog', 'certifications_catalog',
+        'dashboards', 'charts'
+    ]
+    loop
+        execute format('alter table public.%I add column if not exists updated_at timestamptz not null default clock_timestamp()', t);
+        execute format('drop trigger if exists set_updated_at on public.%I', t);
+        execute format(
+            'create trigger set_updated_at before insert or update on public.%I '
+            'for each row execute function public.set_updated_at()', t);
+        -- La versión es un order by updated_at desc limit 1
+        execute format('create index if not exists %I on public.%I (updated_at desc)', t || '_updated_at_idx', t);
+    end loop;
+end;
+$$;
@@ -0,0 +1,7 @@
+import os
+
+# supabase_service crea el cliente al importarse: las pruebas usan el backend local en memoria
+os.environ.setdefault('SUPABASE_URL', 'http://localhost')
+os.environ.setdefault('SUPABASE_SERVICE_KEY', 'test')
+os.environ.setdefault('DATA_BACKEND', 'local')
+os.environ.setdefault('LOCAL_DB_PATH', ':memory:')
@@ -0,0 +1,40 @@
+"""parse_timestamp_column debe dar lo mismo que clean_to_timestamp fila por fila (response_date es llave del upsert)."""
+import warnings
+
+import pandas as pd
+import pytest
+
+from app.pipelines.etl.cleaning import clean_to_timestamp, parse_timestamp_column
+
+def _baseline(values: list) -> list:
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return [clean_to_timestamp(value) for value in values]
+
+def _assert_matches_baseline(values: list):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        parsed = parse_timestamp_column(pd.Series(values, dtype=object))
+    for value, fast, slow in zip(values, parsed, _baseline(values)):
+        if slow is None:
+            assert pd.isna(fast), value
+        else:
+            assert fast == slow, value
+
+@pytest.mark.parametrize('values', [
+    # Ambiguas d/m junto a una que solo puede ser día primero
+    ['05/02/2024 10:00:00', '03/04/2024 11:00:00', '13/02/2024 09:00:00'],
+    # Otro orden de aparición (el formato no debe depender de él)
+    ['13/02/2024 09:00:00', '05/02/2024 10:00:00', '03/04/2024 11:00:00'],
+    # La muestra solo trae días > 12; las ambiguas quedan fuera de ella
+    [f'{13 + i % 15}/{1 + i % 12:02d}/2024 10:{i % 60:02d}:00' for i in range(250)] + ['05/02/2024 10:00:00'],
+    # Mes primero, con nulos, vacíos y basura
+    ['1/5/2024 9:00:00', '12/31/2023 23:59:59', '', None, 'no es fecha', '2024-01-05T10:00:00'],
+])
+def test_parse_timestamp_column_matches_per_value_parser(values):
+    _assert_matches_baseline(values)
+
+def test_ambiguous_dates_are_read_month_first():
+    parsed = parse_timestamp_column(pd.Series(['05/02/2024 10:00:00', '03/04/2024 11:00:00', '13/02/2024 09:00:00']))
+    assert list(parsed) == [pd.Timestamp('2024-05-02 10:00:00'), pd.Timestamp('2024-03-04 11:00:00'),
+                            pd.Timestamp('2024-02-13 09:00:00')]
@@ -0,0 +1,31 @@
+"""compress_response: el caché de comprimidos nunca cambia el contenido de la respuesta."""
+import gzip
+
+import pytest
+from flask import Flask
+
+from app.core.compression import init_compression
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv('COMPRESSION_ENABLED', 'true')
+    app = Flask(__name__)
+    bodies = iter(['a' * 2000, 'b' * 2000])
+
+    @app.route('/data')
+    def data():
+        # Mismo ETag, cuerpo distinto (los datos cambiaron entre la versión y la descarga)
+        response = app.response_class(next(bodies), mimetype='text/plain')
+        response.set_etag('same-version')
+        return response
+
+    init_compression(app)
+    return app.test_client()
+
+def test_cache_hit_keeps_fresh_body(client):
+    first = client.get('/data', headers={'Accept-Encoding': 'gzip'})
+    second = client.get('/data', headers={'Accept-Encoding': 'gzip'})
+
+    assert first.headers['Content-Encoding'] == second.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(first.data) == b'a' * 2000
+    assert gzip.decompress(second.data) == b'b' * 2000
@@ -0,0 +1,40 @@
+"""data_version (ETags de la API): cambia con cada alta, baja o edición real; sin columna de versión, None."""
+import json
+
+from app.core.connections import supabase_service
+from app.services import data_version as dv
+
+def _table(name: str, rows: list) -> str:
+    supabase_service.supabase.table(name).insert(rows).execute()
+    return name
+
+def test_version_changes_on_insert_edit_and_delete():
+    table = _table('dv_companies', [{'name': 'A'}, {'name': 'B'}])
+    versions = [dv.data_version([table])]
+
+    supabase_service.supabase.table(table).update({'name': 'B2'}).eq('name', 'B').execute()
+    versions.append(dv.data_version([table]))
+    supabase_service.supabase.table(table).insert([{'name': 'C'}]).execute()
+    versions.append(dv.data_version([table]))
+    supabase_service.supabase.table(table).delete().eq('name', 'A').execute()
+    versions.append(dv.data_version([table]))
+
+    assert None not in versions
+    assert len(set(versions)) == len(versions)
+
+def test_noop_write_keeps_version():
+    table = _table('dv_catalog', [{'name': 'A'}])
+    before = dv.data_version([table])
+    supabase_service.supabase.table(table).upsert([{'id': 1, 'name': 'A'}]).execute()
+    assert dv.data_version([table]) == before
+
+def test_no_version_without_version_column():
+    # Filas escritas sin el trigger (migración sin aplicar): sin versión, no un count + id máximo
+    client = supabase_service.supabase
+    client.ensure_table('dv_legacy')
+    client.conn.execute('INSERT INTO "dv_legacy" (doc) VALUES (?)', (json.dumps({'name': 'A'}),))
+    versioned = _table('dv_versioned', [{'name': 'A'}])
+
+    assert dv.table_version('dv_legacy') is None
+    assert dv.data_version([versioned, 'dv_legacy']) is None
+    assert dv.data_version([versioned]) is not None
@@ -0,0 +1,27 @@
+"""Las etiquetas de las métricas no toman valores libres de la petición (series acotadas)."""
+from flask import Flask
+
+from app.core import metrics
+from app.core.connections import supabase_service
+
+def test_unknown_tables_share_one_page_series():
+    supabase_service.supabase.table('companies').insert([{'clean_rfc': 'AAA010101AAA'}]).execute()
+    for name in ('companies', 'user_typed_1', 'user_typed_2'):
+        supabase_service.get_all_from(name)
+        supabase_service.get_csv_from(name, page_size=1)
+
+    text = metrics.render_prometheus()
+    assert 'user_typed' not in text
+    assert 'table="companies"' in text
+
+def test_unknown_http_methods_share_one_series():
+    app = Flask(__name__)
+    app.add_url_rule('/ping', 'ping', lambda: 'ok', methods=['GET', 'FOO_METHOD'])
+    metrics.init_request_metrics(app)
+    client = app.test_client()
+    client.get('/ping')
+    client.open('/ping', method='FOO_METHOD')
+
+    text = metrics.render_prometheus()
+    assert 'FOO_METHOD' not in text
+    assert 'method="other"' in text